@@ -0,0 +1,212 @@
+"""
+요청 수용 제어(admission control) 모듈
+
+/chat/image, /chat/select 등은 요청마다 GPT-4o 비전 호출 + CLIP 연산을 하는데 동시 실행 제한이 없어,
+요청이 몰리면 OpenAI rate limit이 소진되고 모든 사용자가 함께 타임아웃됩니다.
+→ 엔드포인트 그룹별 동시 실행 상한 + 제한된 대기열 + 클라이언트별 토큰 버킷으로
+  넘치는 요청은 빠르게 거절(429/503 + Retry-After)하고, 받은 요청은 정상 지연 안에 처리
+
+- 동시 실행 상한을 넘으면 대기열에서 기다림 (대기열이 가득 차거나 대기 시간 초과 시 503)
+- 클라이언트(접속 IP)별 분당 요청 수 제한 (초과 시 429)
+  X-Client-ID 헤더는 클라이언트가 임의로 바꿀 수 있으므로, RATE_LIMIT_TRUSTED_PROXIES에 등록한
+  프록시/게이트웨이에서 온 요청일 때만 클라이언트 키로 사용
+- 현재 실행/대기 수는 /metrics 게이지로 노출 (design_admission_active / design_admission_queued)
+
+목록:
+1. AdmissionRejected: 거절 예외 (상태 코드 + Retry-After)
+2. EndpointLimiter: 동시 실행 상한 + 제한된 대기열 (asyncio)
+3. TokenBucket / ClientRateLimiter / client_key: 클라이언트별 토큰 버킷 + 클라이언트 키 결정
+4. LIMITERS / rate_limiter / ENDPOINT_GROUPS: 기본 인스턴스 (api.py 미들웨어에서 사용)
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from tracing import Gauge, Counter
+
+
+# ==================== 설정 ====================
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+# 엔드포인트 그룹별 (동시 실행 수, 대기열 길이, 대기 시간 상한(초))
+ADMISSION_LIMITS = {
+    "image": (_env_int("ADMISSION_IMAGE_CONCURRENCY", 4), _env_int("ADMISSION_IMAGE_QUEUE", 16), 30.0),
+    "select": (_env_int("ADMISSION_SELECT_CONCURRENCY", 4), _env_int("ADMISSION_SELECT_QUEUE", 16), 60.0),
+    "text": (_env_int("ADMISSION_TEXT_CONCURRENCY", 8), _env_int("ADMISSION_TEXT_QUEUE", 32), 30.0),
+    "bulk": (_env_int("ADMISSION_BULK_CONCURRENCY", 2), _env_int("ADMISSION_BULK_QUEUE", 4), 30.0),   # 작업 등록(업로드 검증/저장)만, 처리는 bulk_jobs.py
+}
+
+# 경로 → 엔드포인트 그룹 (여기 없는 경로는 제한 없음)
+ENDPOINT_GROUPS = {
+    "/chat/image": "image",
+    "/chat/images": "image",
+    "/chat/select": "select",
+    "/chat/select/batch": "select",
+    "/chat/text": "text",
+    "/bulk/jobs": "bulk",
+}
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))   # 0이면 끔
+RATE_LIMIT_BURST = _env_int("RATE_LIMIT_BURST", 10)
+RATE_LIMIT_MAX_CLIENTS = 10000   # 토큰 버킷을 유지할 최대 클라이언트 수 (LRU)
+# X-Client-ID 헤더를 믿을 프록시 IP 목록 (쉼표 구분, 비어 있으면 항상 접속 IP 기준)
+RATE_LIMIT_TRUSTED_PROXIES = frozenset(
+    ip.strip() for ip in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if ip.strip())
+
+
+# ==================== 메트릭 ====================
+
+ADMISSION_ACTIVE = Gauge("design_admission_active", "엔드포인트 그룹별 실행 중인 요청 수")
+ADMISSION_QUEUED = Gauge("design_admission_queued", "엔드포인트 그룹별 대기 중인 요청 수")
+ADMISSION_REJECTED = Counter("design_admission_rejected_total", "거절된 요청 수 (reason: queue_full/timeout/rate_limit)")
+
+
+# ==================== 동시 실행 제한 ====================
+
+class AdmissionRejected(Exception):
+    """요청 거절 (api.py에서 status_code + Retry-After 헤더로 응답)"""
+
+    def __init__(self, status_code, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class EndpointLimiter:
+    """
+    동시 실행 상한 + 제한된 대기열
+
+    사용:
+        async with limiter.slot():
+            ...   # 최대 max_concurrency개만 동시에 실행
+    """
+
+    def __init__(self, name, max_concurrency, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._active = 0
+        self._queued = 0
+        self._avg_seconds = 5.0     # 요청 1건 평균 처리 시간 (EWMA, Retry-After 추정용)
+
+    def _retry_after(self):
+        """대기열이 빠지는 데 걸릴 예상 시간 (초)"""
+        return (self._queued + 1) * self._avg_seconds / self.max_concurrency
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked():
+            if self._queued >= self.max_queue:
+                ADMISSION_REJECTED.inc(endpoint=self.name, reason="queue_full")
+                raise AdmissionRejected(503, "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요.",
+                                        self._retry_after())
+            self._queued += 1
+            ADMISSION_QUEUED.set(self._queued, endpoint=self.name)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_REJECTED.inc(endpoint=self.name, reason="timeout")
+                raise AdmissionRejected(503, "대기 시간이 초과되었습니다. 잠시 후 다시 시도하세요.",
+                                        self._retry_after())
+            finally:
+                self._queued -= 1
+                ADMISSION_QUEUED.set(self._queued, endpoint=self.name)
+        else:
+            await self._semaphore.acquire()
+
+        self._active += 1
+        ADMISSION_ACTIVE.set(self._active, endpoint=self.name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - start)
+            self._active -= 1
+            ADMISSION_ACTIVE.set(self._active, endpoint=self.name)
+            self._semaphore.release()
+
+
+# ==================== 클라이언트별 요청 수 제한 ====================
+
+class TokenBucket:
+    """토큰 버킷: 초당 rate개 충전, 최대 burst개 (요청 1건 = 토큰 1개)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """
+        토큰 1개 사용
+
+        Returns:
+            float: 0이면 허용, 아니면 다음 토큰까지 남은 시간(초)
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def client_key(host, client_id=None, trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES):
+    """
+    속도 제한 키 결정
+
+    Args:
+        host: 접속 IP (request.client.host)
+        client_id: X-Client-ID 헤더 값 (host가 신뢰하는 프록시일 때만 사용)
+
+    Returns:
+        str: "ip:..." 또는 "id:..." (IP와 헤더 값이 같은 키로 섞이지 않도록 구분)
+    """
+    if client_id and host in trusted_proxies:
+        return f"id:{client_id}"
+    return f"ip:{host or 'unknown'}"
+
+
+class ClientRateLimiter:
+    """클라이언트 키별 토큰 버킷 (오래 안 쓴 클라이언트는 LRU로 정리)"""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client_key, endpoint):
+        """허용되지 않으면 AdmissionRejected(429)"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client_key)
+            if bucket is None:
+                bucket = self._buckets[client_key] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client_key)
+            wait = bucket.take()
+        if wait > 0:
+            ADMISSION_REJECTED.inc(endpoint=endpoint, reason="rate_limit")
+            raise AdmissionRejected(429, "요청 한도를 초과했습니다. 잠시 후 다시 시도하세요.", wait)
+
+
+# 기본 인스턴스 (api.py 공용)
+LIMITERS = {name: EndpointLimiter(name, *limits) for name, limits in ADMISSION_LIMITS.items()}
+rate_limiter = ClientRateLimiter()
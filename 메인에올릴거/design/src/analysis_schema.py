@@ -0,0 +1,124 @@
+"""
+VLM 분석/비교 결과 구조화 모듈 (스키마 검증 + 압축 JSON)
+
+IMAGE_ANALYSIS_PROMPT / IMAGE_COMPARISON_PROMPT는 JSON을 요청하지만,
+노드는 StrOutputParser 결과(코드 블록, 들여쓰기, 부연 설명 포함 원문)를 그대로 저장하고
+REPORT_PROMPT에 다시 통째로 보냅니다.
+→ 응답을 pydantic 스키마로 검증해 필요한 필드만 압축 JSON(공백 없음)으로 저장
+  - 검증에 실패하면 원문을 그대로 사용 (리포트 생성은 계속 진행)
+  - 키 이름은 프롬프트의 JSON 형식과 같으므로 압축 JSON을 다시 파싱해도 같은 결과
+
+목록:
+1. ShapeAnalysis / DesignComparison: 분석 / 비교 결과 스키마
+2. parse_analysis / parse_comparison: 응답 텍스트 → 스키마 객체 (실패 시 None)
+3. compact_analysis / compact_comparison: 응답 텍스트 → 압축 JSON 문자열 (실패 시 원문)
+"""
+
+import json
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from tracing import Counter
+
+
+# ==================== 메트릭 ====================
+
+STRUCTURED_OUTPUTS = Counter("design_structured_outputs_total", "VLM 응답 구조화 결과 (kind: analysis/comparison, result: parsed/fallback)")
+
+
+# ==================== 스키마 ====================
+# 필드 이름은 영문, alias는 프롬프트 JSON 키 (저장/전송은 alias 기준)
+
+class _Schema(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ShapeObservation(_Schema):
+    silhouette: str = Field("관찰되지 않음", alias="전체_실루엣")
+    body: str = Field("관찰되지 않음", alias="몸체_형태")
+    top: str = Field("관찰되지 않음", alias="상부_구조")
+    bottom: str = Field("관찰되지 않음", alias="하부_형태")
+    proportion: str = Field("관찰되지 않음", alias="비례_관계")
+
+
+class ShapeAnalysis(_Schema):
+    """IMAGE_ANALYSIS_PROMPT 결과 (도면 1장의 형상 관찰)"""
+
+    article: str = Field("", alias="물품")
+    shape: ShapeObservation = Field(alias="형상_관찰")
+
+
+class ComparisonPoint(_Schema):
+    item: str = Field(alias="항목")
+    description: str = Field(alias="설명")
+
+
+class DesignComparison(_Schema):
+    """IMAGE_COMPARISON_PROMPT 결과 (비교 대상 형상 + 유사점/비유사점)"""
+
+    target: Optional[ShapeAnalysis] = Field(None, alias="비교_디자인_분석")
+    similarities: List[ComparisonPoint] = Field(alias="유사한_점")
+    differences: List[ComparisonPoint] = Field(alias="비유사한_점")
+
+
+# ==================== 파싱 ====================
+
+def _extract_json(text):
+    """응답 텍스트 → JSON 객체 (```json 코드 블록, 앞뒤 설명 문장 제거)"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def _parse(schema, text):
+    data = _extract_json(text or "")
+    if not isinstance(data, dict):
+        return None
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        return None
+
+
+def parse_analysis(text):
+    """형상 분석 응답 → ShapeAnalysis (검증 실패 시 None)"""
+    return _parse(ShapeAnalysis, text)
+
+
+def parse_comparison(text):
+    """비교 응답 → DesignComparison (검증 실패 시 None)"""
+    return _parse(DesignComparison, text)
+
+
+def to_compact(model):
+    """스키마 객체 → 압축 JSON 문자열 (프롬프트 키 이름, 공백 없음)"""
+    return model.model_dump_json(by_alias=True, exclude_none=True)
+
+
+def compact_analysis(text):
+    """형상 분석 응답 → 압축 JSON (검증 실패 시 원문)"""
+    analysis = parse_analysis(text)
+    STRUCTURED_OUTPUTS.inc(kind="analysis", result="parsed" if analysis else "fallback")
+    return to_compact(analysis) if analysis else text
+
+
+def compact_comparison(text, reference=None):
+    """
+    비교 응답 → 압축 JSON (검증 실패 시 원문)
+
+    Args:
+        reference: 미리 계산한 비교 대상 형상 분석 (압축 JSON, analysis_store.py)
+                   → 응답에 비교 대상 분석이 없어도 이 값으로 채움
+    """
+    comparison = parse_comparison(text)
+    STRUCTURED_OUTPUTS.inc(kind="comparison", result="parsed" if comparison else "fallback")
+    if comparison is None:
+        return text
+    if reference:
+        comparison.target = parse_analysis(reference) or comparison.target
+    return to_compact(comparison)
@@ -0,0 +1,274 @@
+"""
+카탈로그 도면 형상 분석 저장소 모듈
+
+상세 비교 때마다 GPT-4o가 비교 대상(카탈로그) 도면을 처음부터 다시 분석합니다.
+→ 카탈로그 도면의 IMAGE_ANALYSIS_PROMPT 결과를 배치 작업으로 미리 계산해 압축 JSON으로 저장하고,
+  비교 시 이 분석을 프롬프트에 넣어 VLM은 유사점/비유사점만 작성 (출력 토큰 감소)
+  리포트에도 같은 압축 분석이 들어가므로 디자인별 전송 토큰이 줄어듦
+
+키: (design_id, 프롬프트 버전, 모델명) → 프롬프트/모델이 바뀌면 자동으로 다시 계산 대상
+저장소: SQLite (data/design_analyses.sqlite3, comparison_cache.py와 같은 방식)
+        + Chroma 메타데이터 shape_descriptor 필드 (검색 결과/출원번호 조회/키워드 색인에서 함께 사용)
+배치 작업은 이미 저장된 도면을 건너뛰므로 중단 후 다시 실행하면 이어서 진행
+분당 호출 수 제한(토큰 버킷)으로 OpenAI rate limit을 서비스 트래픽과 나눠 씀
+
+목록:
+1. AnalysisStore: 도면별 형상 분석 조회/저장
+2. build_analyses: 카탈로그 도면 배치 분석 (동시 실행 수 + 분당 호출 수 제한, 재시작 가능)
+3. sync_descriptors: 저장된 분석 → Chroma 메타데이터 (바뀐 도면만 update, 이후 키워드 색인 / 출원번호 인덱스 재생성)
+
+사용법:
+    python analysis_store.py build                  # 전체 도면 (중단 후 다시 실행하면 이어서)
+    python analysis_store.py build --limit 500 --rate-per-minute 30
+    python analysis_store.py sync                   # Chroma 메타데이터에만 다시 기록
+    python analysis_store.py stats
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_schema import compact_analysis, parse_analysis
+from admission import TokenBucket
+from utils import DATA_DIR, CHROMA_DIR, iter_collection
+
+
+# ==================== 설정 ====================
+
+DEFAULT_ANALYSIS_PATH = os.getenv("DESIGN_ANALYSIS_PATH", os.path.join(DATA_DIR, "design_analyses.sqlite3"))
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))   # 배치 작업 동시 VLM 호출 수
+ANALYSIS_RATE_PER_MINUTE = float(os.getenv("ANALYSIS_RATE_PER_MINUTE", "60"))   # 배치 작업 분당 VLM 호출 수 (0이면 제한 없음)
+DESCRIPTOR_FIELD = "shape_descriptor"   # Chroma 메타데이터 필드 이름
+
+
+# ==================== 저장소 ====================
+
+class AnalysisStore:
+    """(design_id, 프롬프트 버전, 모델) → 형상 분석 압축 JSON"""
+
+    def __init__(self, path=DEFAULT_ANALYSIS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    design_id      TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    model          TEXT NOT NULL,
+                    analysis       TEXT NOT NULL,
+                    created_at     REAL NOT NULL,
+                    PRIMARY KEY (design_id, prompt_version, model)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, design_id, prompt_version, model):
+        """
+        Returns:
+            str: 형상 분석 압축 JSON
+            None: 아직 분석하지 않은 도면
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT analysis FROM analyses WHERE design_id=? AND prompt_version=? AND model=?",
+                (design_id, prompt_version, model)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, design_id, prompt_version, model, analysis):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?)",
+                (design_id, prompt_version, model, analysis, time.time())
+            )
+
+    def all(self, prompt_version, model):
+        """design_id → 형상 분석 (현재 프롬프트/모델 전체)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT design_id, analysis FROM analyses WHERE prompt_version=? AND model=?",
+                (prompt_version, model)
+            ).fetchall()
+        return dict(rows)
+
+    def design_ids(self, prompt_version, model):
+        """이미 분석한 design_id 집합 (배치 작업 재시작용)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT design_id FROM analyses WHERE prompt_version=? AND model=?",
+                (prompt_version, model)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+
+# ==================== 배치 분석 ====================
+
+def _iter_design_ids(collection):
+    for page in iter_collection(collection, include=[]):
+        yield from page["ids"]
+
+
+class _RateLimiter:
+    """스레드 공용 분당 호출 수 제한 (빈 토큰이 생길 때까지 대기)"""
+
+    def __init__(self, per_minute, burst):
+        self._bucket = TokenBucket(per_minute / 60.0, burst) if per_minute > 0 else None
+        self._lock = threading.Lock()
+
+    def wait(self):
+        while self._bucket is not None:
+            with self._lock:
+                delay = self._bucket.take()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+def build_analyses(collection, analyze, store, prompt_version, model, limit=None,
+                   concurrency=ANALYSIS_CONCURRENCY, rate_per_minute=ANALYSIS_RATE_PER_MINUTE):
+    """
+    카탈로그 도면 → 형상 분석 → 저장소
+
+    스키마 검증에 실패한 응답은 저장하지 않음 (다음 실행에서 다시 시도)
+
+    Args:
+        analyze: 이미지 data URL → 분석 응답 텍스트 (call_llm으로 감싼 체인 호출)
+        limit: 이번 실행에서 분석할 최대 도면 수
+        rate_per_minute: 분당 최대 VLM 호출 수 (재시도는 llm_policy가 별도로 처리)
+
+    Returns:
+        dict: {"analyzed": 저장한 수, "failed": 실패 수, "skipped": 이미 분석한 수}
+    """
+    from utils import get_design_image_bytes
+    from image_preprocess import to_vlm_data_url
+
+    done = store.design_ids(prompt_version, model)
+    targets = []
+    for design_id in _iter_design_ids(collection):
+        if design_id in done:
+            continue
+        if limit is not None and len(targets) >= limit:
+            break
+        targets.append(design_id)
+    stats = {"analyzed": 0, "failed": 0, "skipped": len(done)}
+    limiter = _RateLimiter(rate_per_minute, burst=concurrency)
+
+    def run(design_id):
+        image_bytes = get_design_image_bytes(design_id)
+        if image_bytes is None:
+            return False
+        limiter.wait()
+        try:
+            text = analyze(to_vlm_data_url(image_bytes, cache_key=design_id))
+        except Exception as e:
+            print(f"  분석 실패 ({design_id}): {type(e).__name__}: {e}")
+            return False
+        if parse_analysis(text) is None:
+            return False
+        store.put(design_id, prompt_version, model, compact_analysis(text))
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, ok in enumerate(executor.map(run, targets), start=1):
+            stats["analyzed" if ok else "failed"] += 1
+            if i % 50 == 0:
+                print(f"  {i}/{len(targets)}개 처리 (실패 {stats['failed']}개)")
+    return stats
+
+
+def sync_descriptors(collection, store, prompt_version, model):
+    """
+    저장된 형상 분석 → Chroma 메타데이터 shape_descriptor (값이 다른 도면만 update)
+
+    shape_descriptor는 키워드 색인 / 출원번호 인덱스에도 들어가므로, 갱신한 도면이 있으면 둘 다 다시 생성
+    (도면 수는 그대로라 get_lexical_index / get_design_lookup의 변경 감지로는 알 수 없음)
+
+    Returns:
+        int: 갱신한 도면 수
+    """
+    analyses = store.all(prompt_version, model)
+    if not analyses:
+        return 0
+    updated = 0
+    for page in iter_collection(collection, include=["metadatas"]):
+        ids, metadatas = [], []
+        for design_id, metadata in zip(page["ids"], page["metadatas"]):
+            analysis = analyses.get(design_id)
+            metadata = metadata or {}
+            if analysis is not None and metadata.get(DESCRIPTOR_FIELD) != analysis:
+                ids.append(design_id)
+                metadatas.append({**metadata, DESCRIPTOR_FIELD: analysis})
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+
+    if updated:
+        from ingest import refresh_indexes
+        refresh_indexes(collection)
+    return updated
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    import chromadb
+    from dotenv import load_dotenv
+    from langchain_openai import ChatOpenAI
+    from langchain_core.output_parsers import StrOutputParser
+
+    from prompts import IMAGE_ANALYSIS_PROMPT
+    from comparison_cache import prompt_version
+    from llm_policy import call_llm, LLM_REQUEST_TIMEOUT
+
+    parser = argparse.ArgumentParser(description="카탈로그 도면 형상 분석 배치")
+    parser.add_argument("command", choices=["build", "sync", "stats"])
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=ANALYSIS_CONCURRENCY)
+    parser.add_argument("--rate-per-minute", type=float, default=ANALYSIS_RATE_PER_MINUTE, help="분당 VLM 호출 수 (0이면 제한 없음)")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--collection", default="design")
+    args = parser.parse_args()
+
+    store = AnalysisStore()
+    version = prompt_version(IMAGE_ANALYSIS_PROMPT)
+
+    if args.command == "stats":
+        print(f"저장된 분석 {len(store)}개 (현재 프롬프트/모델: {len(store.design_ids(version, args.model))}개)")
+        sys.exit(0)
+
+    collection = chromadb.PersistentClient(path=args.chroma_dir).get_collection(name=args.collection)
+    if args.command == "build":
+        load_dotenv()
+        llm = ChatOpenAI(model=args.model, temperature=0, timeout=LLM_REQUEST_TIMEOUT, max_retries=0)
+        chain = IMAGE_ANALYSIS_PROMPT | llm | StrOutputParser()
+
+        stats = build_analyses(
+            collection,
+            lambda url: call_llm("analyze", chain.invoke, {"image_url": url}),
+            store, version, args.model, limit=args.limit, concurrency=args.concurrency,
+            rate_per_minute=args.rate_per_minute,
+        )
+        print(f"✅ 분석 {stats['analyzed']}개 저장, 실패 {stats['failed']}개, 기존 {stats['skipped']}개")
+
+    updated = sync_descriptors(collection, store, version, args.model)
+    print(f"✅ Chroma 메타데이터 {DESCRIPTOR_FIELD} {updated}개 갱신" + (" + 키워드 색인 / 출원번호 인덱스 재생성" if updated else ""))
@@ -3,27 +3,72 @@
 
 엔드포인트:
 - POST /chat/image    : 이미지 업로드 → 유사 디자인 10개 반환 (1단계)
+- POST /chat/images   : 한 제품의 여러 도면 업로드 → 유사 디자인 10개 반환 (1단계, 다중 도면 검색)
 - POST /chat/select   : 디자인 선택 → 상세비교 + 리포트 반환 (2단계)
+- POST /chat/select/batch : 디자인 여러 개 선택 → 일괄 상세비교 + 통합 리포트 반환 (2단계)
 - POST /chat/text     : 텍스트 질문 → LLM + Tools 답변 (멀티턴: thread_id 전달로 대화 유지)
-- GET  /health        : 서버 상태 확인
+- GET  /designs/{application_number} : 출원번호로 디자인 직접 조회
+- GET  /clusters/{cluster_id} : 유사 중복 클러스터에 묶인 도면 펼치기
+- GET  /threads/{thread_id}    : 대화 세션 메모리 사용량 조회
+- DELETE /threads/{thread_id}  : 대화 세션 삭제 (체크포인트 + 프리페치 캐시)
+- POST /bulk/jobs     : 여러 도면 일괄 FTO 검토 작업 등록 (백그라운드 처리, job_id 반환)
+- GET  /bulk/jobs/{job_id} : 일괄 검토 진행률
+- GET  /bulk/jobs/{job_id}/result : 일괄 검토 통합 결과 JSON 다운로드
+- GET  /health        : 서버 상태 확인 (프로세스 생존)
+- GET  /ready         : 워밍업 완료 여부 (로드밸런서 트래픽 투입 기준, 완료 전 503)
+- GET  /metrics       : Prometheus 형식 지연시간/호출 메트릭
+- GET  /admin/profiles[/{profile_id}] : 저장된 프로파일 목록/조회 (PROFILE_ADMIN_TOKEN 설정 시)
+- POST /admin/profile/sample : N초 동안 전체 스레드 샘플링 프로파일 (PROFILE_ADMIN_TOKEN 설정 시)
 
 실행: python api.py
 """
 
 import os
+import math
 import uuid
+import time
 import base64
+from typing import List
 
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
 import uvicorn
 
 from langgraph.types import Command
 
 # design_chatbot_v3에서 그래프와 유틸 가져오기
-from design_chatbot import graph, design_id_to_local_image
+from design_chatbot import (graph, design_id_to_local_image, parse_selection, MAX_VIEWS, image_collection,
+                            session_store, search_where)
+from utils import get_design_image_bytes, get_design_thumbnail_bytes
+
+# 업로드 이미지 저장소 (내용 해시 저장 + 메모리 캐시 + 청소)
+from upload_store import upload_store, UploadTooLargeError, InvalidImageError
+
+# 서버 시작 워밍업 (매니페스트/색인 로드 + CLIP/Chroma 첫 호출) + 준비 상태
+from warmup import warmup, default_steps
+
+# 출원번호 → 디자인 직접 조회
+from design_lookup import get_design_lookup
+
+# 유사 중복 도면 클러스터 (대표 도면 검색 시 묶인 도면 펼치기)
+from dedup_index import expand_cluster
+
+# 일괄 FTO 검토 작업 (SQLite 상태 저장 + 백그라운드 실행 스레드)
+from bulk_jobs import job_store, bulk_runner, BULK_MAX_FILES, BULK_MAX_TOTAL_BYTES, BULK_MAX_N_RESULTS, BULK_MAX_COMPARE_TOP
+
+# 지연시간 계측 (요청 ID, span, /metrics)
+from tracing import start_request, finish_request, get_request_id, render_metrics, HTTP_SECONDS
+
+# 운영 중 프로파일링 (PROFILE_ADMIN_TOKEN 설정 시만, 아니면 run_in_threadpool은 starlette 원본)
+from profiling import (run_in_threadpool, PROFILING_ENABLED, check_token, begin_request_profile,
+                       new_profile_id, save_request_profile, sample_stacks, list_profiles, load_profile)
+
+# LLM 호출 정책 예외 (서킷 열림 / 마감 시간 초과)
+from llm_policy import LLMUnavailableError
+
+# 요청 수용 제어 (동시 실행 상한 + 대기열 + 클라이언트별 요청 수 제한)
+from admission import LIMITERS, ENDPOINT_GROUPS, rate_limiter, client_key, AdmissionRejected
 
 
 # ==================== FastAPI 초기화 ====================
@@ -43,14 +88,204 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ./temp_uploads : 사용자가 업로드한 이미지를 임시 저장하는 폴더
-UPLOAD_DIR = "./temp_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# 요청 수용 제어 미들웨어 (비싼 엔드포인트만)
+# 클라이언트별 요청 수 초과 → 429, 대기열 가득 참/대기 시간 초과 → 503 (둘 다 Retry-After 헤더)
+# (트레이스 미들웨어보다 먼저 등록 → 트레이스가 바깥에서 거절된 요청도 기록)
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    group = ENDPOINT_GROUPS.get(request.url.path)
+    if group is None or request.method != "POST":
+        return await call_next(request)
+
+    key = client_key(request.client.host if request.client else None, request.headers.get("X-Client-ID"))
+    try:
+        rate_limiter.check(key, group)
+        async with LIMITERS[group].slot():
+            return await call_next(request)
+    except AdmissionRejected as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail},
+                            headers={"Retry-After": str(e.retry_after)})
+
+
+# 요청 단위 프로파일 미들웨어 (PROFILE_ADMIN_TOKEN이 있을 때만 등록 → 기본 경로는 추가 비용 없음)
+# X-Profile 헤더 값이 관리자 토큰과 같은 요청만 cProfile 측정, 응답 헤더 X-Profile-Id로 조회 ID 반환
+# (프로파일 ID는 서버에서 발급, 요청 ID는 요약 첫 줄에 기록 → 트레이스와 연결)
+if PROFILING_ENABLED:
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        if not check_token(request.headers.get("X-Profile")):
+            return await call_next(request)
+
+        profiles = begin_request_profile()
+        start = time.perf_counter()
+        response = await call_next(request)
+        profile_id = new_profile_id()
+        label = f"{request.method} {request.url.path} → {response.status_code} (요청 ID {get_request_id()})"
+        saved = await run_in_threadpool(save_request_profile, profile_id, profiles, time.perf_counter() - start, label)
+        if saved:
+            response.headers["X-Profile-Id"] = profile_id
+        return response
+
+
+# 요청 ID + 요청 단위 트레이스 미들웨어
+# 클라이언트가 X-Request-ID를 보내면 그대로 사용, 없으면 새로 발급해 응답 헤더로 반환
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    request_id = start_request(request.headers.get("X-Request-ID"))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        seconds = time.perf_counter() - start
+        # 경로는 라우트 템플릿 기준 (예: /designs/{application_number}) → 라벨 수 제한
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_SECONDS.observe(seconds, method=request.method, path=path, status=status)
+        if path != "/metrics":
+            finish_request(method=request.method, path=path, status=status, ms=round(seconds * 1000, 2))
+
+
+@app.on_event("startup")
+def start_upload_janitor():
+    """업로드 폴더 청소 스레드 시작 (TTL/용량 기준으로 temp_uploads 정리)"""
+    upload_store.start_janitor()
+
+
+@app.on_event("startup")
+def start_warmup():
+    """
+    워밍업 시작 (백그라운드): 매니페스트/키워드 색인/출원번호 인덱스 로드 → CLIP 배치 임베딩 → Chroma 질의
+    서버는 바로 요청을 받고, 끝나기 전까지 /ready는 503 (warmup.py)
+    """
+    warmup.start(default_steps(image_collection, where=search_where))
+
+
+@app.on_event("startup")
+def start_bulk_runner():
+    """일괄 검토 작업 실행 스레드 시작 (재시작 전에 끝나지 않은 작업도 이어서 처리)"""
+    bulk_runner.start()
+
+
+@app.on_event("shutdown")
+def stop_upload_janitor():
+    upload_store.stop_janitor()
+
+
+@app.on_event("shutdown")
+def stop_bulk_runner():
+    bulk_runner.stop()
 
 
 
 # ==================== API 엔드포인트 ====================
 
+def _error_response(error: Exception, message: str) -> HTTPException:
+    """
+    엔드포인트 예외 → HTTPException
+    LLM 일시 장애(서킷 열림 503 / 마감 시간 초과 504)는 500과 구분해 Retry-After와 함께 반환
+    """
+    if isinstance(error, LLMUnavailableError):
+        headers = {"Retry-After": str(math.ceil(error.retry_after))} if error.retry_after else None
+        return HTTPException(status_code=error.status_code, detail=f"{message}: {str(error)}", headers=headers)
+    return HTTPException(status_code=500, detail=f"{message}: {str(error)}")
+
+
+def _store_upload(contents: bytes) -> str:
+    """
+    업로드 이미지 검증 + 저장 (내용 해시 파일명, 같은 이미지는 1회만 저장)
+    디코딩된 이미지는 메모리에 남아 그래프 노드들이 재사용
+
+    Returns:
+        str: 저장된 이미지 경로
+    """
+    try:
+        return upload_store.save(contents).path
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _require_session(thread_id: str):
+    """interrupt 재개 전 세션 확인 (만료/삭제된 세션이면 404 → 1단계부터 다시)"""
+    if not session_store.has(thread_id):
+        raise HTTPException(status_code=404, detail="세션이 만료되었거나 없습니다. 이미지를 다시 업로드하세요.")
+
+
+def _run_image_search(image_path: str, image_paths: list, user_query: str) -> dict:
+    """
+    이미지 경로 → 그래프 실행(interrupt까지) → 1단계 응답 구성 (/chat/image, /chat/images 공용)
+    """
+    # 세션 ID 생성 (interrupt 재개용)
+    thread_id = str(uuid.uuid4())
+    config = {"configurable": {"thread_id": thread_id}}
+
+    # 초기 상태
+    initial_state = {
+        "input_type": "",
+        "image_path": image_path,
+        "image_paths": image_paths,
+        "text_query": "",
+        "user_query": user_query,
+        "base64_image": "",
+        "image_hash": "",
+        "input_analysis": "",
+        "search_results": {},
+        "comparison_results": [],
+        "selected_index": 0,
+        "selected_indices": [],
+        "detailed_comparison": "",
+        "detailed_comparisons": [],
+        "final_report": "",
+        "general_answer": "",
+        "messages": [],
+    }
+
+    # 그래프 실행 → show_results_node의 interrupt에서 멈춤
+    # 선택 대기 중에는 업로드 청소에서 제외 (세션이 삭제되면 session_store가 unpin)
+    upload_store.pin(thread_id, [image_path, *image_paths])
+    try:
+        result = graph.invoke(initial_state, config)
+    except Exception:
+        if not session_store.has(thread_id):
+            upload_store.unpin(thread_id)
+        raise
+
+    # 유사 디자인 목록 구성 (이미지 base64 포함)
+    similar_designs = []
+    for comp in result.get('comparison_results', []):
+        # 이미지를 base64로 인코딩 (이미지 샤드가 있으면 mmap에서, 없으면 파일에서)
+        image_base64 = None
+        image_bytes = get_design_image_bytes(comp['design_id'])
+        if image_bytes is not None:
+            image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+
+        similar_designs.append({
+            "index": comp['index'],
+            "application_number": comp['application_number'],
+            "article_name": comp['article_name'],
+            "admst_stat": comp['admst_stat'],
+            "distance": comp['distance'],
+            "matched_region": comp.get('matched_region'),  # 부분(영역) 검색으로 찾은 경우 일치한 영역, 전역 일치면 None
+            "cluster_id": comp.get('cluster_id'),          # 유사 중복 클러스터 → GET /clusters/{cluster_id}로 묶인 도면 조회
+            "cluster_size": comp.get('cluster_size', 1),
+            "image_base64": image_base64,
+        })
+
+    return {
+        "success": True,
+        "thread_id": thread_id,  # 2단계에서 필요
+        "input_analysis": result.get('input_analysis', ''),
+        "similar_designs": similar_designs,
+        "message": "상세 비교할 디자인 번호를 선택하세요 (POST /chat/select)"
+    }
+
+
 @app.post("/chat/image")
 async def chat_image(
     image: UploadFile = File(...),
@@ -63,76 +298,39 @@ async def chat_image(
     사용자가 선택 후 /chat/select로 2단계 요청.
     """
     try:
-        # 사용자가 입력한 이미지 저장
-        image_path = os.path.join(UPLOAD_DIR, image.filename)
-        contents = await image.read()
-        with open(image_path, "wb") as f:
-            f.write(contents)
-
-        # 이미지 유효성 검증
-        try:
-            img = Image.open(image_path)
-            img.verify()
-        except Exception:
-            raise HTTPException(status_code=400, detail="유효하지 않은 이미지입니다.")
-
-        # 세션 ID 생성 (interrupt 재개용)
-        thread_id = str(uuid.uuid4())
-        config = {"configurable": {"thread_id": thread_id}}
+        # 그래프 실행(VLM/CLIP/검색)은 스레드 풀에서 → 이벤트 루프를 막지 않음 (다른 요청/대기열 처리 가능)
+        image_path = await run_in_threadpool(_store_upload, await image.read())
+        return JSONResponse(content=await run_in_threadpool(_run_image_search, image_path, [], user_query))
 
-        # 초기 상태
-        initial_state = {
-            "input_type": "",
-            "image_path": image_path,
-            "text_query": "",
-            "user_query": user_query,
-            "base64_image": "",
-            "input_analysis": "",
-            "search_results": {},
-            "comparison_results": [],
-            "selected_index": 0,
-            "detailed_comparison": "",
-            "final_report": "",
-            "general_answer": "",
-            "messages": [],
-        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_response(e, "분석 중 오류")
 
-        # 그래프 실행 → show_results_node의 interrupt에서 멈춤
-        result = graph.invoke(initial_state, config)
 
-        # 유사 디자인 목록 구성 (이미지 base64 포함)
-        similar_designs = []
-        for comp in result.get('comparison_results', []):
-            # 이미지를 base64로 인코딩
-            image_base64 = None
-            if comp.get('image_path') and os.path.exists(comp['image_path']):
-                try:
-                    with open(comp['image_path'], 'rb') as f:
-                        image_base64 = base64.b64encode(f.read()).decode('utf-8')
-                except Exception:
-                    pass
-
-            similar_designs.append({
-                "index": comp['index'],
-                "application_number": comp['application_number'],
-                "article_name": comp['article_name'],
-                "admst_stat": comp['admst_stat'],
-                "distance": comp['distance'],
-                "image_base64": image_base64,
-            })
+@app.post("/chat/images")
+async def chat_images(
+    images: List[UploadFile] = File(...),
+    user_query: str = Form("이 제품과 유사한 디자인을 분석해줘")
+):
+    """
+    1단계(다중 도면): 한 제품의 여러 도면(정면/측면/평면 등) 업로드 → 유사 디자인 10개 반환
 
-        return JSONResponse(content={
-            "success": True,
-            "thread_id": thread_id,  # 2단계에서 필요
-            "input_analysis": result.get('input_analysis', ''),
-            "similar_designs": similar_designs,
-            "message": "상세 비교할 디자인 번호를 선택하세요 (POST /chat/select)"
-        })
+    모든 도면을 CLIP으로 한 번에 임베딩하고, 한 번의 벡터 검색 후 출원번호별로 점수를 합산(fusion).
+    VLM 형상 분석/상세 비교는 첫 번째 도면(대표 도면) 기준.
+    이후 흐름은 /chat/image와 동일 (/chat/select 또는 /chat/select/batch).
+    """
+    if len(images) > MAX_VIEWS:
+        raise HTTPException(status_code=400, detail=f"도면은 최대 {MAX_VIEWS}장까지 업로드할 수 있습니다.")
+
+    try:
+        image_paths = [await run_in_threadpool(_store_upload, await image.read()) for image in images]
+        return JSONResponse(content=await run_in_threadpool(_run_image_search, image_paths[0], image_paths, user_query))
 
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"분석 중 오류: {str(e)}")
+        raise _error_response(e, "분석 중 오류")
 
 
 @app.post("/chat/select")
@@ -146,11 +344,14 @@ async def chat_select(
     /chat/image에서 받은 thread_id & 선택 번호를 전달하면,
     interrupt 이후 그래프가 재개되어 상세비교 → 리포트 생성.
     """
+    _require_session(thread_id)
+
     try:
         config = {"configurable": {"thread_id": thread_id}}
 
         # interrupt 재개: 선택한 번호 전달
-        result = graph.invoke(Command(resume=str(selected_index)), config)
+        result = await run_in_threadpool(graph.invoke, Command(resume=str(selected_index)), config)
+        session_store.mark_finished(thread_id)  # 리포트까지 끝남 → 짧은 TTL 후 정리
 
         return JSONResponse(content={
             "success": True,
@@ -159,7 +360,45 @@ async def chat_select(
         })
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"분석 중 오류: {str(e)}")
+        _require_session(thread_id)  # 처리 도중 세션이 삭제(LRU/TTL)된 경우도 404
+        raise _error_response(e, "분석 중 오류")
+
+
+@app.post("/chat/select/batch")
+async def chat_select_batch(
+    thread_id: str = Form(...),
+    selected_indices: str = Form(...)  # 쉼표로 구분된 번호 목록, 예: "1,3,5"
+):
+    """
+    2단계(일괄): 디자인 여러 개 선택 → 디자인별 상세비교 + 통합 리포트 반환
+
+    입력 이미지 분석/임베딩은 1단계 결과(thread state)를 그대로 재사용하고,
+    VLM 비교만 동시성 제한(COMPARE_MAX_CONCURRENCY) 안에서 병렬 실행.
+    """
+    try:
+        indices = parse_selection(selected_indices)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    _require_session(thread_id)
+
+    try:
+        config = {"configurable": {"thread_id": thread_id}}
+
+        # interrupt 재개: 선택한 번호 목록 전달
+        result = await run_in_threadpool(graph.invoke, Command(resume=indices), config)
+        session_store.mark_finished(thread_id)
+
+        return JSONResponse(content={
+            "success": True,
+            "selected_indices": indices,
+            "detailed_comparisons": result.get('detailed_comparisons', []),
+            "final_report": result.get('final_report', ''),
+        })
+
+    except Exception as e:
+        _require_session(thread_id)
+        raise _error_response(e, "분석 중 오류")
 
 
 @app.post("/chat/text")
@@ -172,7 +411,11 @@ async def chat_text(
 
     - 첫 요청: thread_id 없이 전송 → 새 thread_id 발급
     - 이후 요청: 응답받은 thread_id를 함께 전송 → 대화 히스토리 유지
+      (만료/삭제된 thread_id면 404 → thread_id 없이 새 대화로 다시)
     """
+    if thread_id is not None and not session_store.has(thread_id):
+        raise HTTPException(status_code=404, detail="대화가 만료되었거나 없습니다. thread_id 없이 새 대화를 시작하세요.")
+
     try:
         is_new = thread_id is None
         thread_id = thread_id or str(uuid.uuid4())
@@ -192,20 +435,24 @@ async def chat_text(
         initial_state = {
             "input_type": "",
             "image_path": "",
+            "image_paths": [],
             "text_query": text_query,
             "user_query": text_query,
             "base64_image": "",
+            "image_hash": "",
             "input_analysis": "",
             "search_results": {},
             "comparison_results": [],
             "selected_index": 0,
+            "selected_indices": [],
             "detailed_comparison": "",
+            "detailed_comparisons": [],
             "final_report": "",
             "general_answer": "",
             "messages": messages_history,  # 이전 히스토리 전달
         }
 
-        result = graph.invoke(initial_state, config)
+        result = await run_in_threadpool(graph.invoke, initial_state, config)
 
         return JSONResponse(content={
             "success": True,
@@ -215,13 +462,239 @@ async def chat_text(
         })
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"답변 중 오류: {str(e)}")
+        raise _error_response(e, "답변 중 오류")
+
+
+@app.get("/designs/{application_number}")
+async def get_design(application_number: str, include_images: bool = False):
+    """
+    출원번호로 디자인 직접 조회 (임베딩/벡터 검색 없음)
+
+    - 메타데이터 + 모든 도면(design_id, 썸네일 base64)
+    - include_images=true: 원본 도면 base64도 포함
+    """
+    entry = get_design_lookup(image_collection).get(application_number)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"출원번호 {application_number}에 해당하는 디자인이 없습니다.")
+
+    drawings = []
+    for design_id in entry['design_ids']:
+        thumbnail = get_design_thumbnail_bytes(design_id)
+        drawing = {
+            "design_id": design_id,
+            "thumbnail_base64": base64.b64encode(thumbnail).decode('utf-8') if thumbnail is not None else None,
+        }
+        if include_images:
+            image_bytes = get_design_image_bytes(design_id)
+            drawing["image_base64"] = base64.b64encode(image_bytes).decode('utf-8') if image_bytes is not None else None
+        drawings.append(drawing)
+
+    return JSONResponse(content={
+        "success": True,
+        "application_number": application_number,
+        "metadata": entry['metadata'],
+        "drawings": drawings,
+    })
+
+
+@app.get("/clusters/{cluster_id}")
+async def get_cluster(cluster_id: str):
+    """
+    유사 중복 클러스터 펼치기 (검색 결과의 cluster_id, dedup_index.py build 필요)
+
+    - 대표 도면 검색(DESIGN_DEDUP_SEARCH=1)에서 하나로 묶여 보인 도면 전체 (대표 도면이 맨 앞)
+    """
+    members = await run_in_threadpool(expand_cluster, image_collection, cluster_id)
+    if not members:
+        raise HTTPException(status_code=404, detail=f"클러스터 {cluster_id}가 없습니다.")
+
+    drawings = []
+    for design_id, metadata in members:
+        thumbnail = get_design_thumbnail_bytes(design_id)
+        drawings.append({
+            "design_id": design_id,
+            "application_number": metadata.get('applicationNumber', 'N/A'),
+            "article_name": metadata.get('articleName', 'N/A'),
+            "is_representative": bool(metadata.get('is_representative')),
+            "thumbnail_base64": base64.b64encode(thumbnail).decode('utf-8') if thumbnail is not None else None,
+        })
+
+    return JSONResponse(content={"success": True, "cluster_id": cluster_id, "drawings": drawings})
+
+
+@app.get("/threads/{thread_id}")
+async def get_thread(thread_id: str):
+    """대화 세션 메모리 사용량 (체크포인트 직렬화 바이트)"""
+    size = session_store.thread_bytes(thread_id)
+    if size is None:
+        raise HTTPException(status_code=404, detail=f"세션 {thread_id}가 없습니다.")
+    return {"success": True, "thread_id": thread_id, "bytes": size}
+
+
+@app.delete("/threads/{thread_id}")
+async def delete_thread(thread_id: str):
+    """
+    대화 세션 삭제 (체크포인트 + 프리페치 캐시)
+
+    클라이언트가 대화를 끝낼 때 호출하면 유휴 TTL(SESSION_IDLE_TTL_SECONDS)을 기다리지 않고 바로 정리
+    """
+    freed = await run_in_threadpool(session_store.delete, thread_id)
+    if freed is None:
+        raise HTTPException(status_code=404, detail=f"세션 {thread_id}가 없습니다.")
+    return {"success": True, "thread_id": thread_id, "freed_bytes": freed}
+
+
+@app.post("/bulk/jobs")
+async def create_bulk_job(
+    files: List[UploadFile] = File(...),
+    n_results: int = Form(10),
+    compare_top: int = Form(0),  # 도면별로 상위 몇 개 디자인까지 상세 비교할지 (0이면 검색 + 형상 분석만)
+):
+    """
+    여러 도면 일괄 FTO 검토 작업 등록 → job_id 반환 (처리는 백그라운드)
+
+    도면마다 유사 디자인 검색 + VLM 형상 분석 (+ 상위 compare_top개 상세 비교).
+    진행률은 GET /bulk/jobs/{job_id}, 완료 후 결과는 GET /bulk/jobs/{job_id}/result.
+    """
+    if len(files) > BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"도면은 최대 {BULK_MAX_FILES}장까지 등록할 수 있습니다.")
+    if not 1 <= n_results <= BULK_MAX_N_RESULTS:
+        raise HTTPException(status_code=400, detail=f"n_results는 1~{BULK_MAX_N_RESULTS} 사이여야 합니다.")
+    if not 0 <= compare_top <= min(n_results, BULK_MAX_COMPARE_TOP):
+        raise HTTPException(status_code=400, detail=f"compare_top은 0~{min(n_results, BULK_MAX_COMPARE_TOP)} 사이여야 합니다.")
+
+    # 등록 시점에 전부 검증 → 잘못된 파일이 있으면 작업을 만들지 않음
+    # 검증한 도면은 바로 작업 폴더에 저장 → 요청 전체를 메모리에 모으지 않음
+    job_id = await run_in_threadpool(job_store.begin)
+    items, total_bytes = [], 0
+    try:
+        for idx, file in enumerate(files):
+            contents = await file.read()
+            await file.close()
+            total_bytes += len(contents)
+            if total_bytes > BULK_MAX_TOTAL_BYTES:
+                raise HTTPException(status_code=413,
+                                    detail=f"업로드 합계가 {BULK_MAX_TOTAL_BYTES // (1024 * 1024)}MB를 넘습니다.")
+            try:
+                image = await run_in_threadpool(upload_store.validate, contents)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=f"{file.filename}: {e}")
+            except InvalidImageError as e:
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+            ext = f".{(image.format or 'img').lower()}"
+            items.append(await run_in_threadpool(job_store.add_item, job_id, idx, file.filename or "", contents, ext))
+            del contents, image
+
+        await run_in_threadpool(job_store.commit, job_id, items, {"n_results": n_results, "compare_top": compare_top})
+    except Exception:
+        await run_in_threadpool(job_store.discard, job_id)
+        raise
+    bulk_runner.notify()
+
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job_id,
+        "total": len(items),
+        "message": "진행률은 GET /bulk/jobs/{job_id}, 완료 후 결과는 GET /bulk/jobs/{job_id}/result",
+    })
+
+
+@app.get("/bulk/jobs/{job_id}")
+async def get_bulk_job(job_id: str):
+    """일괄 검토 진행률 (status: queued/running/done/failed)"""
+    progress = await run_in_threadpool(job_store.progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"작업 {job_id}가 없습니다.")
+    return JSONResponse(content={"success": True, **progress})
+
+
+@app.get("/bulk/jobs/{job_id}/result")
+async def get_bulk_job_result(job_id: str):
+    """
+    일괄 검토 통합 결과 JSON (파일 다운로드)
+
+    - 도면별 검색 결과 + 형상 분석 + 상세 비교 (업로드 순서)
+    - 작업이 끝나기 전에는 409
+    """
+    progress = await run_in_threadpool(job_store.progress, job_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail=f"작업 {job_id}가 없습니다.")
+    if progress["status"] not in ("done", "failed"):
+        raise HTTPException(status_code=409, detail=f"작업이 아직 끝나지 않았습니다. ({progress['done'] + progress['failed']}/{progress['total']})")
+
+    items = await run_in_threadpool(job_store.results, job_id)
+    return JSONResponse(
+        content={"success": True, **progress, "items": items},
+        headers={"Content-Disposition": f'attachment; filename="bulk_{job_id}.json"'},
+    )
 
 
 @app.get("/health")
 async def health():
-    """서버 상태 확인"""
-    return {"status": "healthy", "service": "디자인 챗봇 v3"}
+    """서버 상태 확인 (생존 확인용 → 워밍업 상태는 표시만, 워밍업이 실패해도 200)"""
+    return {"status": "healthy", "service": "디자인 챗봇 v3", "warmup": warmup.status}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    준비 상태 확인 (워밍업 완료 후 200, 그 전/실패 시 503)
+
+    로드밸런서/오케스트레이터의 readiness probe로 사용 → 콜드 워커에 트래픽이 가지 않음
+    """
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.snapshot())
+
+
+def _require_admin(request: Request):
+    """관리자 토큰 확인 (프로파일링 비활성 또는 토큰 불일치 → 404, 엔드포인트 존재를 드러내지 않음)"""
+    if not check_token(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/admin/profiles")
+async def get_profiles(request: Request):
+    """저장된 프로파일 목록 (요청 단위 cProfile / 구간 샘플링, 최근 순)"""
+    _require_admin(request)
+    return {"success": True, "profiles": await run_in_threadpool(list_profiles)}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, raw: bool = False):
+    """
+    프로파일 조회
+
+    - 기본: 요약 텍스트 (요청 프로파일은 누적 시간 상위 함수, 샘플링은 folded 스택)
+    - raw=true: 원본 파일 다운로드 (.prof → snakeviz, .folded → flamegraph/speedscope)
+    """
+    _require_admin(request)
+    result = await run_in_threadpool(load_profile, profile_id, raw)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"프로파일 {profile_id}가 없습니다.")
+    if raw:
+        return FileResponse(result, filename=os.path.basename(result))
+    return PlainTextResponse(result)
+
+
+@app.post("/admin/profile/sample")
+async def sample_profile(request: Request, seconds: float = Form(10.0), interval: float = Form(0.005)):
+    """
+    seconds초 동안 서버 전체 스레드 스택 샘플링 (최대 60초, 한 번에 1개)
+
+    운영 트래픽이 흐르는 동안 호출 → 함수별 포함/자체 샘플 수 상위 목록 + folded 파일
+    """
+    _require_admin(request)
+    if interval <= 0:
+        raise HTTPException(status_code=400, detail="interval은 0보다 커야 합니다.")
+    result = await run_in_threadpool(sample_stacks, seconds, interval)
+    if result is None:
+        raise HTTPException(status_code=409, detail="다른 샘플링이 실행 중입니다.")
+    return {"success": True, **result}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 형식 메트릭 (노드/LLM/CLIP/Chroma 구간별 지연시간 히스토그램, 토큰 사용량 등)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 # ==================== 서버 실행 ====================
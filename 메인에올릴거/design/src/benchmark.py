@@ -0,0 +1,434 @@
+"""
+오프라인 성능 벤치마크
+
+GPT-4o / Tavily / ChromaDB를 가짜(fakes.py)로 바꾸고, 실제 CLIP 모델과 실제 그래프/API 코드로
+파이프라인 성능을 측정합니다. API 키가 필요 없고 비용이 들지 않습니다.
+
+측정 항목:
+1. clip: CLIP 이미지 임베딩 처리량 (images/s)
+2. search: 코퍼스 크기별 벡터 검색(search_and_filter_similar_designs) 지연시간
+3. api: /chat/image, /chat/text 동시 요청 부하에서 p50/p99 지연시간
+4. memory: 세션(thread) 1개당 메모리 증가량
+5. compare: 상세 비교 방식별 지연시간/토큰/예상 비용
+   (image: 두 이미지 비교, reference: 두 이미지 + 미리 계산한 분석, text: 분석 텍스트끼리 비교)
+
+결과는 JSON으로 저장되어, 코드 변경 전후를 비교할 수 있습니다.
+
+사용법:
+    python benchmark.py                                   # 전체 측정 → bench_results/<시각>.json
+    python benchmark.py --only search --corpus-sizes 1000 10000 100000
+    python benchmark.py --llm-latency 1.5 --concurrency 8 --requests 64
+    python benchmark.py --only api --llm-error-rate 0.1 --llm-stall-rate 0.05   # LLM 장애 주입
+    python benchmark.py --only compare --compares 50                            # 상세 비교 방식 비교
+    python benchmark.py --compare bench_results/a.json bench_results/b.json
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ==================== 통계 도우미 ====================
+
+def percentile(values, q):
+    """q 분위수 (0~100, 선형 보간)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(seconds):
+    """지연시간 목록(초) → ms 단위 요약"""
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3) if ms else None,
+        "p50_ms": round(percentile(ms, 50), 3) if ms else None,
+        "p90_ms": round(percentile(ms, 90), 3) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 3) if ms else None,
+        "max_ms": round(max(ms), 3) if ms else None,
+    }
+
+
+def rss_bytes():
+    """현재 프로세스 RSS (Linux: /proc, 그 외: 최대 RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+# ==================== 측정 ====================
+
+def bench_clip(n_images):
+    """CLIP 이미지 임베딩 처리량"""
+    from PIL import Image
+    import io
+    from fakes import synthetic_image_bytes
+    from utils import get_image_embedding
+
+    images = [Image.open(io.BytesIO(synthetic_image_bytes(seed=i))) for i in range(n_images)]
+    for image in images:
+        image.load()
+
+    get_image_embedding(images[0])  # 첫 forward 오버헤드 제외
+    timings = []
+    start = time.perf_counter()
+    for image in images:
+        t0 = time.perf_counter()
+        get_image_embedding(image)
+        timings.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    return {"images": n_images, "images_per_s": round(n_images / total, 2), **summarize(timings)}
+
+
+def bench_search(client, corpus_sizes, n_queries, n_results=10):
+    """코퍼스 크기별 벡터 검색 지연시간"""
+    import numpy as np
+    from fakes import build_synthetic_collection
+    from utils import search_and_filter_similar_designs
+
+    rng = np.random.default_rng(1)
+    results = {}
+    for size in corpus_sizes:
+        t0 = time.perf_counter()
+        collection = build_synthetic_collection(client, f"bench_{size}", size)
+        build_s = time.perf_counter() - t0
+
+        queries = rng.standard_normal((n_queries + 1, 512)).astype("float32")
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        search_and_filter_similar_designs(collection, queries[0].tolist(), n_results)  # 인덱스 로드 제외
+
+        timings = []
+        for query in queries[1:]:
+            t0 = time.perf_counter()
+            search_and_filter_similar_designs(collection, query.tolist(), n_results)
+            timings.append(time.perf_counter() - t0)
+
+        results[str(size)] = {"build_s": round(build_s, 2), **summarize(timings)}
+        client.delete_collection(f"bench_{size}")
+        print(f"  search[{size}] p50={results[str(size)]['p50_ms']}ms p99={results[str(size)]['p99_ms']}ms")
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(app):
+    """uvicorn을 백그라운드 스레드로 실행"""
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def _load(fn, n_requests, concurrency):
+    """fn을 동시 concurrency개로 n_requests번 실행 → 지연시간/처리량"""
+    timings, errors = [], 0
+
+    def one(i):
+        t0 = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(one, i) for i in range(n_requests)]
+        for future in futures:
+            try:
+                timings.append(future.result())
+            except Exception:
+                errors += 1
+    total = time.perf_counter() - start
+    return {"concurrency": concurrency, "errors": errors,
+            "throughput_rps": round(n_requests / total, 2), **summarize(timings)}
+
+
+def bench_api(app, n_requests, concurrency):
+    """/chat/image, /chat/text 동시 부하 지연시간"""
+    import requests
+    from fakes import synthetic_image_bytes
+
+    server, thread, base_url = _start_server(app)
+    images = [synthetic_image_bytes(seed=100 + i) for i in range(n_requests)]
+
+    # 워밍업(/ready)이 끝난 뒤 측정 → 첫 요청의 콜드 비용이 지연시간 분포에 섞이지 않음
+    t0 = time.perf_counter()
+    while requests.get(f"{base_url}/ready", timeout=10).status_code != 200:
+        if time.perf_counter() - t0 > 300:
+            raise RuntimeError("워밍업이 끝나지 않았습니다. (/ready)")
+        time.sleep(0.1)
+    ready_s = time.perf_counter() - t0
+
+    def chat_image(i):
+        r = requests.post(f"{base_url}/chat/image",
+                          files={"image": (f"bench_{i}.jpg", images[i], "image/jpeg")}, timeout=300)
+        r.raise_for_status()
+
+    def chat_text(i):
+        r = requests.post(f"{base_url}/chat/text", data={"text_query": f"디자인 특허 질문 {i}"}, timeout=300)
+        r.raise_for_status()
+
+    try:
+        results = {
+            "ready_s": round(ready_s, 2),
+            "chat_image": _load(chat_image, n_requests, concurrency),
+            "chat_text": _load(chat_text, n_requests, concurrency),
+        }
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+    print(f"  워밍업 {results['ready_s']}초")
+    for name, r in results.items():
+        if not isinstance(r, dict):
+            continue
+        print(f"  {name}: p50={r['p50_ms']}ms p99={r['p99_ms']}ms ({r['throughput_rps']} req/s, 오류 {r['errors']})")
+    return results
+
+
+def bench_memory(graph, n_threads, sessions=None):
+    """
+    세션(thread_id) 1개당 메모리 증가량 (텍스트 경로, 체크포인터에 남는 상태 포함)
+
+    sessions: 세션 저장소 (session_store.BoundedMemorySaver) → 체크포인터 직렬화 바이트도 함께 기록
+    """
+    def run(i):
+        config = {"configurable": {"thread_id": f"bench-mem-{i}"}}
+        graph.invoke({
+            "input_type": "", "image_path": "", "image_paths": [],
+            "text_query": f"질문 {i}", "user_query": f"질문 {i}",
+            "base64_image": "", "image_hash": "", "input_analysis": "", "search_results": {},
+            "comparison_results": [], "selected_index": 0, "selected_indices": [],
+            "detailed_comparison": "", "detailed_comparisons": [], "final_report": "",
+            "general_answer": "", "messages": [],
+        }, config)
+
+    run(-1)  # 초기화 비용 제외
+    gc.collect()
+    before = rss_bytes()
+    for i in range(n_threads):
+        run(i)
+    gc.collect()
+    after = rss_bytes()
+    result = {
+        "threads": n_threads,
+        "rss_before_mb": round(before / 1024 / 1024, 1),
+        "rss_after_mb": round(after / 1024 / 1024, 1),
+        "bytes_per_thread": round((after - before) / n_threads),
+    }
+    if sessions is not None:
+        stats = sessions.stats()
+        result["session_bytes_per_thread"] = round(stats["bytes"] / max(1, stats["sessions"]))
+        result["sessions_kept"] = stats["sessions"]   # 상한(SESSION_MAX_THREADS)을 넘으면 LRU로 삭제됨
+    return result
+
+
+# GPT-4o 1M 토큰당 가격 (USD, 공시 가격 기준 - 변경 시 수정)
+GPT4O_PRICE_PER_1M = {"prompt": 2.50, "completion": 10.00}
+
+
+def bench_compare(design_chatbot, n_compares):
+    """
+    상세 비교 방식별 지연시간 + 호출 1건당 토큰/예상 비용
+
+    - image: 두 이미지 비교 (비교 대상 분석 없음, IMAGE_COMPARISON_PROMPT)
+    - reference: 두 이미지 + 미리 계산한 비교 대상 분석 (IMAGE_REFERENCE_COMPARISON_PROMPT)
+    - text: 미리 계산한 분석 텍스트끼리 비교, 이미지 없음 (TEXT_COMPARISON_PROMPT)
+    비교 캐시를 타지 않도록 입력 이미지 해시는 비워 둔다.
+    """
+    from fakes import synthetic_image_bytes, synthetic_design_id, _FAKE_ANALYSIS
+    from image_preprocess import to_vlm_data_url
+    from analysis_schema import compact_analysis
+    from tracing import LLM_TOKENS
+
+    model = design_chatbot.llm.model_name
+    analysis = compact_analysis(_FAKE_ANALYSIS)
+    state = {
+        "image_hash": "",
+        "base64_image": to_vlm_data_url(synthetic_image_bytes(seed=11)),
+        "input_analysis": analysis,
+    }
+
+    # 앞 절반: 분석 없음 (image), 뒤 절반: 분석 저장 (reference / text)
+    plain = [{"design_id": synthetic_design_id(i)} for i in range(n_compares)]
+    stored = [{"design_id": synthetic_design_id(n_compares + i)} for i in range(n_compares)]
+    for target in stored:
+        design_chatbot.analysis_store.put(target["design_id"], design_chatbot.ANALYSIS_PROMPT_VERSION, model, analysis)
+
+    results = {}
+    for mode, targets, comparison_mode in (("image", plain, "image"), ("reference", stored, "image"),
+                                           ("text", stored, "text")):
+        design_chatbot.COMPARISON_MODE = comparison_mode
+        before = {kind: LLM_TOKENS.value(model=model, type=kind) for kind in GPT4O_PRICE_PER_1M}
+        timings = []
+        for target in targets:
+            t0 = time.perf_counter()
+            design_chatbot.compare_with_design(state, target)
+            timings.append(time.perf_counter() - t0)
+        tokens = {kind: (LLM_TOKENS.value(model=model, type=kind) - before[kind]) / len(targets)
+                  for kind in GPT4O_PRICE_PER_1M}
+        cost = sum(tokens[kind] * GPT4O_PRICE_PER_1M[kind] / 1e6 for kind in tokens)
+        results[mode] = {
+            **summarize(timings),
+            "prompt_tokens_per_call": round(tokens["prompt"], 1),
+            "completion_tokens_per_call": round(tokens["completion"], 1),
+            "usd_per_1000_calls": round(cost * 1000, 4),
+        }
+        r = results[mode]
+        print(f"  {mode}: p50={r['p50_ms']}ms, 토큰 {r['prompt_tokens_per_call']}+{r['completion_tokens_per_call']}/건, "
+              f"${r['usd_per_1000_calls']}/1000건")
+    design_chatbot.COMPARISON_MODE = "image"
+    return results
+
+
+# ==================== 리포트 ====================
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare_reports(old_path, new_path):
+    """두 벤치마크 JSON의 *_ms / throughput 지표 비교 출력"""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)["results"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+
+    def walk(a, b, prefix=""):
+        for key in sorted(set(a) & set(b)):
+            va, vb = a[key], b[key]
+            name = f"{prefix}{key}"
+            if isinstance(va, dict) and isinstance(vb, dict):
+                walk(va, vb, name + ".")
+            elif isinstance(va, (int, float)) and isinstance(vb, (int, float)) and \
+                    (key.endswith("_ms") or key.endswith("_s") or key.endswith("_rps") or key.startswith("bytes")
+                     or key.endswith("_per_call") or key.startswith("usd")):
+                change = (vb - va) / va * 100 if va else 0.0
+                print(f"{name:45s} {va:>12} → {vb:>12}  ({change:+.1f}%)")
+
+    walk(old, new)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="디자인 챗봇 오프라인 벤치마크")
+    parser.add_argument("--only", nargs="*", choices=["clip", "search", "api", "memory", "compare"],
+                        help="측정 항목 선택 (기본: 전체)")
+    parser.add_argument("--corpus-size", type=int, default=5000, help="그래프/API용 합성 컬렉션 크기")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="검색 지연 측정용 코퍼스 크기 목록")
+    parser.add_argument("--queries", type=int, default=200, help="코퍼스별 검색 횟수")
+    parser.add_argument("--clip-images", type=int, default=32, help="CLIP 처리량 측정 이미지 수")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="가짜 LLM 호출 지연(초)")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="가짜 LLM 지연 편차(초)")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="가짜 웹 검색 지연(초)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="가짜 LLM 429 오류 비율 (재시도 확인용)")
+    parser.add_argument("--llm-stall-rate", type=float, default=0.0, help="가짜 LLM 긴 지연 비율 (헤징 확인용)")
+    parser.add_argument("--llm-stall", type=float, default=10.0, help="긴 지연 시간(초)")
+    parser.add_argument("--requests", type=int, default=32, help="API 엔드포인트별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="API 동시 요청 수")
+    parser.add_argument("--memory-threads", type=int, default=200, help="메모리 측정 세션 수")
+    parser.add_argument("--compares", type=int, default=30, help="상세 비교 방식별 호출 수")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본: bench_results/<시각>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="두 결과 JSON 비교")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    only = set(args.only or ["clip", "search", "api", "memory", "compare"])
+
+    # 벤치마크 부산물(업로드/비교 캐시)이 실제 데이터와 섞이지 않도록 임시 폴더 사용
+    workdir = tempfile.mkdtemp(prefix="design_bench_")
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(workdir, "uploads"))
+    os.environ.setdefault("COMPARISON_CACHE_PATH", os.path.join(workdir, "comparison_cache.sqlite3"))
+    os.environ.setdefault("DESIGN_ANALYSIS_PATH", os.path.join(workdir, "design_analyses.sqlite3"))
+    os.environ.setdefault("BULK_JOB_DIR", os.path.join(workdir, "bulk_jobs"))
+    os.environ.setdefault("WARMUP_PAGE_CACHE", "0")   # 합성 컬렉션 → 실제 chroma_db 파일을 읽을 필요 없음
+    os.environ.setdefault("TRACE_LOG", "0")
+    # 벤치마크는 한 클라이언트가 부하를 만드므로 클라이언트별 요청 수 제한은 끔 (동시 실행 상한은 유지)
+    os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+
+    # 가짜 구성요소 설치 → 그 다음에 그래프/API import
+    from fakes import install_fakes, synthetic_image_bytes
+    client = install_fakes(corpus_size=args.corpus_size, llm_latency=args.llm_latency,
+                           llm_jitter=args.llm_jitter, search_latency=args.search_latency,
+                           llm_error_rate=args.llm_error_rate, llm_stall_rate=args.llm_stall_rate,
+                           llm_stall=args.llm_stall)
+
+    # 합성 컬렉션에는 실제 도면 파일이 없으므로, 비교 대상 이미지는 합성 도면으로 대체
+    catalog_image = synthetic_image_bytes(seed=7)
+    import design_chatbot
+    import prefetch
+    design_chatbot.get_design_image_bytes = lambda design_id: catalog_image
+    prefetch.get_design_image_bytes = lambda design_id: catalog_image
+
+    results = {}
+    if "clip" in only:
+        print("[clip] CLIP 임베딩 처리량 측정...")
+        results["clip"] = bench_clip(args.clip_images)
+    if "search" in only:
+        print("[search] 코퍼스 크기별 검색 지연 측정...")
+        results["search"] = bench_search(client, args.corpus_sizes, args.queries)
+    if "api" in only:
+        print("[api] 엔드포인트 부하 측정...")
+        import api
+        api.get_design_image_bytes = lambda design_id: catalog_image
+        results["api"] = bench_api(api.app, args.requests, args.concurrency)
+    if "memory" in only:
+        print("[memory] 세션당 메모리 증가량 측정...")
+        results["memory"] = bench_memory(design_chatbot.graph, args.memory_threads, design_chatbot.session_store)
+    if "compare" in only:
+        print("[compare] 상세 비교 방식별 지연/토큰 측정...")
+        results["compare"] = bench_compare(design_chatbot, args.compares)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k != "compare"},
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join("bench_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 결과 저장: {output}")
+
+
+if __name__ == "__main__":
+    main()
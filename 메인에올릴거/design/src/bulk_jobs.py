@@ -0,0 +1,551 @@
+"""
+일괄 FTO 검토 작업 모듈 (여러 입력 도면 비동기 처리)
+
+/chat/image는 요청 1건에 도면 1장을 동기로 처리하므로, 수십~수백 장의 제품 도면을 검토하려면
+클라이언트가 요청을 하나씩 보내고 매번 VLM 응답을 기다려야 합니다.
+→ 도면 N장을 작업으로 등록하고 백그라운드 스레드가 묶음 단위로 처리
+  - CLIP 배치 임베딩 1회 + 벡터DB 다중 질의 1회 (묶음당)
+  - VLM 형상 분석/상세 비교는 동시 실행 수 제한 (대화형 요청과 OpenAI rate limit을 나눠 씀)
+  - 진행률 조회 (GET /bulk/jobs/{job_id}) + 통합 결과 JSON 다운로드 (GET /bulk/jobs/{job_id}/result)
+
+작업/도면 상태는 SQLite(data/bulk_jobs/jobs.sqlite3)에, 업로드 도면은 작업 폴더에 저장
+→ 서버가 재시작돼도 끝나지 않은 도면부터 이어서 처리
+  (도면 결과는 묶음마다 기록, 실행 중 작업은 heartbeat가 끊기면 다른 워커/재시작한 서버가 가져감)
+업로드 도면은 받는 대로 작업 폴더에 저장하고(요청 전체를 메모리에 모으지 않음), 작업이 끝나면 삭제
+결과는 BULK_RESULT_TTL_SECONDS 동안 보관
+OpenAI 장애(서킷 열림 / 마감 시간 초과)로 분석하지 못한 도면은 실패로 기록하지 않고 대기 상태로 남겨,
+점점 긴 간격(BULK_RETRY_SECONDS → BULK_RETRY_MAX_SECONDS)으로 다시 처리
+  (도면별 시도 횟수 기록, BULK_MAX_ATTEMPTS번 모두 분석하지 못하면 그 도면만 실패로 기록 → 작업이 끝나지 않는 일 방지)
+읽을 수 없는 도면(파일 없음/손상)은 그 도면만 실패로 기록하고 나머지는 계속 처리
+
+목록:
+1. JobStore: 작업/도면 상태 저장소 (등록(begin → add_item → commit), 가져가기(claim), 진행률, 결과)
+2. screen_items: 도면 묶음 → 검색 + 형상 분석 (+ 상위 디자인 상세 비교)
+3. BulkJobRunner: 백그라운드 작업 실행 스레드 (api.py startup/shutdown에서 시작/중지)
+4. job_store / bulk_runner: 기본 인스턴스 (api.py 공용)
+
+사용법 (API):
+    POST /bulk/jobs                  files=도면 여러 장, n_results=10, compare_top=0 → job_id
+    GET  /bulk/jobs/{job_id}         진행률 (status, total, done, failed)
+    GET  /bulk/jobs/{job_id}/result  통합 결과 JSON (완료 후)
+"""
+
+import os
+import io
+import json
+import time
+import uuid
+import socket
+import shutil
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import Counter, Gauge, span
+from utils import DATA_DIR
+
+
+# ==================== 설정 ====================
+
+BULK_JOB_DIR = os.getenv("BULK_JOB_DIR", os.path.join(DATA_DIR, "bulk_jobs"))
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "200"))              # 작업 1건 최대 도면 수
+BULK_MAX_TOTAL_BYTES = int(os.getenv("BULK_MAX_TOTAL_BYTES", str(500 * 1024 * 1024)))   # 작업 1건 업로드 합계 500MB
+BULK_BATCH = int(os.getenv("BULK_BATCH", "16"))                       # 묶음 크기 (CLIP 배치 + 다중 질의 단위)
+BULK_VLM_CONCURRENCY = int(os.getenv("BULK_VLM_CONCURRENCY", "2"))    # 동시 VLM 호출 수 (대화형 요청 몫을 남김)
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", "5"))          # 도면별 최대 시도 수 (OpenAI 장애로 계속 분석하지 못하면 실패 처리)
+BULK_MAX_COMPARE_TOP = 3          # 도면별 상세 비교할 최대 상위 디자인 수
+BULK_MAX_N_RESULTS = 20           # 도면별 최대 검색 결과 수
+BULK_STALE_SECONDS = 300          # heartbeat가 이보다 오래되면 실행 중 작업을 다른 워커가 가져감
+BULK_POLL_SECONDS = 5             # 대기 작업 확인 간격 (등록 시에는 바로 깨움)
+BULK_RETRY_SECONDS = 15           # OpenAI 장애로 분석하지 못한 도면 재시도 대기 (연속이면 2배씩)
+BULK_RETRY_MAX_SECONDS = 120      # 재시도 대기 상한 (BULK_STALE_SECONDS보다 짧게 → 대기 중 작업을 뺏기지 않음)
+BULK_RESULT_TTL_SECONDS = int(os.getenv("BULK_RESULT_TTL_SECONDS", str(7 * 24 * 3600)))   # 끝난 작업 결과 보관 기간
+
+
+# ==================== 메트릭 ====================
+
+BULK_JOBS = Counter("design_bulk_jobs_total", "일괄 검토 작업 수 (status: queued/done/failed)")
+BULK_ITEMS = Counter("design_bulk_items_total", "일괄 검토 도면 처리 결과 (result: done/failed/pending: OpenAI 장애로 재시도)")
+BULK_RUNNING = Gauge("design_bulk_running", "실행 중인 일괄 검토 작업 수")
+
+
+# ==================== 저장소 ====================
+
+class JobStore:
+    """작업/도면 상태 (SQLite) + 작업별 업로드 폴더"""
+
+    def __init__(self, root=BULK_JOB_DIR):
+        self.root = root
+        self.path = os.path.join(root, "jobs.sqlite3")
+
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id      TEXT PRIMARY KEY,
+                    status      TEXT NOT NULL,
+                    total       INTEGER NOT NULL,
+                    options     TEXT NOT NULL,
+                    owner       TEXT,
+                    heartbeat   REAL,
+                    error       TEXT,
+                    created_at  REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    job_id     TEXT NOT NULL,
+                    idx        INTEGER NOT NULL,
+                    filename   TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    status     TEXT NOT NULL,
+                    result     TEXT,
+                    error      TEXT,
+                    attempts   INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (job_id, idx)
+                )
+            """)
+            # 이전 버전 DB: 시도 횟수 열 추가
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(items)").fetchall()}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    # ----- 등록 -----
+    # api.py: begin → 업로드 1장마다 검증 후 add_item (받는 대로 디스크에 저장) → commit (실패 시 discard)
+
+    def begin(self):
+        """작업 폴더 생성 → job_id (commit 전까지는 워커가 가져가지 않음)"""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        return job_id
+
+    def add_item(self, job_id, idx, filename, contents, ext):
+        """
+        검증한 도면 1장을 작업 폴더에 저장
+
+        Returns:
+            tuple: (idx, 파일명, 저장 경로) → commit에 전달
+        """
+        path = os.path.join(self.job_dir(job_id), f"{idx:04d}{ext}")
+        with open(path, "wb") as f:
+            f.write(contents)
+        return idx, filename, path
+
+    def commit(self, job_id, items, options):
+        """
+        저장한 도면으로 대기(queued) 작업 등록
+
+        Args:
+            items: add_item 결과 목록
+            options: {"n_results": ..., "compare_top": ...}
+
+        Returns:
+            str: job_id
+        """
+        # 도면 파일을 모두 쓴 뒤 작업 등록 → 워커가 쓰는 도중의 작업을 가져가지 않음
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO items (job_id, idx, filename, image_path, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, idx, filename, path) for idx, filename, path in items]
+            )
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, total, options, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, len(items), json.dumps(options), time.time())
+            )
+        BULK_JOBS.inc(status="queued")
+        return job_id
+
+    def discard(self, job_id):
+        """등록하지 않은 작업 폴더 삭제 (업로드 검증 실패 등)"""
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def create(self, files, options):
+        """
+        도면 목록 → 대기(queued) 작업 (begin + add_item + commit)
+
+        Args:
+            files: [(파일명, bytes, 확장자), ...] (upload_store.validate로 검증한 업로드)
+        """
+        job_id = self.begin()
+        try:
+            items = [self.add_item(job_id, idx, filename, contents, ext)
+                     for idx, (filename, contents, ext) in enumerate(files)]
+        except Exception:
+            self.discard(job_id)
+            raise
+        return self.commit(job_id, items, options)
+
+    # ----- 실행 (BulkJobRunner) -----
+
+    def claim(self, owner, stale_seconds=BULK_STALE_SECONDS):
+        """
+        대기 작업 또는 heartbeat가 끊긴 실행 중 작업 1건을 가져감 (UPDATE 1회 → 워커 여러 개여도 1곳만 가져감)
+
+        Returns:
+            dict: 작업 정보 (options는 dict)
+            None: 가져갈 작업 없음
+        """
+        now = time.time()
+        with self._connect() as conn:
+            claimed = conn.execute("""
+                UPDATE jobs SET status='running', owner=?, heartbeat=?
+                WHERE job_id = (
+                    SELECT job_id FROM jobs
+                    WHERE status='queued' OR (status='running' AND heartbeat < ?)
+                    ORDER BY created_at LIMIT 1
+                )
+            """, (owner, now, now - stale_seconds)).rowcount
+            if not claimed:
+                return None
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE owner=? AND status='running' AND heartbeat=?", (owner, now)
+            ).fetchone()
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def heartbeat(self, job_id, owner):
+        """실행 중 표시 갱신 (False: 다른 워커가 가져간 작업 → 처리 중단)"""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET heartbeat=? WHERE job_id=? AND owner=? AND status='running'",
+                (time.time(), job_id, owner)
+            ).rowcount > 0
+
+    def pending_items(self, job_id, limit):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT idx, filename, image_path FROM items WHERE job_id=? AND status='pending' ORDER BY idx LIMIT ?",
+                (job_id, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_items(self, job_id, outcomes, max_attempts=None):
+        """
+        묶음 처리 결과 기록 (outcomes: idx → (status, result dict, error))
+
+        도면마다 시도 횟수를 1 늘리고, pending(OpenAI 장애)이 max_attempts번째면 failed로 기록
+        → 특정 도면만 계속 마감 시간을 넘겨도 작업이 끝나고 다음 묶음을 막지 않음
+
+        Returns:
+            list: 아직 pending인 도면 idx (BulkJobRunner가 대기 후 재시도)
+        """
+        max_attempts = max_attempts or BULK_MAX_ATTEMPTS
+        with self._connect() as conn:
+            attempts = dict(conn.execute(
+                f"SELECT idx, attempts FROM items WHERE job_id=? AND idx IN ({','.join('?' * len(outcomes))})",
+                (job_id, *outcomes)
+            ).fetchall())
+            rows, retry = [], []
+            for idx, (status, result, error) in outcomes.items():
+                if status == "pending":
+                    if attempts.get(idx, 0) + 1 >= max_attempts:
+                        status, error = "failed", f"{max_attempts}회 시도 모두 LLM 사용 불가 ({error})"
+                        BULK_ITEMS.inc(result="failed")
+                    else:
+                        retry.append(idx)
+                rows.append((status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                             error, job_id, idx))
+            conn.executemany(
+                "UPDATE items SET status=?, result=?, error=?, attempts=attempts+1 WHERE job_id=? AND idx=?", rows
+            )
+        return retry
+
+    def release(self, job_id, owner):
+        """서버 종료 시 실행 중 작업을 대기 상태로 되돌림 (재시작 후 바로 이어서 처리)"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status='queued', owner=NULL WHERE job_id=? AND owner=? AND status='running'",
+                (job_id, owner)
+            )
+
+    def finish(self, job_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status=?, error=?, finished_at=? WHERE job_id=?",
+                (status, error, time.time(), job_id)
+            )
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)  # 업로드 도면 삭제 (결과는 DB에 남음)
+        BULK_JOBS.inc(status=status)
+
+    def purge(self, ttl_seconds=BULK_RESULT_TTL_SECONDS):
+        """
+        보관 기간이 지난 끝난 작업 삭제 → 삭제한 작업 수
+
+        commit 전에 서버가 멈춰 남은 작업 폴더(작업 행 없음)도 BULK_STALE_SECONDS가 지나면 삭제
+        """
+        with self._connect() as conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - ttl_seconds,)
+            ).fetchall()]
+            for job_id in expired:
+                conn.execute("DELETE FROM items WHERE job_id=?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id=?", (job_id,))
+            known = {row[0] for row in conn.execute("SELECT job_id FROM jobs").fetchall()}
+
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if (name not in known and os.path.isdir(path)
+                    and time.time() - os.path.getmtime(path) > BULK_STALE_SECONDS):
+                shutil.rmtree(path, ignore_errors=True)
+        return len(expired)
+
+    # ----- 조회 (API) -----
+
+    def progress(self, job_id):
+        """
+        Returns:
+            dict: {"job_id", "status", "total", "done", "failed", "error", "created_at", "finished_at"}
+            None: 없는 작업
+        """
+        with self._connect() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id=? GROUP BY status", (job_id,)
+            ).fetchall())
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "total": job["total"],
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "options": json.loads(job["options"]),
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    def results(self, job_id):
+        """도면별 결과 목록 (업로드 순서)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT idx, filename, status, result, error FROM items WHERE job_id=? ORDER BY idx", (job_id,)
+            ).fetchall()
+        return [{
+            "index": row["idx"] + 1,
+            "filename": row["filename"],
+            "status": row["status"],
+            **(json.loads(row["result"]) if row["result"] else {}),
+            "error": row["error"],
+        } for row in rows]
+
+
+# ==================== 도면 묶음 처리 ====================
+
+def screen_items(items, n_results=10, compare_top=0, on_item=None):
+    """
+    도면 묶음 → 유사 디자인 검색 + 형상 분석 (+ 상위 디자인 상세 비교)
+
+    - CLIP 배치 임베딩 1회 + 벡터DB 다중 질의 1회 (대표 도면 검색 설정 DESIGN_DEDUP_SEARCH 그대로 사용)
+    - VLM 호출은 BULK_VLM_CONCURRENCY개까지 동시 실행, 비교 캐시/미리 계산한 형상 분석은 /chat/select와 공유
+
+    Args:
+        items: [{"idx", "filename", "image_path"}, ...]
+        on_item: 도면 1장 처리가 끝날 때마다 호출 (heartbeat 갱신용)
+
+    Returns:
+        dict: idx → (status "done"/"failed"/"pending", 결과 dict, 오류 메시지)
+              pending: OpenAI 장애(LLMUnavailableError)로 분석하지 못함 → 대기 상태로 남겨 나중에 다시 처리
+              failed: 도면 파일을 읽을 수 없음 / 분석 실패 (다른 도면은 계속 처리)
+    """
+    from PIL import Image
+
+    from design_chatbot import llm, output_parser, image_collection, search_where, compare_with_design
+    from prompts import IMAGE_ANALYSIS_PROMPT
+    from utils import get_image_embeddings, search_similar_designs_batch
+    from image_preprocess import to_vlm_data_url
+    from analysis_schema import compact_analysis
+    from llm_policy import call_llm, LLMUnavailableError
+
+    # 도면 로드 (원본 bytes + 내용 해시: VLM 전처리/비교 캐시 키)
+    outcomes = {}
+    loaded = {}   # 묶음 내 위치 → (bytes, 해시, 이미지)
+    for position, item in enumerate(items):
+        try:
+            with open(item["image_path"], "rb") as f:
+                contents = f.read()
+            image = Image.open(io.BytesIO(contents))
+            image.load()
+        except Exception as e:
+            # 파일 없음/손상: 이 도면만 실패로 기록 (작업 전체를 실패시키지 않음)
+            outcomes[item["idx"]] = ("failed", None, f"도면을 읽을 수 없음: {type(e).__name__}: {e}")
+            BULK_ITEMS.inc(result="failed")
+            continue
+        loaded[position] = (contents, hashlib.sha256(contents).hexdigest(), image)
+    if not loaded:
+        return outcomes
+    positions = list(loaded)
+
+    with span("bulk.search", batch=len(positions)):
+        embeddings = get_image_embeddings([loaded[position][2] for position in positions])
+        if embeddings is None:
+            outcomes.update({items[position]["idx"]: ("failed", None, "임베딩 생성 실패") for position in positions})
+            return outcomes
+        searches = dict(zip(positions, search_similar_designs_batch(
+            image_collection, embeddings, n_results=n_results, where=search_where)))
+
+    chain = IMAGE_ANALYSIS_PROMPT | llm | output_parser
+
+    def run(position):
+        item = items[position]
+        contents, image_hash, _ = loaded[position]
+        results = searches[position]
+        similar_designs = [{
+            "rank": i + 1,
+            "design_id": design_id,
+            "distance": distance,
+            "application_number": metadata.get('applicationNumber', 'N/A'),
+            "article_name": metadata.get('articleName', 'N/A'),
+            "admst_stat": metadata.get('admstStat', 'N/A'),
+            "cluster_id": metadata.get('cluster_id'),
+        } for i, (design_id, distance, metadata) in enumerate(
+            zip(results['ids'][0], results['distances'][0], results['metadatas'][0]))]
+
+        try:
+            url = to_vlm_data_url(contents, cache_key=image_hash)
+            analysis = compact_analysis(call_llm("analyze", chain.invoke, {"image_url": url}))
+
+            # 상위 디자인 상세 비교 (compare_with_design이 읽는 state 필드만 구성)
+            state = {"image_hash": image_hash, "base64_image": url, "input_analysis": analysis}
+            comparisons = []
+            for design in similar_designs[:compare_top]:
+                comparisons.append({
+                    "rank": design["rank"],
+                    "application_number": design["application_number"],
+                    "comparison": compare_with_design(state, design),
+                })
+            outcome = ("done", {"input_analysis": analysis, "similar_designs": similar_designs,
+                                "comparisons": comparisons}, None)
+        except LLMUnavailableError as e:
+            # 서킷 열림 / 마감 시간 초과: 도면 문제가 아니므로 실패로 기록하지 않음 (BulkJobRunner가 대기 후 재시도)
+            outcome = ("pending", None, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            # 분석 실패해도 검색 결과는 남김
+            outcome = ("failed", {"similar_designs": similar_designs}, f"{type(e).__name__}: {e}")
+
+        BULK_ITEMS.inc(result=outcome[0])
+        if on_item is not None:
+            on_item()
+        return item["idx"], outcome
+
+    with ThreadPoolExecutor(max_workers=max(1, BULK_VLM_CONCURRENCY)) as executor:
+        outcomes.update(executor.map(run, positions))
+    return outcomes
+
+
+# ==================== 작업 실행 스레드 ====================
+
+class BulkJobRunner:
+    """
+    대기 작업을 가져가 묶음 단위로 처리하는 백그라운드 스레드
+
+    서버(워커) 프로세스마다 1개 실행, 작업은 JobStore.claim으로 1곳만 가져감
+    """
+
+    def __init__(self, store, screen=screen_items, batch_size=BULK_BATCH):
+        self.store = store
+        self.screen = screen
+        self.batch_size = batch_size
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="bulk-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """실행 중 작업은 현재 묶음까지 기록 후 대기 상태로 되돌림"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        """작업 등록 직후 호출 → 대기 간격을 기다리지 않고 바로 처리"""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(self.owner)
+                if job is None:
+                    self.store.purge()
+                    self._wake.wait(BULK_POLL_SECONDS)
+                    self._wake.clear()
+                    continue
+                self._run(job)
+            except Exception as e:
+                print(f"⚠️ 일괄 검토 작업 실행 오류: {type(e).__name__}: {e}")
+                self._stop.wait(BULK_POLL_SECONDS)
+
+    def _run(self, job):
+        job_id, options = job["job_id"], job["options"]
+        print(f"[일괄검토] 작업 {job_id} 시작 ({job['total']}장)")
+        BULK_RUNNING.inc()
+        retry_seconds = BULK_RETRY_SECONDS
+        try:
+            while True:
+                if self._stop.is_set():
+                    self.store.release(job_id, self.owner)
+                    return
+                items = self.store.pending_items(job_id, self.batch_size)
+                if not items:
+                    break
+                outcomes = self.screen(items, options.get("n_results", 10), options.get("compare_top", 0),
+                                       on_item=lambda: self.store.heartbeat(job_id, self.owner))
+                retry = self.store.save_items(job_id, outcomes)
+                if not self.store.heartbeat(job_id, self.owner):
+                    print(f"  작업 {job_id}을 다른 워커가 가져가 중단합니다.")
+                    return
+
+                # OpenAI 장애로 남은 도면이 있으면 대기 후 다시 (장애가 이어지면 대기 시간 2배, 상한 BULK_RETRY_MAX_SECONDS)
+                # 시도 횟수를 다 쓴 도면은 save_items가 failed로 기록 → retry에서 빠짐
+                if not retry:
+                    retry_seconds = BULK_RETRY_SECONDS
+                    continue
+                print(f"  작업 {job_id}: 도면 {len(retry)}장 LLM 사용 불가 → {retry_seconds}초 후 재시도")
+                if self._stop.wait(retry_seconds):
+                    continue   # 종료 요청 → 다음 반복에서 release
+                if not self.store.heartbeat(job_id, self.owner):
+                    print(f"  작업 {job_id}을 다른 워커가 가져가 중단합니다.")
+                    return
+                retry_seconds = min(retry_seconds * 2, BULK_RETRY_MAX_SECONDS)
+            self.store.finish(job_id, "done")
+            print(f"[일괄검토] 작업 {job_id} 완료")
+        except Exception as e:
+            self.store.finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+            print(f"[일괄검토] 작업 {job_id} 실패: {type(e).__name__}: {e}")
+        finally:
+            BULK_RUNNING.dec()
+
+
+# ==================== 기본 인스턴스 ====================
+
+job_store = JobStore()
+bulk_runner = BulkJobRunner(job_store)
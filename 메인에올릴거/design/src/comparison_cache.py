@@ -0,0 +1,162 @@
+"""
+VLM 비교 결과 캐시 모듈
+
+같은 입력 도면(내용 해시)을 같은 디자인(design_id)과 비교한 결과를
+스레드(세션)와 무관하게 재사용하기 위한 영구 캐시입니다.
+
+키: (입력 이미지 해시, design_id, 프롬프트 버전, 모델명)
+    프롬프트에 넣은 형상 분석(비교 대상 / 텍스트 비교 시 입력)은 content_version으로 프롬프트 버전에 포함
+    → analysis_store build로 분석이 다시 계산되면 이전 분석으로 만든 비교 결과를 재사용하지 않음
+저장소: SQLite (표준 라이브러리, 별도 서버 불필요)
+퇴출: 최대 개수 초과 시 가장 오래 사용되지 않은 항목부터 삭제(LRU) + TTL 만료
+
+목록:
+1. prompt_version: 프롬프트 템플릿 → 버전 문자열(내용 해시)
+2. content_version: 프롬프트 버전 + 프롬프트 입력 텍스트 → 캐시 키용 버전
+3. ComparisonCache: 비교 결과 조회/저장/퇴출
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+
+# ==================== 설정 ====================
+
+# comparison_cache.py 기준 상대 경로 (design/cache/comparison_cache.sqlite3)
+_DEFAULT_CACHE_PATH = os.getenv("COMPARISON_CACHE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "cache", "comparison_cache.sqlite3"
+)
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("COMPARISON_CACHE_MAX_ENTRIES", "5000"))
+DEFAULT_TTL_SECONDS = int(os.getenv("COMPARISON_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))  # 30일
+
+
+# ==================== 프롬프트 버전 ====================
+
+def prompt_version(prompt) -> str:
+    """
+    프롬프트 템플릿 내용으로 버전 문자열 생성
+
+    프롬프트 문구가 바뀌면 버전도 자동으로 바뀌어, 이전 프롬프트로 만든
+    캐시 결과가 재사용되지 않는다.
+    """
+    return hashlib.sha256(repr(prompt.messages).encode("utf-8")).hexdigest()[:16]
+
+
+def content_version(version, *texts) -> str:
+    """프롬프트 버전에 프롬프트 입력 텍스트(형상 분석 등) 해시를 붙임 (None인 텍스트는 제외)"""
+    texts = [text for text in texts if text is not None]
+    if not texts:
+        return version
+    digest = hashlib.sha256("\x00".join(texts).encode("utf-8")).hexdigest()[:16]
+    return f"{version}:{digest}"
+
+
+# ==================== 비교 결과 캐시 ====================
+
+class ComparisonCache:
+    """(입력 이미지 해시, design_id, 프롬프트 버전, 모델) → VLM 비교 결과"""
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path or _DEFAULT_CACHE_PATH
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS comparisons (
+                    image_hash     TEXT NOT NULL,
+                    design_id      TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    model          TEXT NOT NULL,
+                    result         TEXT NOT NULL,
+                    created_at     REAL NOT NULL,
+                    last_access    REAL NOT NULL,
+                    PRIMARY KEY (image_hash, design_id, prompt_version, model)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON comparisons(last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # 요청마다 짧게 연결 (FastAPI 스레드풀에서 안전하게 사용)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # 정상 종료 시 commit, 예외 시 rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, image_hash, design_id, prompt_version, model):
+        """
+        캐시된 비교 결과 조회
+
+        Returns:
+            str: 캐시된 비교 결과
+            None: 캐시 없음 또는 TTL 만료
+        """
+        key = (image_hash, design_id, prompt_version, model)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM comparisons "
+                "WHERE image_hash=? AND design_id=? AND prompt_version=? AND model=?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+
+            result, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute(
+                    "DELETE FROM comparisons "
+                    "WHERE image_hash=? AND design_id=? AND prompt_version=? AND model=?",
+                    key
+                )
+                return None
+
+            conn.execute(
+                "UPDATE comparisons SET last_access=? "
+                "WHERE image_hash=? AND design_id=? AND prompt_version=? AND model=?",
+                (now,) + key
+            )
+            return result
+
+    def put(self, image_hash, design_id, prompt_version, model, result):
+        """비교 결과 저장 후, 최대 개수를 넘으면 오래된 항목 퇴출"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO comparisons VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (image_hash, design_id, prompt_version, model, result, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """TTL 만료 항목 삭제 + 최대 개수 초과분을 LRU 순서로 삭제"""
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM comparisons WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        (count,) = conn.execute("SELECT COUNT(*) FROM comparisons").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM comparisons WHERE rowid IN ("
+                "SELECT rowid FROM comparisons ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM comparisons")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM comparisons").fetchone()[0]
@@ -0,0 +1,7 @@
+"""
+pytest 설정
+
+test_multiturn.py는 실행 중인 API 서버가 필요한 수동 스크립트(python test_multiturn.py)이므로 수집에서 제외
+"""
+
+collect_ignore = ["test_multiturn.py"]
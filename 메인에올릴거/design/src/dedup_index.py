@@ -0,0 +1,227 @@
+"""
+유사 중복 도면 클러스터링 모듈 (색인 시점 중복 묶기)
+
+한 출원의 여러 도면, 관련 출원(부분디자인/관련디자인)의 도면은 거의 같은 그림이라
+검색 상위 k개를 같은 모양이 차지하고, 질의 때마다 search_and_filter_similar_designs에서 걸러내야 합니다.
+→ 오프라인으로 임베딩을 LSH(랜덤 초평면)로 버킷에 나누고, 같은 버킷 안에서 코사인 유사도가
+  임계값 이상인 도면끼리 묶어 메타데이터에 클러스터 정보를 기록합니다.
+
+- cluster_id: 클러스터 대표 도면의 design_id
+- is_representative: 대표 도면 여부 (클러스터 중심에 가장 가까운 도면)
+- cluster_size: 클러스터 도면 수
+→ 검색 시 where={"is_representative": True}로 대표 도면만 검색 (DESIGN_DEDUP_SEARCH=1)
+  → 같은 k개에 서로 다른 모양이 더 많이 포함, 묶인 도면은 expand_cluster로 필요할 때 펼침 (GET /clusters/{cluster_id})
+
+LSH 버킷은 여러 테이블을 쓰므로, 한 테이블에서 경계에 걸려 갈라진 유사 도면도 다른 테이블에서 다시 만난다.
+(묶음은 유사 쌍의 연결 요소 → A~B, B~C이면 A, B, C가 한 클러스터)
+
+목록:
+1. find_clusters: 임베딩 → 클러스터 목록 (LSH 후보 + 코사인 확인 + union-find)
+2. build_dedup_index: 컬렉션 전체 클러스터링 → 메타데이터 갱신 (바뀐 도면만 update)
+3. representatives_filter / expand_cluster: 대표 도면 검색 필터 / 클러스터 펼치기
+
+사용법:
+    python dedup_index.py build                      # 클러스터링 + 메타데이터 기록
+    python dedup_index.py build --similarity 0.95    # 더 느슨하게 묶기
+    python dedup_index.py stats                      # 현재 클러스터 통계
+"""
+
+import os
+import argparse
+from collections import defaultdict
+
+import numpy as np
+
+from utils import iter_collection, CHROMA_DIR
+
+
+# ==================== 설정 ====================
+
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.97"))   # 같은 클러스터로 묶을 코사인 유사도
+DEDUP_BITS = 16            # LSH 테이블 1개의 초평면 수 (버킷 = 2^16)
+DEDUP_TABLES = 4           # LSH 테이블 수 (많을수록 놓치는 쌍이 줄고 느려짐)
+DEDUP_SEED = 0             # 초평면 난수 시드 (재실행 시 같은 결과)
+_BLOCK = 512               # 버킷 내 유사도 계산 블록 크기 (메모리 상한)
+_UPDATE_PAGE = 5000         # collection.update 1회에 넣을 도면 수
+
+CLUSTER_FIELDS = ("cluster_id", "is_representative", "cluster_size")
+
+
+# ==================== 클러스터링 ====================
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def _lsh_buckets(vectors, bits, tables, seed):
+    """테이블마다 랜덤 초평면 부호 → 버킷 (도면 2개 이상인 버킷만)"""
+    rng = np.random.default_rng(seed)
+    weights = 1 << np.arange(bits, dtype=np.int64)
+    for _ in range(tables):
+        planes = rng.standard_normal((vectors.shape[1], bits)).astype(np.float32)
+        codes = ((vectors @ planes) > 0).astype(np.int64) @ weights
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        for bucket in np.split(order, boundaries):
+            if len(bucket) > 1:
+                yield bucket
+
+
+def find_clusters(vectors, similarity=DEDUP_SIMILARITY, bits=DEDUP_BITS, tables=DEDUP_TABLES, seed=DEDUP_SEED):
+    """
+    임베딩 → 유사 중복 클러스터
+
+    Args:
+        vectors: (N, D) 임베딩 배열
+        similarity: 같은 클러스터로 묶을 코사인 유사도 하한
+
+    Returns:
+        list: [[인덱스, ...], ...] 클러스터별 도면 인덱스 (혼자인 도면 포함, 대표 도면이 맨 앞)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    union = _UnionFind(len(vectors))
+
+    for bucket in _lsh_buckets(vectors, bits, tables, seed):
+        members = vectors[bucket]
+        for start in range(0, len(bucket), _BLOCK):
+            sims = members[start:start + _BLOCK] @ members.T
+            rows, cols = np.nonzero(sims >= similarity)
+            for row, col in zip(rows + start, cols):
+                if row < col:
+                    union.union(int(bucket[row]), int(bucket[col]))
+
+    groups = defaultdict(list)
+    for i in range(len(vectors)):
+        groups[union.find(i)].append(i)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) > 1:
+            # 대표 도면: 클러스터 평균 방향에 가장 가까운 도면
+            centroid = vectors[members].mean(axis=0)
+            best = int(np.argmax(vectors[members] @ centroid))
+            members.insert(0, members.pop(best))
+        clusters.append(members)
+    return clusters
+
+
+# ==================== 색인 ====================
+
+def _load_embeddings(collection):
+    """컬렉션 전체 → (design_id 목록, 임베딩 배열, 메타데이터 목록)"""
+    ids, embeddings, metadatas = [], [], []
+    for page in iter_collection(collection, include=["embeddings", "metadatas"]):
+        ids.extend(page["ids"])
+        embeddings.extend(page["embeddings"])
+        metadatas.extend(metadata or {} for metadata in page["metadatas"])
+    return ids, np.asarray(embeddings, dtype=np.float32), metadatas
+
+
+def build_dedup_index(collection, similarity=DEDUP_SIMILARITY, bits=DEDUP_BITS, tables=DEDUP_TABLES):
+    """
+    컬렉션 전체 클러스터링 → 도면 메타데이터에 클러스터 정보 기록
+
+    클러스터 정보가 바뀐 도면만 update하므로, 도면 추가(ingest.py) 후 다시 실행해도 변경분만 기록된다.
+
+    Returns:
+        dict: {"designs": 도면 수, "clusters": 클러스터 수, "representatives": 대표 도면 수, "updated": 갱신한 도면 수}
+    """
+    ids, vectors, metadatas = _load_embeddings(collection)
+    if not ids:
+        return {"designs": 0, "clusters": 0, "representatives": 0, "updated": 0}
+    print(f"  {len(ids)}개 도면 임베딩 로드, 클러스터링 중 (유사도 ≥ {similarity})")
+    clusters = find_clusters(vectors, similarity, bits, tables)
+
+    update_ids, update_metadatas = [], []
+    for members in clusters:
+        cluster_id = ids[members[0]]
+        for position, i in enumerate(members):
+            fields = {"cluster_id": cluster_id, "is_representative": position == 0, "cluster_size": len(members)}
+            if any(metadatas[i].get(k) != v for k, v in fields.items()):
+                update_ids.append(ids[i])
+                update_metadatas.append({**metadatas[i], **fields})
+
+    for start in range(0, len(update_ids), _UPDATE_PAGE):
+        collection.update(ids=update_ids[start:start + _UPDATE_PAGE],
+                          metadatas=update_metadatas[start:start + _UPDATE_PAGE])
+
+    return {
+        "designs": len(ids),
+        "clusters": sum(1 for members in clusters if len(members) > 1),
+        "representatives": len(clusters),
+        "updated": len(update_ids),
+    }
+
+
+# ==================== 검색 ====================
+
+REPRESENTATIVE_WHERE = {"is_representative": True}
+
+
+def representatives_filter(collection):
+    """
+    대표 도면만 검색하는 where 필터 (클러스터링을 하지 않은 컬렉션이면 None)
+
+    사용 예:
+        where = representatives_filter(image_collection)
+        search_and_filter_similar_designs(image_collection, embedding, where=where)
+    """
+    page = collection.get(where=REPRESENTATIVE_WHERE, limit=1, include=[])
+    return REPRESENTATIVE_WHERE if page["ids"] else None
+
+
+def expand_cluster(collection, cluster_id):
+    """
+    클러스터 → 묶인 도면 전체 (대표 도면이 맨 앞)
+
+    Returns:
+        list: [(design_id, metadata), ...] (없는 클러스터면 빈 목록)
+    """
+    page = collection.get(where={"cluster_id": cluster_id}, include=["metadatas"])
+    members = list(zip(page["ids"], page["metadatas"]))
+    members.sort(key=lambda member: (not member[1].get("is_representative"), member[0]))
+    return members
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="유사 중복 도면 클러스터링")
+    parser.add_argument("command", choices=["build", "stats"])
+    parser.add_argument("--similarity", type=float, default=DEDUP_SIMILARITY)
+    parser.add_argument("--bits", type=int, default=DEDUP_BITS)
+    parser.add_argument("--tables", type=int, default=DEDUP_TABLES)
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--collection", default="design")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=args.chroma_dir)
+    collection = client.get_collection(name=args.collection)
+
+    if args.command == "build":
+        stats = build_dedup_index(collection, args.similarity, args.bits, args.tables)
+        print(f"✅ {stats['designs']}개 도면 → 검색 대상 {stats['representatives']}개 "
+              f"(중복 클러스터 {stats['clusters']}개, 메타데이터 갱신 {stats['updated']}개)")
+    else:
+        total = collection.count()
+        representatives = collection.get(where=REPRESENTATIVE_WHERE, include=[])["ids"]
+        if not representatives:
+            print("클러스터 정보가 없습니다. 먼저 python dedup_index.py build 를 실행하세요.")
+        else:
+            print(f"도면 {total}개 중 대표 도면 {len(representatives)}개 "
+                  f"(검색 대상 {len(representatives) / max(1, total):.1%})")
@@ -3,19 +3,20 @@
 
 기능:
 1. 이미지 → 유사 디자인 10개 검색 (CLIP + ChromaDB)
-2. 사용자가 1개 선택 → 상세 비교 분석 (interrupt + VLM)
-3. 최종 리포트 생성 (LLM)
+2. 사용자가 1개(또는 여러 개) 선택 → 상세 비교 분석 (interrupt + VLM)
+3. 최종 리포트 생성 (LLM, 여러 개 선택 시 통합 리포트)
 4. 일반 질문 + 웹 검색 + DB 검색 (Tool)
 
 그래프 구조 (2갈래):
     [입력] → [라우터]
       ├─ image ─→ [VLM분석] → [벡터검색] → ★interrupt(선택대기)★ → [상세비교] → [리포트] → END
-      └─ text  ─→ [LLM + Tools(웹검색, DB검색)] → END
+      └─ text  ─→ [LLM + Tools(웹검색, DB검색, 출원번호 조회)] → END
 """
 
 import os
 import json
-import base64
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List, Dict, Any
 
 # LangChain & LangGraph
@@ -23,9 +24,9 @@ from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 from langgraph.types import interrupt, Command  # interrupt: 사용자 개입 기능
-from langgraph.checkpoint.memory import MemorySaver  # interrupt 사용시 필수
 from langgraph.prebuilt import ToolNode
 
 # 웹 검색
@@ -37,16 +38,60 @@ import chromadb
 # 기존 유틸 함수 재사용
 from utils import (
     get_image_embedding,              # 이미지 → CLIP 임베딩
+    get_image_embeddings,             # 여러 이미지 → CLIP 임베딩 (배치 1회)
     get_text_embedding,               # 텍스트 → CLIP 임베딩 (DB검색 Tool용)
     design_id_to_local_image,         # design_id → 로컬 이미지 경로
-    search_and_filter_similar_designs # 벡터DB 검색 + 중복 필터링
+    get_design_image_bytes,           # design_id → 이미지 bytes (샤드 또는 파일)
+    search_and_filter_similar_designs, # 벡터DB 검색 + 중복 필터링
+    search_multi_view                 # 다중 도면 검색 + 출원번호별 점수 합산
 )
 
+# 업로드 이미지 저장소 (한 번 읽은 이미지를 노드 간 공유)
+from upload_store import upload_store
+
+# VLM 전송용 이미지 전처리 (RGB + 리사이즈 + JPEG 재인코딩, 이미지별 캐시)
+from image_preprocess import to_vlm_data_url
+
+# interrupt 대기 중 후보 이미지 프리페치
+from prefetch import prefetcher, SPECULATIVE_TOP1
+
+# 대화 세션 체크포인터 (MemorySaver + 유휴 TTL / 세션 수·메모리 상한, interrupt 사용시 필수)
+from session_store import BoundedMemorySaver
+
+# 지연시간 계측 (노드/LLM 호출별 span)
+from tracing import traced_node, llm_tracer
+
+# LLM 호출 정책 (마감 시간 + 재시도 + 헤징 + 서킷 브레이커)
+from llm_policy import call_llm, LLM_REQUEST_TIMEOUT
+
+# 공유 모델 서버 (MODEL_SERVER_SOCKET 설정 시 CLIP/ChromaDB를 서버 프로세스에서 사용)
+from model_server import MODEL_SERVER_SOCKET, RemoteChromaClient
+
+# 부분(영역) 도면 인덱스 (부분디자인 유사 검색)
+from region_index import get_region_collection, search_with_regions
+from dedup_index import representatives_filter
+
+# 메타데이터 키워드(BM25) 검색 (DB검색 Tool에서 벡터 검색과 합산)
+from lexical_index import get_lexical_index, hybrid_search
+
+# 출원번호 → 디자인 직접 조회 (임베딩/벡터 검색 없음)
+from design_lookup import get_design_lookup
+
+# VLM 비교 결과 영구 캐시 (세션 간 재사용)
+from comparison_cache import ComparisonCache, prompt_version, content_version
+
+# VLM 응답 구조화 (스키마 검증 + 압축 JSON) / 카탈로그 도면 형상 분석 저장소
+from analysis_schema import compact_analysis, compact_comparison
+from analysis_store import AnalysisStore
+
 # 기존 프롬프트 재사용
 from prompts import (
     IMAGE_ANALYSIS_PROMPT,    # 이미지 형상 분석
     IMAGE_COMPARISON_PROMPT,  # 두 이미지 비교
-    REPORT_PROMPT             # 최종 리포트 생성
+    IMAGE_REFERENCE_COMPARISON_PROMPT,  # 두 이미지 비교 (비교 대상 형상 분석이 미리 계산된 경우)
+    TEXT_COMPARISON_PROMPT,   # 형상 분석 텍스트끼리 비교 (이미지 없음)
+    REPORT_PROMPT,            # 최종 리포트 생성
+    BATCH_REPORT_PROMPT       # 여러 디자인 통합 리포트 생성
 )
 
 from dotenv import load_dotenv
@@ -55,12 +100,55 @@ load_dotenv()
 
 # ==================== LLM & ChromaDB 초기화 ====================
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+# 호출별 시간/토큰 기록, 재시도는 llm_policy에서만 (클라이언트 자체 재시도 끔)
+llm = ChatOpenAI(model="gpt-4o", temperature=0, callbacks=[llm_tracer],
+                 timeout=LLM_REQUEST_TIMEOUT, max_retries=0)
 output_parser = StrOutputParser()
 
-chroma_client = chromadb.PersistentClient(path="..\\chroma_db")
+if MODEL_SERVER_SOCKET:
+    # 멀티 워커 모드: 모델 서버 프로세스의 ChromaDB 사용 (워커마다 인덱스를 올리지 않음)
+    chroma_client = RemoteChromaClient()
+else:
+    chroma_client = chromadb.PersistentClient(path="..\\chroma_db")
 image_collection = chroma_client.get_collection(name="design")
 
+# 일괄 비교 설정
+MAX_BATCH_SELECT = 5          # 한 번에 선택할 수 있는 최대 디자인 수
+COMPARE_MAX_CONCURRENCY = 3   # 동시에 실행할 VLM 비교 호출 수 (OpenAI rate limit 고려)
+
+# 다중 도면(정면/측면/평면 등) 검색 설정
+MAX_VIEWS = 6                 # 한 번에 업로드할 수 있는 최대 도면 수
+MULTI_VIEW_FUSION = "rrf"     # 도면별 검색 결과 합산 방식: "rrf"(순위 합산) | "max"(최소 거리)
+
+# 검색 방식: "global"(도면 전체 벡터) | "hybrid"(전체 + 영역 인덱스 합산, region_index.py build 필요)
+SEARCH_MODE = os.getenv("DESIGN_SEARCH_MODE", "global")
+region_collection = get_region_collection(chroma_client) if SEARCH_MODE == "hybrid" else None
+if SEARCH_MODE == "hybrid" and region_collection is None:
+    print("⚠️ 영역 인덱스가 없어 전역 검색만 사용합니다. (python region_index.py build)")
+
+# 유사 중복 도면은 대표 도면만 검색 (dedup_index.py build 필요, 묶인 도면은 GET /clusters/{cluster_id})
+DEDUP_SEARCH = os.getenv("DESIGN_DEDUP_SEARCH", "0") == "1"
+search_where = representatives_filter(image_collection) if DEDUP_SEARCH else None
+if DEDUP_SEARCH and search_where is None:
+    print("⚠️ 중복 클러스터 정보가 없어 전체 도면을 검색합니다. (python dedup_index.py build)")
+
+# VLM 비교 결과 캐시: (입력 이미지 해시, design_id, 프롬프트 버전, 모델)
+comparison_cache = ComparisonCache()
+COMPARISON_PROMPT_VERSION = prompt_version(IMAGE_COMPARISON_PROMPT)
+REFERENCE_COMPARISON_PROMPT_VERSION = prompt_version(IMAGE_REFERENCE_COMPARISON_PROMPT)
+TEXT_COMPARISON_PROMPT_VERSION = prompt_version(TEXT_COMPARISON_PROMPT)
+
+# 상세 비교 방식: "image"(두 이미지 VLM 비교) | "text"(입력 분석 vs 미리 계산한 형상 분석, 이미지 재전송 없음)
+# text 모드라도 미리 계산한 분석이 없는 도면은 image 방식으로 비교
+COMPARISON_MODE = os.getenv("DESIGN_COMPARISON_MODE", "image")
+
+# 카탈로그 도면 형상 분석 (analysis_store.py build로 미리 계산, 없으면 비교 시 VLM이 직접 분석)
+analysis_store = AnalysisStore()
+ANALYSIS_PROMPT_VERSION = prompt_version(IMAGE_ANALYSIS_PROMPT)
+
+# 대화 세션 저장소: 만료/삭제된 세션은 프리페치 캐시도 함께 정리
+session_store = BoundedMemorySaver(on_evict=[prefetcher.discard, upload_store.unpin])
+
 
 # ==================== State 정의 ====================
 # State = 노드 간에 주고받는 데이터 구조(스키마)
@@ -71,17 +159,21 @@ class GraphState(TypedDict):
 
     #입력 관련 필드
     input_type: str          # "image" | "text"
-    image_path: str          # 사용자가 입력한 이미지 경로
+    image_path: str          # 사용자가 입력한 이미지 경로 (다중 도면이면 대표 도면)
+    image_paths: List[str]   # 다중 도면 검색 시 전체 도면 경로 (대표 도면 포함)
     text_query: str          # 텍스트 질문
     user_query: str          # 사용자 질문
     base64_image: str        # base64 인코딩된 입력 이미지
+    image_hash: str          # 입력 이미지 내용 해시 (sha256, 비교 캐시 키)
 
     # 이미지 검색&분석 관련 필드
-    input_analysis: str              # VLM 분석 결과
+    input_analysis: str              # VLM 분석 결과 (압축 JSON, 스키마 검증 실패 시 원문)
     search_results: Dict[str, Any]   # 벡터DB 검색 원본
     comparison_results: List[Dict]   # 검색 원본을 깔끔하게 정리 -> 최종 유사 디자인 목록
     selected_index: int              # 사용자가 선택한 디자인 번호
-    detailed_comparison: str         # 선택한 디자인 vlm 상세 비교 결과
+    selected_indices: List[int]      # 사용자가 선택한 디자인 번호 목록 (일괄 비교)
+    detailed_comparison: str         # 선택한 디자인 vlm 상세 비교 결과 (압축 JSON, 스키마 검증 실패 시 원문)
+    detailed_comparisons: List[Dict] # 일괄 비교 시 디자인별 상세 비교 결과
     final_report: str                # 최종 리포트
 
     # 텍스트 관련 필드
@@ -107,36 +199,72 @@ def web_search(query: str) -> str:
     return output
 
 
-# Tool 2: 디자인 DB 검색 (텍스트 → CLIP 임베딩 → ChromaDB)
+# Tool 2: 디자인 DB 검색 (텍스트 → CLIP 임베딩 → ChromaDB + 메타데이터 키워드 검색)
 @tool
 def search_design_db(query: str) -> str:
     """사용자가 자연어로 유사 디자인을 검색할 경우 사용되는 tool.
-      예: 둥근 펌프 용기, 사각형 병"""
+      예: 둥근 펌프 용기, 사각형 병, 출원번호 3020250000208"""
 
-    # 텍스트 → CLIP 임베딩
+    # 출원번호가 있으면 번역/임베딩 없이 출원번호 인덱스에서 바로 반환
+    exact = get_design_lookup(image_collection).find_in_text(query)
+    if exact:
+        output = f"'{query}' 출원번호 일치 결과:\n\n"
+        for i, (app_number, entry) in enumerate(exact):
+            output += f"{i+1}. " + _format_lookup_entry(app_number, entry)
+        return output
+
+    lexical_index = get_lexical_index(image_collection)
+
+    # 텍스트 → CLIP 임베딩 → 벡터DB 검색 (실패해도 키워드 검색 결과는 반환)
     embedding, translated = get_text_embedding(query, translate_korean=True)
-    if embedding is None:
-        return "임베딩 생성 실패"
+    vector_results = None
+    if embedding is not None:
+        vector_results = search_and_filter_similar_designs(image_collection, embedding, n_results=10)
 
-    # 벡터DB 검색
-    results = search_and_filter_similar_designs(image_collection, embedding, n_results=5)
+    # 키워드 검색 + 순위 합산
+    results = hybrid_search(vector_results, lexical_index.search(query, n_results=10), n_results=5)
+    if not results:
+        return "검색 결과 없음"
 
     # 결과 정리
     output = f"'{query}' 검색 결과 (번역: '{translated}'):\n\n"
-    for i in range(len(results['ids'][0])):
-        meta = results['metadatas'][0][i]
-        dist = results['distances'][0][i]
+    for i, item in enumerate(results):
+        meta = item['metadata']
+        dist = f"{item['distance']:.4f}" if item['distance'] is not None else "N/A (키워드 일치)"
         output += (
             f"{i+1}. {meta.get('articleName', 'N/A')}\n"
             f"   출원번호: {meta.get('applicationNumber', 'N/A')}\n"
             f"   등록상태: {meta.get('admstStat', 'N/A')}\n"
-            f"   유사도 거리: {dist:.4f}\n\n"
+            f"   유사도 거리: {dist}\n\n"
         )
     return output
 
 
+# Tool 3: 출원번호로 디자인 직접 조회 (출원번호 인덱스, 임베딩/벡터 검색 없음)
+@tool
+def get_design_by_application_number(application_number: str) -> str:
+    """사용자가 출원번호를 알고 있을 때 해당 디자인의 정보(물품명, 등록상태, 도면 수)를 조회하는 tool.
+      예: 3020250000208"""
+    app_number = application_number.strip().replace("-", "")
+    entry = get_design_lookup(image_collection).get(app_number)
+    if entry is None:
+        return f"출원번호 {application_number}에 해당하는 디자인이 DB에 없습니다."
+    return _format_lookup_entry(app_number, entry)
+
+
+def _format_lookup_entry(app_number, entry) -> str:
+    """출원번호 인덱스 항목 → Tool 출력 텍스트"""
+    meta = entry['metadata']
+    return (
+        f"{meta.get('articleName', 'N/A')}\n"
+        f"   출원번호: {app_number}\n"
+        f"   등록상태: {meta.get('admstStat', 'N/A')}\n"
+        f"   도면 수: {len(entry['design_ids'])}\n\n"
+    )
+
+
 # Tool 목록 & LLM 바인딩
-tools = [web_search, search_design_db]
+tools = [web_search, search_design_db, get_design_by_application_number]
 llm_with_tools = llm.bind_tools(tools)
 
 
@@ -144,6 +272,7 @@ llm_with_tools = llm.bind_tools(tools)
 
 # ===== 노드 0: router (2갈래: image / text) =====
 
+@traced_node("router")
 def router_node(state: GraphState) -> GraphState:
     """입력 타입 판단: 이미지가 있으면 image, 아니면 text"""
 
@@ -163,18 +292,23 @@ def route_by_type(state: GraphState) -> str:
 
 # ===== 이미지 경로: VLM 분석 + 벡터 검색 =====
 
+@traced_node("analyze_image")
 def analyze_image_node(state: GraphState) -> GraphState:
     """이미지를 VLM(GPT-4O)으로 형상 분석"""
     print("[VLM분석] 입력 이미지 분석 중 ~")
 
-    # 이미지 → base64
-    with open(state['image_path'], "rb") as f:
-        b64 = base64.b64encode(f.read()).decode('utf-8')
-    url = f"data:image/jpeg;base64,{b64}"
+    # 이미지 → 전처리된 base64 (+ 내용 해시: 같은 도면이면 파일명이 달라도 같은 키)
+    # 업로드 저장소 메모리 캐시에서 가져오므로 디스크를 다시 읽지 않음
+    image_bytes, image_hash = upload_store.load(state['image_path'])
+    url = to_vlm_data_url(upload_store.open_image(state['image_path']),
+                          cache_key=image_hash, original_size=len(image_bytes))
+    state['image_hash'] = image_hash
+    print(f"  전송 이미지 {len(image_bytes) / 1024:.0f}KB → {len(url) * 3 / 4 / 1024:.0f}KB")
 
     # VLM 분석 (IMAGE_ANALYSIS_PROMPT 사용)
     chain = IMAGE_ANALYSIS_PROMPT | llm | output_parser
-    analysis = chain.invoke({"image_url": url}) # vlm 분석 결과가 나올것
+    analysis = call_llm("analyze", chain.invoke, {"image_url": url}) # vlm 분석 결과가 나올것
+    analysis = compact_analysis(analysis)  # 스키마 검증 → 압축 JSON (리포트 입력 토큰 감소)
 
     # 상태 update
     state['base64_image'] = url
@@ -183,13 +317,27 @@ def analyze_image_node(state: GraphState) -> GraphState:
     return state
 
 
+@traced_node("image_search")
 def image_search_node(state: GraphState) -> GraphState:
     """입력 이미지로 벡터DB에서 유사 디자인 10개 검색"""
     print("[벡터검색] 유사 디자인 검색 중...")
 
-    # CLIP 임베딩 → 벡터DB 검색
-    embedding = get_image_embedding(state['image_path'])
-    results = search_and_filter_similar_designs(image_collection, embedding, n_results=10)
+    view_paths = state.get('image_paths') or []
+    if len(view_paths) > 1:
+        # 다중 도면: CLIP 배치 임베딩 1회 → 다중 질의 벡터 검색 1회 → 출원번호별 점수 합산
+        embeddings = get_image_embeddings([upload_store.open_image(path) for path in view_paths])
+        results = search_multi_view(image_collection, embeddings, n_results=10, fusion=MULTI_VIEW_FUSION,
+                                    where=search_where)
+        print(f"  도면 {len(view_paths)}장 검색 ({MULTI_VIEW_FUSION} 합산)")
+    elif region_collection is not None:
+        # 도면 전체 + 영역(부분) 검색 결과를 순위 합산 → 부분만 비슷한 디자인도 후보에 포함
+        results = search_with_regions(image_collection, region_collection,
+                                      upload_store.open_image(state['image_path']), n_results=10,
+                                      where=search_where)
+    else:
+        # CLIP 임베딩 → 벡터DB 검색 (analyze_image에서 디코딩한 이미지 재사용)
+        embedding = get_image_embedding(upload_store.open_image(state['image_path']))
+        results = search_and_filter_similar_designs(image_collection, embedding, n_results=10, where=search_where)
     state['search_results'] = results #검색 원본 저장
 
     # 원본 결과를 사용자에게 보여줄 포맷으로 정리 (인덱스, 디자인id, 거리, 출원번호, 상품명, 등록상태, 이미지 경로)
@@ -207,6 +355,9 @@ def image_search_node(state: GraphState) -> GraphState:
             'article_name': metadata.get('articleName', 'N/A'),
             'admst_stat': metadata.get('admstStat', 'N/A'),
             'image_path': design_id_to_local_image(design_id),
+            'matched_region': metadata.get('region'),  # 영역 검색으로 찾은 경우 일치한 영역 (top/bottom/...)
+            'cluster_id': metadata.get('cluster_id'),    # 유사 중복 클러스터 (dedup_index.py)
+            'cluster_size': metadata.get('cluster_size', 1),
         })
 
     state['comparison_results'] = comparison_results # 최종 유사 디자인 목록 저장
@@ -216,7 +367,7 @@ def image_search_node(state: GraphState) -> GraphState:
 
 # ===== interrupt: 사용자 선택 대기 =====
 
-def show_results_node(state: GraphState) -> GraphState:
+def show_results_node(state: GraphState, config: RunnableConfig) -> GraphState:
     """검색 결과 10개를 보여주고, 사용자 선택을 기다림 (interrupt)"""
     print("\n" + "="*50)
     print("유사 디자인 검색 결과")
@@ -228,76 +379,216 @@ def show_results_node(state: GraphState) -> GraphState:
               f"등록상태: {comp['admst_stat']}, "
               f"거리: {comp['distance']:.4f}")
 
+    # 선택을 기다리는 동안 후보 이미지를 미리 로드/전처리 (재개 시 재실행되어도 중복 없음)
+    thread_id = config["configurable"]["thread_id"]
+    prefetcher.prefetch(thread_id, state['comparison_results'])
+    if SPECULATIVE_TOP1 and state['comparison_results']:
+        snapshot, top1 = dict(state), state['comparison_results'][0]
+        prefetcher.speculate(thread_id, top1['design_id'], lambda: compare_with_design(snapshot, top1))
+
     # ★ interrupt: 여기서 그래프 실행이 멈추고, 사용자 입력을 기다림 ★
     selected = interrupt({
-        "message": "상세 비교할 디자인 번호를 선택하세요! VLM이 선택한 디자인과 입력 디자인을 비교 분석해, 자세한 유사점/차이점을 알려드립니다.",
-        "options": [comp['index'] for comp in state['comparison_results']]
+        "message": "상세 비교할 디자인 번호를 선택하세요! VLM이 선택한 디자인과 입력 디자인을 비교 분석해, 자세한 유사점/차이점을 알려드립니다. (여러 개는 쉼표로 구분, 예: 1,3,5)",
+        "options": [comp['index'] for comp in state['comparison_results']],
+        "max_select": MAX_BATCH_SELECT
     })
 
-    state['selected_index'] = int(selected) # 선택된 디자인 번호 저장
+    indices = parse_selection(selected)
+    state['selected_indices'] = indices  # 선택된 디자인 번호 목록 저장
+    state['selected_index'] = indices[0] # 단일 선택 경로 호환용
 
-    print(f"\n  → {selected}번 디자인 선택됨!")
+    print(f"\n  → {', '.join(map(str, indices))}번 디자인 선택됨!")
     return state
 
 
+def parse_selection(selected) -> List[int]:
+    """
+    interrupt 재개 값을 디자인 번호 목록으로 변환
+
+    "3", 3, "1,3,5", [1, 3, 5] 형태를 모두 허용하며,
+    중복은 제거하고 입력 순서는 유지한다. (최대 MAX_BATCH_SELECT개)
+    """
+    if isinstance(selected, (list, tuple)):
+        raw = list(selected)
+    else:
+        raw = [part for part in str(selected).split(',') if part.strip()]
+
+    indices = []
+    for value in raw:
+        index = int(str(value).strip())
+        if index not in indices:
+            indices.append(index)
+
+    if not indices:
+        raise ValueError("선택한 디자인 번호가 없습니다.")
+    if len(indices) > MAX_BATCH_SELECT:
+        raise ValueError(f"한 번에 최대 {MAX_BATCH_SELECT}개까지 선택할 수 있습니다.")
+    return indices
+
+
 # ===== 상세 비교 & 리포트 =====
 
-def detailed_compare_node(state: GraphState) -> GraphState:
-    """선택한 디자인 1개와 입력 디자인을 VLM 상세 비교"""
+def compare_with_design(state: GraphState, selected: Dict, thread_id: str = None) -> str:
+    """
+    입력 디자인과 비교 대상 디자인 1개를 VLM으로 비교 (단일/일괄 비교 공용)
 
-    print("[상세비교] 분석 중...")
+    thread_id를 넘기면 interrupt 대기 중 프리페치한 이미지/선실행 비교 결과를 사용
+    """
 
-    # comparison_results에서 선택한 디자인 찾기
-    selected = next(
-        (c for c in state['comparison_results'] if c['index'] == state['selected_index']),
-        None
-    )
+    # 만약 선택한 디자인 번호가 존재하지 않을시 오류 메시지 반환
+    if not selected:
+        return "비교 대상 이미지를 찾을 수 없습니다."
 
-    # 만약 선택한 디자인 번호가 존재하지 않거나,이미지 경로/파일이 없을시 오류 메시지 저장 후 종료
-    if not selected or not selected['image_path'] or not os.path.exists(selected['image_path']):
-        state['detailed_comparison'] = "비교 대상 이미지를 찾을 수 없습니다."
-        return state
+    # 비교 대상 형상 분석이 미리 계산되어 있으면 VLM은 유사점/비유사점만 작성
+    # (text 모드: 이미지 없이 두 형상 분석 텍스트만 비교)
+    reference = analysis_store.get(selected['design_id'], ANALYSIS_PROMPT_VERSION, llm.model_name)
+    text_only = COMPARISON_MODE == "text" and reference is not None and bool(state.get('input_analysis'))
+    if text_only:
+        version = TEXT_COMPARISON_PROMPT_VERSION
+    else:
+        version = REFERENCE_COMPARISON_PROMPT_VERSION if reference else COMPARISON_PROMPT_VERSION
+
+    # 같은 도면을 같은 디자인과 비교한 적이 있으면 캐시 결과 반환 (VLM 호출 생략)
+    # 프롬프트에 들어가는 형상 분석도 키에 포함 → 분석이 다시 계산되면 새로 비교
+    version = content_version(version, reference, state['input_analysis'] if text_only else None)
+    cache_key = (state.get('image_hash', ''), selected['design_id'], version, llm.model_name)
+    if cache_key[0]:
+        cached = comparison_cache.get(*cache_key)
+        if cached is not None:
+            print(f"  비교 캐시 적중: {selected['design_id']}")
+            return cached
+
+    # 1순위 비교를 미리 시작해 둔 경우 그 결과 사용 (진행 중이면 완료 대기)
+    if thread_id:
+        speculative = prefetcher.take_speculative(thread_id, selected['design_id'])
+        if speculative is not None:
+            print(f"  선실행 비교 결과 사용: {selected['design_id']}")
+            return speculative
+
+    if text_only:
+        # 텍스트 전용 비교 (TEXT_COMPARISON_PROMPT): 비교 대상 이미지 로드/업로드 없음
+        chain = TEXT_COMPARISON_PROMPT | llm | output_parser
+        inputs = {
+            "input_analysis": state['input_analysis'], # 입력 디자인 형상 분석 (압축 JSON)
+            "reference_analysis": reference # 비교 대상 형상 분석 (미리 계산)
+        }
+    else:
+        # 비교 대상 이미지 → 전처리된 base64
+        # 프리페치된 것이 있으면 사용, 없으면 design_id별 캐시/샤드/파일에서 로드
+        comp_url = prefetcher.get_image(thread_id, selected['design_id']) if thread_id else None
+        if comp_url is None:
+            image_bytes = get_design_image_bytes(selected['design_id'])
+            if image_bytes is None:
+                # 이미지 샤드/파일이 없을시 오류 메시지 반환
+                return "비교 대상 이미지를 찾을 수 없습니다."
+            comp_url = to_vlm_data_url(image_bytes, cache_key=selected['design_id'])
+
+        # 두 이미지 VLM 비교 (IMAGE_COMPARISON_PROMPT, 미리 계산한 분석이 있으면 IMAGE_REFERENCE_COMPARISON_PROMPT)
+        # 입력 이미지는 analyze_image 단계에서 만든 base64를 그대로 재사용
+        inputs = {
+            "input_image_url": state['base64_image'], # 입력 이미지
+            "comparison_image_url": comp_url # 비교 대상 이미지
+        }
+        if reference:
+            chain = IMAGE_REFERENCE_COMPARISON_PROMPT | llm | output_parser
+            inputs["reference_analysis"] = reference
+        else:
+            chain = IMAGE_COMPARISON_PROMPT | llm | output_parser
+    result = call_llm("compare", chain.invoke, inputs)
+    result = compact_comparison(result, reference)  # 스키마 검증 → 압축 JSON (비교 대상 분석은 저장소 값으로)
+
+    if cache_key[0]:
+        comparison_cache.put(*cache_key, result)
+    return result
 
-    # 비교 대상 이미지 → base64
-    with open(selected['image_path'], "rb") as f:
-        b64 = base64.b64encode(f.read()).decode('utf-8')
-    comp_url = f"data:image/jpeg;base64,{b64}"
 
-    # 두 이미지 VLM 비교 (IMAGE_COMPARISON_PROMPT 사용)
-    chain = IMAGE_COMPARISON_PROMPT | llm | output_parser
-    result = chain.invoke({
-        "input_image_url": state['base64_image'], # 입력 이미지
-        "comparison_image_url": comp_url # 비교 대상 이미지
-    })
+def _find_selected(state: GraphState, index: int):
+    """comparison_results에서 번호에 해당하는 디자인 찾기"""
+    return next((c for c in state['comparison_results'] if c['index'] == index), None)
+
 
-    state['detailed_comparison'] = result # 비교 결과 state 저장
+@traced_node("detailed_compare")
+def detailed_compare_node(state: GraphState, config: RunnableConfig) -> GraphState:
+    """선택한 디자인과 입력 디자인을 VLM 상세 비교 (여러 개 선택 시 동시 실행)"""
 
-    print("  상세 비교 완료!")
+    indices = state.get('selected_indices') or [state['selected_index']]
+    thread_id = config["configurable"]["thread_id"]
+    print(f"[상세비교] {len(indices)}개 디자인 분석 중...")
+
+    # 단일 선택: 기존 경로 그대로
+    if len(indices) == 1:
+        state['detailed_comparison'] = compare_with_design(state, _find_selected(state, indices[0]), thread_id)
+        state['detailed_comparisons'] = []
+        prefetcher.discard(thread_id)  # 비교가 끝났으므로 프리페치 캐시 정리
+        print("  상세 비교 완료!")
+        return state
+
+    # 일괄 선택: 동시성 제한을 두고 VLM 비교 병렬 실행 (결과 순서는 선택 순서 유지)
+    # (작업마다 현재 context를 복사해 넘김 → 워커 스레드의 LLM 호출도 같은 요청 트레이스에 기록)
+    targets = [_find_selected(state, index) for index in indices]
+    contexts = [contextvars.copy_context() for _ in targets]
+    with ThreadPoolExecutor(max_workers=min(COMPARE_MAX_CONCURRENCY, len(targets))) as executor:
+        results = list(executor.map(
+            lambda ctx, target: ctx.run(compare_with_design, state, target, thread_id),
+            contexts, targets
+        ))
+    prefetcher.discard(thread_id)
+
+    state['detailed_comparisons'] = [
+        {"index": index, "detailed_comparison": result}
+        for index, result in zip(indices, results)
+    ]
+    state['detailed_comparison'] = results[0]
+
+    print(f"  {len(results)}개 상세 비교 완료!")
     return state
 
 
+def _format_design_info(selected) -> str:
+    """리포트에 넣을 비교 대상 디자인 정보 문자열"""
+    if not selected:
+        return "정보 없음"
+    return (
+        f"출원번호: {selected['application_number']}\n"
+        f"상품명: {selected['article_name']}\n"
+        f"등록상태: {selected['admst_stat']}\n"
+        f"유사도 거리: {selected['distance']:.4f}"
+    )
+
+
+@traced_node("generate_report")
 def generate_report_node(state: GraphState) -> GraphState:
-    """상세 비교 결과로 FTO 리포트 생성"""
+    """상세 비교 결과로 FTO 리포트 생성 (여러 개 선택 시 통합 리포트)"""
     print("[리포트] 생성 중...")
 
-    # comparison_results에서 선택한 디자인 정보 찾기
-    selected = next(
-        (c for c in state['comparison_results'] if c['index'] == state['selected_index']),
-        None
-    )
+    # 일괄 비교: 디자인별 비교 결과를 모아 통합 리포트 1개 생성
+    if state.get('detailed_comparisons'):
+        sections = []
+        for item in state['detailed_comparisons']:
+            selected = _find_selected(state, item['index'])
+            sections.append(
+                f"[{item['index']}번 디자인]\n"
+                f"{_format_design_info(selected)}\n\n"
+                f"{item['detailed_comparison']}"
+            )
+
+        chain = BATCH_REPORT_PROMPT | llm | output_parser
+        report = call_llm("report", chain.invoke, {
+            "input_analysis": state.get('input_analysis', ''),
+            "detailed_comparisons": "\n\n".join(sections),
+            "user_query": state.get('user_query', 'FTO 리포트를 작성해줘')
+        })
 
-    design_info = "정보 없음"
-    if selected:
-        design_info = (
-            f"출원번호: {selected['application_number']}\n"
-            f"상품명: {selected['article_name']}\n"
-            f"등록상태: {selected['admst_stat']}\n"
-            f"유사도 거리: {selected['distance']:.4f}"
-        )
+        state['final_report'] = report
+        print(f"  통합 리포트 완료 ({len(report)}자)")
+        return state
+
+    # comparison_results에서 선택한 디자인 정보 찾기
+    design_info = _format_design_info(_find_selected(state, state['selected_index']))
 
     # 리포트 생성
     chain = REPORT_PROMPT | llm | output_parser
-    report = chain.invoke({
+    report = call_llm("report", chain.invoke, {
         "input_analysis": state.get('input_analysis', ''), # 입력 이미지 분석 결과
         "detailed_comparison": state.get('detailed_comparison', ''), # VLM 상세 비교 결과
         "selected_design_info": design_info, # 비교대상 디자인 정보
@@ -311,8 +602,9 @@ def generate_report_node(state: GraphState) -> GraphState:
 
 # ===== 텍스트 경로: 일반 질문 (LLM + Tools) =====
 
+@traced_node("general_question")
 def general_question_node(state: GraphState) -> GraphState:
-    """LLM이 필요에 따라 web_search, search_design_db Tool을 사용하여 답변 (멀티턴 지원)"""
+    """LLM이 필요에 따라 web_search, search_design_db, get_design_by_application_number Tool을 사용하여 답변 (멀티턴 지원)"""
 
     print("[일반질문] 답변 생성 중...")
 
@@ -326,6 +618,7 @@ def general_question_node(state: GraphState) -> GraphState:
         {"role": "system", "content": (
             "당신은 디자인 특허 전문 어시스턴트입니다.\n"
             "- 디자인 검색이 필요하면 search_design_db 도구를 사용하세요.\n"
+            "- 출원번호로 특정 디자인을 찾으면 get_design_by_application_number 도구를 사용하세요.\n"
             "- 최신 정보, 웹 검색이 필요하면 web_search 도구를 사용하세요.\n"
             "- 이전 대화 내용을 참고하여 일관성 있게 답변하세요.\n"
             "- 답변은 친절하고 정확하게."
@@ -335,7 +628,7 @@ def general_question_node(state: GraphState) -> GraphState:
     ]
 
     # llm이 질문을 보고 tool을 쓸지 말지 스스로 판단
-    response = llm_with_tools.invoke(messages)
+    response = call_llm("general", llm_with_tools.invoke, messages)
 
     if response.tool_calls:
         for tc in response.tool_calls:
@@ -348,7 +641,7 @@ def general_question_node(state: GraphState) -> GraphState:
         for msg in tool_results['messages']:
             messages.append(msg)
 
-        final = llm.invoke(messages)
+        final = call_llm("general", llm.invoke, messages)
         answer = final.content
     else:
         answer = response.content
@@ -410,8 +703,8 @@ def create_graph():
     # 텍스트 경로
     workflow.add_edge("general_question", END)
 
-    # 컴파일 (MemorySaver: interrupt에 필수)
-    graph = workflow.compile(checkpointer=MemorySaver())
+    # 컴파일 (체크포인터: interrupt에 필수, 세션 수명/메모리 상한은 session_store.py)
+    graph = workflow.compile(checkpointer=session_store)
     return graph
 
 
@@ -430,14 +723,18 @@ def run_chatbot(image_path=None, text_query=None, user_query="이 제품과 유
     initial_state = {
         "input_type": "",
         "image_path": image_path or "",
+        "image_paths": [],
         "text_query": text_query or "",
         "user_query": user_query,
         "base64_image": "",
+        "image_hash": "",
         "input_analysis": "",
         "search_results": {},
         "comparison_results": [],
         "selected_index": 0,
+        "selected_indices": [],
         "detailed_comparison": "",
+        "detailed_comparisons": [],
         "final_report": "",
         "general_answer": "",
         "messages": [],
@@ -460,7 +757,7 @@ def run_chatbot(image_path=None, text_query=None, user_query="이 제품과 유
         return result
 
     # 2단계: 이미지 경로 → interrupt에서 멈춤 → 사용자 선택
-    user_choice = input("\n번호 입력 > ")
+    user_choice = input("\n번호 입력 (여러 개는 쉼표로 구분) > ")
 
     # 3단계: 선택값으로 그래프 재개
     result = graph.invoke(Command(resume=user_choice), config)
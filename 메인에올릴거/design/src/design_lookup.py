@@ -0,0 +1,156 @@
+"""
+출원번호 → 디자인 직접 조회 모듈
+
+사용자가 이미 출원번호를 알고 있어도 지금은 유사도 검색이나 LLM 질문으로만 찾을 수 있습니다.
+→ design 컬렉션 메타데이터로 출원번호 → (메타데이터, 도면 design_id 목록) 인덱스를 만들어 저장하고,
+  임베딩/벡터 검색 없이 딕셔너리 조회 1번으로 반환합니다.
+
+- 인덱스는 data/design_lookup.json에 저장, 컬렉션 도면 수가 바뀌면 다시 생성
+- GET /designs/{application_number} (api.py), get_design_by_application_number Tool (design_chatbot.py),
+  search_design_db의 출원번호 정확 일치 경로에서 사용
+
+목록:
+1. APP_NUMBER_PATTERN / find_application_numbers: 텍스트에서 출원번호 추출
+2. DesignLookup: 인덱스 생성/저장/로드/조회
+3. get_design_lookup: 기본 인덱스 (최초 사용 시 로드 또는 생성, 파일이 다시 저장되면 다시 로드)
+
+사용법 (인덱스 미리 생성):
+    python design_lookup.py build
+"""
+
+import os
+import re
+import sys
+import json
+
+from utils import DATA_DIR, CHROMA_DIR, METADATA_SKIP_FIELDS, iter_collection, IndexCache
+
+
+# ==================== 설정 ====================
+
+DEFAULT_LOOKUP_PATH = os.getenv("DESIGN_LOOKUP_PATH", os.path.join(DATA_DIR, "design_lookup.json"))
+
+# 출원번호: 디자인 출원은 30으로 시작하는 13자리 (예: 3020250000208)
+APP_NUMBER_PATTERN = re.compile(r"(?<!\d)(30\d{11})(?!\d)")
+
+
+def find_application_numbers(text):
+    """텍스트 → 출원번호 목록 (등장 순서, 중복 제거)"""
+    return list(dict.fromkeys(APP_NUMBER_PATTERN.findall(str(text))))
+
+
+def _drawing_key(design_id):
+    """도면 정렬 키: design_id 끝의 도면 번호 (IMG-2 < IMG-10)"""
+    number = design_id.rsplit("-", 1)[-1]
+    return (design_id.rsplit("-", 1)[0], int(number) if number.isdigit() else 0)
+
+
+# ==================== 인덱스 ====================
+
+class DesignLookup:
+    """출원번호 → {metadata, design_ids} 인덱스"""
+
+    def __init__(self, path=DEFAULT_LOOKUP_PATH):
+        self.path = path
+        self.source_count = 0        # 인덱스 생성 시점의 컬렉션 도면 수 (변경 감지용)
+        self.applications = {}       # 출원번호 → {"metadata": {...}, "design_ids": [...]}
+
+    def __len__(self):
+        return len(self.applications)
+
+    def __contains__(self, application_number):
+        return str(application_number) in self.applications
+
+    def build(self, collection):
+        """컬렉션 메타데이터 전체로 인덱스 생성"""
+        applications = {}
+        total = 0
+        for page in iter_collection(collection, include=["metadatas"]):
+            for design_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                app_number = str(metadata.get("applicationNumber", design_id.split("-")[0]))
+                entry = applications.setdefault(app_number, {
+                    "metadata": {k: v for k, v in metadata.items() if k not in METADATA_SKIP_FIELDS},
+                    "design_ids": [],
+                })
+                entry["design_ids"].append(design_id)
+            total += len(page["ids"])
+
+        for entry in applications.values():
+            entry["design_ids"].sort(key=_drawing_key)
+        self.applications = applications
+        self.source_count = total
+        return len(applications)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source_count": self.source_count, "applications": self.applications},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """저장된 인덱스 로드 (없으면 False)"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.source_count = data["source_count"]
+        self.applications = data["applications"]
+        return True
+
+    def get(self, application_number):
+        """
+        출원번호 → {"metadata": {...}, "design_ids": [도면 design_id, ...]}
+
+        Returns:
+            dict
+            None: 없는 출원번호
+        """
+        return self.applications.get(str(application_number).strip())
+
+    def find_in_text(self, text):
+        """
+        텍스트에 포함된 출원번호 중 인덱스에 있는 것만 조회
+
+        Returns:
+            list: [(출원번호, entry), ...]
+        """
+        found = []
+        for app_number in find_application_numbers(text):
+            entry = self.applications.get(app_number)
+            if entry is not None:
+                found.append((app_number, entry))
+        return found
+
+
+# ==================== 기본 인덱스 ====================
+
+_default_lookup = IndexCache(DesignLookup, "출원번호 인덱스")
+
+
+def get_design_lookup(collection):
+    """
+    기본 출원번호 인덱스
+
+    저장된 인덱스가 없거나 컬렉션 도면 수가 달라졌으면 다시 생성해 저장한다.
+    실행 중 인덱스 파일이 다시 저장되면(ingest.refresh_indexes) 다음 조회에서 다시 로드한다.
+    """
+    return _default_lookup.get(collection)
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    lookup = DesignLookup()
+    total = lookup.build(client.get_collection(name="design"))
+    lookup.save()
+    print(f"✅ {total}개 출원 → {DEFAULT_LOOKUP_PATH}")
@@ -0,0 +1,244 @@
+"""
+검색 품질 + 속도 평가 도구
+
+정답(관련 출원번호)이 라벨링된 질의 도면 세트로 검색 백엔드들을 실행하고,
+recall@k / MRR / 질의 지연시간을 함께 보고합니다.
+→ n_results, 중복 제거 규칙, 근사 검색/압축 같은 속도 개선을 데이터로 채택/기각
+
+로컬 chroma_db만 사용하며 LLM/인터넷이 필요 없습니다. (완전 오프라인)
+
+라벨 파일 형식 (JSON):
+    [
+      {"query": "queries/pump_01.jpg", "relevant": ["3020250000208", "3020230035272"]},
+      ...
+    ]
+    - query: 질의 도면 경로 (라벨 파일 위치 기준 상대경로 허용)
+    - relevant: 관련 있다고 판단한 출원번호(applicationNumber) 목록
+
+사용법:
+    python evaluate_retrieval.py labels.json
+    python evaluate_retrieval.py labels.json --backends baseline wide_50 --k 1 5 10
+    python evaluate_retrieval.py labels.json --output eval_results/baseline.json
+    python evaluate_retrieval.py labels.json --backends baseline region hybrid   # 영역 인덱스 비교
+    python evaluate_retrieval.py labels.json --backends baseline dedup           # 대표 도면만 검색 비교
+
+목록:
+1. BACKENDS: 평가할 검색 백엔드 목록 (이름 → 검색 함수)
+2. evaluate: 라벨 세트 × 백엔드 → 지표
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import chromadb
+
+from utils import get_image_embedding, search_and_filter_similar_designs, CHROMA_DIR
+from region_index import get_region_collection, search_regions, search_with_regions
+from dedup_index import representatives_filter, REPRESENTATIVE_WHERE
+
+
+# ==================== 설정 ====================
+
+DEFAULT_K = (1, 5, 10)
+
+
+# ==================== 검색 백엔드 ====================
+# 모든 백엔드는 (collection, query_embedding, n_results, query_image) → search_and_filter_similar_designs와
+# 같은 형식의 결과를 반환한다. 새 검색 방식은 여기에 등록해 기존 방식과 같은 라벨로 비교한다.
+# (query_image: 질의 도면 경로. 영역 검색처럼 임베딩 외에 원본 이미지가 필요한 백엔드용)
+
+def _baseline(collection, embedding, n_results, query_image=None):
+    """현재 서비스 설정: 상위 n_results개 검색 후 출원번호 중복 제거"""
+    return search_and_filter_similar_designs(collection, embedding, n_results=n_results)
+
+
+def _wide(fetch):
+    """넓게(fetch개) 검색 후 중복 제거 → 상위 n_results개 출원 (중복 제거로 결과가 줄어드는 문제 비교용)"""
+    def search(collection, embedding, n_results, query_image=None):
+        results = search_and_filter_similar_designs(collection, embedding, n_results=max(fetch, n_results))
+        order = sorted(range(len(results['ids'][0])), key=lambda i: results['distances'][0][i])[:n_results]
+        return {key: [[results[key][0][i] for i in order]] for key in ('ids', 'distances', 'metadatas')}
+    return search
+
+
+BACKENDS = {
+    "baseline": _baseline,
+    "wide_30": _wide(30),
+    "wide_50": _wide(50),
+}
+
+
+def region_backends(region_collection):
+    """영역 인덱스(region_index.py) 백엔드: 영역 검색만 / 전역 + 영역 합산"""
+    def region(collection, embedding, n_results, query_image=None):
+        return search_regions(region_collection, query_image, n_results=n_results)
+
+    def hybrid(collection, embedding, n_results, query_image=None):
+        return search_with_regions(collection, region_collection, query_image,
+                                   n_results=n_results, query_embedding=embedding)
+
+    return {"region": region, "hybrid": hybrid}
+
+
+REGION_BACKENDS = ("region", "hybrid")
+
+
+def _representatives(collection, embedding, n_results, query_image=None):
+    """유사 중복 클러스터의 대표 도면만 검색 (dedup_index.py build 필요)"""
+    return search_and_filter_similar_designs(collection, embedding, n_results=n_results, where=REPRESENTATIVE_WHERE)
+
+
+DEDUP_BACKENDS = {"dedup": _representatives}
+
+
+# ==================== 지표 ====================
+
+def _ranked_app_numbers(results):
+    """검색 결과 → 거리 순 출원번호 목록 (중복 제거)"""
+    pairs = sorted(zip(results['distances'][0], results['metadatas'][0]), key=lambda p: p[0])
+    ranked = []
+    for _, metadata in pairs:
+        app_number = metadata.get('applicationNumber')
+        if app_number not in ranked:
+            ranked.append(app_number)
+    return ranked
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def evaluate(collection, labels, backends, ks=DEFAULT_K, n_results=10):
+    """
+    라벨 세트로 백엔드별 recall@k, MRR, 지연시간 측정
+
+    Args:
+        collection: ChromaDB 컬렉션
+        labels: [{"query": 경로, "relevant": [출원번호, ...]}, ...]
+        backends: {이름: 검색 함수}
+        ks: recall을 계산할 k 목록
+        n_results: 백엔드에 요청할 결과 수 (max(ks) 이상 권장)
+
+    Returns:
+        dict: {"embedding": 임베딩 지연, "backends": {이름: 지표}}
+    """
+    # 질의 임베딩은 한 번만 계산 → 모든 백엔드가 같은 벡터로 검색 (검색 시간만 비교)
+    embeddings, embed_ms = [], []
+    for item in labels:
+        t0 = time.perf_counter()
+        embeddings.append(get_image_embedding(item["query"]))
+        embed_ms.append((time.perf_counter() - t0) * 1000)
+
+    report = {
+        "queries": len(labels),
+        "embedding": {"p50_ms": round(_percentile(embed_ms, 50), 2), "p99_ms": round(_percentile(embed_ms, 99), 2)},
+        "backends": {},
+    }
+
+    for name, search in backends.items():
+        search(collection, embeddings[0], n_results, labels[0]["query"])  # 인덱스 로드 등 첫 호출 비용 제외
+
+        recalls = {k: [] for k in ks}
+        reciprocal_ranks, latencies = [], []
+        for item, embedding in zip(labels, embeddings):
+            relevant = set(item["relevant"])
+
+            t0 = time.perf_counter()
+            results = search(collection, embedding, n_results, item["query"])
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+            ranked = _ranked_app_numbers(results)
+            for k in ks:
+                recalls[k].append(len(relevant & set(ranked[:k])) / len(relevant))
+            rank = next((i + 1 for i, app in enumerate(ranked) if app in relevant), None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+        report["backends"][name] = {
+            **{f"recall@{k}": round(statistics.mean(recalls[k]), 4) for k in ks},
+            "mrr": round(statistics.mean(reciprocal_ranks), 4),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+        }
+    return report
+
+
+def load_labels(path):
+    """라벨 파일 로드 (질의 경로는 라벨 파일 위치 기준으로 해석, 관련 출원이 없는 항목은 제외)"""
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    labels = []
+    for item in items:
+        if not item.get("relevant"):
+            continue
+        query = item["query"]
+        if not os.path.isabs(query):
+            query = os.path.join(base_dir, query)
+        labels.append({"query": query, "relevant": [str(a) for a in item["relevant"]]})
+    return labels
+
+
+def print_report(report, ks):
+    columns = [f"recall@{k}" for k in ks] + ["mrr", "p50_ms", "p99_ms"]
+    print(f"\n질의 {report['queries']}개 | 임베딩 p50 {report['embedding']['p50_ms']}ms")
+    print(f"{'backend':15s}" + "".join(f"{c:>12s}" for c in columns))
+    for name, metrics in report["backends"].items():
+        print(f"{name:15s}" + "".join(f"{metrics[c]:>12}" for c in columns))
+
+
+# ==================== 실행 ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIP/Chroma 검색 품질 + 속도 평가")
+    parser.add_argument("labels", help="라벨 JSON 파일")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS),
+                        choices=list(BACKENDS) + list(REGION_BACKENDS) + list(DEDUP_BACKENDS))
+    parser.add_argument("--k", type=int, nargs="+", default=list(DEFAULT_K))
+    parser.add_argument("--n-results", type=int, default=10, help="백엔드에 요청할 결과 수")
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--collection", default="design")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels)
+    if not labels:
+        print("평가할 라벨이 없습니다.")
+        sys.exit(1)
+
+    client = chromadb.PersistentClient(path=args.chroma_dir)
+    collection = client.get_collection(name=args.collection)
+    print(f"ChromaDB 로드 완료: {collection.count()}개 디자인, 질의 {len(labels)}개")
+
+    backends = dict(BACKENDS)
+    if any(name in REGION_BACKENDS for name in args.backends):
+        region_collection = get_region_collection(client)
+        if region_collection is None:
+            print("영역 인덱스가 없습니다. 먼저 python region_index.py build 를 실행하세요.")
+            sys.exit(1)
+        backends.update(region_backends(region_collection))
+    if any(name in DEDUP_BACKENDS for name in args.backends):
+        if representatives_filter(collection) is None:
+            print("중복 클러스터 정보가 없습니다. 먼저 python dedup_index.py build 를 실행하세요.")
+            sys.exit(1)
+        backends.update(DEDUP_BACKENDS)
+
+    report = evaluate(collection, labels, {name: backends[name] for name in args.backends},
+                      ks=args.k, n_results=max(args.n_results, max(args.k)))
+    print_report(report, args.k)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
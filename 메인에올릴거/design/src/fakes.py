@@ -0,0 +1,270 @@
+"""
+오프라인 실행용 가짜(fake) 구성요소 모듈
+
+OpenAI(GPT-4o), Tavily 웹 검색, ChromaDB 디자인 컬렉션을 결정적인 로컬 가짜로 바꿔,
+API 키/비용 없이 파이프라인 성능을 측정할 수 있게 합니다. (benchmark.py에서 사용)
+
+- FakeChatOpenAI: ChatOpenAI 대체. 설정한 지연시간만큼 대기 후, 프롬프트 내용으로 정해지는 고정 응답 반환
+  (설정한 비율로 429 오류 / 긴 지연(stall)을 주입 → llm_policy.py 재시도/헤징/서킷 브레이커 확인용)
+- FakeWebSearch: TavilySearchResults 대체
+- build_synthetic_collection: 임의(정규화된) 512차원 벡터로 디자인 컬렉션 생성
+- install_fakes: design_chatbot / api 를 import 하기 전에 호출 → 위 가짜들로 교체
+
+주의: CLIP 모델은 실제 모델을 그대로 사용 (로컬 연산이므로 측정 대상)
+"""
+
+import io
+import time
+import random
+import hashlib
+import threading
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+# ==================== 가짜 설정 ====================
+
+# install_fakes()에서 변경 (그래프 import 시점에 이미 만들어진 인스턴스에도 적용되도록 전역으로 관리)
+FAKE_CONFIG = {
+    "llm_latency": 0.0,        # LLM/VLM 호출 1건당 지연 (초)
+    "llm_jitter": 0.0,         # 지연 편차 (0~jitter초 추가, seed 고정)
+    "search_latency": 0.0,     # 웹 검색 1건당 지연 (초)
+    "llm_error_rate": 0.0,     # LLM 호출이 429(FakeRateLimitError)로 실패할 확률
+    "llm_stall_rate": 0.0,     # LLM 호출이 llm_stall초 동안 멈출 확률 (꼬리 지연)
+    "llm_stall": 10.0,
+}
+
+# 이미지 1장의 입력 토큰 추정치 (GPT-4o detail=high, 768px 도면 기준: 85 + 170 × 타일 4개)
+FAKE_IMAGE_TOKENS = 765
+
+_rng = random.Random(0)
+_rng_lock = threading.Lock()
+
+
+def _sleep(base, jitter=0.0):
+    if jitter:
+        with _rng_lock:
+            base += _rng.random() * jitter
+    if base > 0:
+        time.sleep(base)
+
+
+# ==================== 가짜 LLM ====================
+
+_FAKE_ANALYSIS = """{
+  "물품": "용기",
+  "형상_관찰": {
+    "전체_실루엣": "세로로 긴 원통형",
+    "몸체_형태": "원통형 몸체",
+    "상부_구조": "펌프형 캡",
+    "하부_형태": "평평한 바닥",
+    "비례_관계": "높이가 폭의 약 3배"
+  }
+}"""
+
+_FAKE_COMPARISON = """```json
+{
+  "비교_디자인_분석": {
+    "물품": "용기",
+    "형상_관찰": {
+      "전체_실루엣": "세로로 긴 사각기둥형",
+      "몸체_형태": "모서리가 둥근 사각 몸체",
+      "상부_구조": "원형 스크류 캡",
+      "하부_형태": "평평한 바닥",
+      "비례_관계": "높이가 폭의 약 2배"
+    }
+  },
+  "유사한_점": [
+    {"항목": "하부_형태", "설명": "두 디자인 모두 평평한 바닥"}
+  ],
+  "비유사한_점": [
+    {"항목": "몸체_형태", "설명": "원통형 몸체와 사각 몸체"},
+    {"항목": "상부_구조", "설명": "펌프형 캡과 스크류 캡"}
+  ]
+}
+```"""
+
+
+def _message_text(messages):
+    """메시지 목록 → 응답 결정용 텍스트 (이미지 data URL은 길이만 반영)"""
+    parts = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            for part in content:
+                if part.get("type") == "image_url":
+                    parts.append(f"<image:{len(part['image_url']['url'])}>")
+                else:
+                    parts.append(str(part.get("text", "")))
+    return "\n".join(parts)
+
+
+class FakeRateLimitError(Exception):
+    """openai.RateLimitError 대체 (재시도 가능한 오류)"""
+
+    status_code = 429
+
+
+def _inject_fault():
+    """설정한 확률로 오류/긴 지연 주입 (seed 고정)"""
+    if not (FAKE_CONFIG["llm_error_rate"] or FAKE_CONFIG["llm_stall_rate"]):
+        return
+    with _rng_lock:
+        error, stall = _rng.random(), _rng.random()
+    if error < FAKE_CONFIG["llm_error_rate"]:
+        raise FakeRateLimitError("가짜 rate limit 오류")
+    if stall < FAKE_CONFIG["llm_stall_rate"]:
+        time.sleep(FAKE_CONFIG["llm_stall"])
+
+
+class FakeChatOpenAI(BaseChatModel):
+    """ChatOpenAI 대체 가짜 모델 (결정적 응답 + 설정 가능한 지연)"""
+
+    model_name: str = "gpt-4o"
+    temperature: float = 0.0
+
+    def __init__(self, model: str = "gpt-4o", **kwargs: Any):
+        for key in ("api_key", "timeout", "max_retries"):
+            kwargs.pop(key, None)
+        super().__init__(model_name=model, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-openai"
+
+    def bind_tools(self, tools, **kwargs):
+        # 도구 호출 없이 바로 답변 (general_question_node의 도구 미사용 경로)
+        return self
+
+    def _generate(self, messages: List, stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        _inject_fault()
+        _sleep(FAKE_CONFIG["llm_latency"], FAKE_CONFIG["llm_jitter"])
+
+        text = _message_text(messages)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+        # 프롬프트 고유 문구로 응답 형식 결정 (리포트 입력에 포함된 분석/비교 JSON과 구분)
+        if "=== 비교 대상 디자인 형상 분석 ===" in text or "[비교 대상 디자인 - 두 번째 이미지]" in text:
+            content = _FAKE_COMPARISON
+        elif "형상 요소'만을 단계적으로 기록" in text:
+            content = _FAKE_ANALYSIS
+        else:
+            content = f"[fake:{self.model_name}:{digest}] 가짜 응답입니다."
+
+        # 토큰 수는 대략 4자 = 1토큰 + 이미지 1장당 FAKE_IMAGE_TOKENS로 추정
+        prompt_tokens = len(text) // 4 + text.count("<image:") * FAKE_IMAGE_TOKENS
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={"token_usage": usage, "model_name": self.model_name},
+        )
+
+
+# ==================== 가짜 웹 검색 ====================
+
+class FakeWebSearch:
+    """TavilySearchResults 대체 가짜 웹 검색"""
+
+    def __init__(self, max_results=3, **kwargs):
+        self.max_results = max_results
+
+    def invoke(self, query):
+        _sleep(FAKE_CONFIG["search_latency"])
+        return [
+            {"content": f"'{query}' 관련 가짜 검색 결과 {i + 1}", "url": f"https://example.com/{i + 1}"}
+            for i in range(self.max_results)
+        ]
+
+
+# ==================== 합성 디자인 컬렉션 ====================
+
+ARTICLE_NAMES = ["화장품 용기", "펌프 용기", "튜브 용기", "병", "캡", "스프레이 용기", "파우치"]
+ADMST_STATS = ["등록", "공개", "거절", "소멸"]
+
+
+def synthetic_design_id(i, drawings_per_app=3):
+    """합성 design_id (실제 형식과 동일: {출원번호}-09-01-0-IMG-{도면번호})"""
+    return f"30{20200000000 + i // drawings_per_app:011d}-09-01-0-IMG-{i % drawings_per_app}"
+
+
+def build_synthetic_collection(client, name, size, dim=512, seed=0, drawings_per_app=3, batch_size=5000):
+    """
+    임의 벡터로 디자인 컬렉션 생성 (출원 1건당 도면 drawings_per_app개)
+
+    Returns:
+        chromadb Collection
+    """
+    import numpy as np
+
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    collection = client.create_collection(name)
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, batch_size):
+        end = min(size, start + batch_size)
+        vectors = rng.standard_normal((end - start, dim)).astype("float32")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [synthetic_design_id(i, drawings_per_app) for i in range(start, end)]
+        metadatas = [{
+            "applicationNumber": design_id.split("-")[0],
+            "articleName": ARTICLE_NAMES[i % len(ARTICLE_NAMES)],
+            "admstStat": ADMST_STATS[i % len(ADMST_STATS)],
+        } for i, design_id in zip(range(start, end), ids)]
+        collection.add(ids=ids, embeddings=vectors.tolist(), metadatas=metadatas)
+    return collection
+
+
+def synthetic_image_bytes(size=(800, 1000), seed=0):
+    """합성 도면 JPEG bytes (흰 배경 + 도형 몇 개)"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x0, y0 = rng.randrange(size[0] // 2), rng.randrange(size[1] // 2)
+        x1, y1 = x0 + rng.randrange(50, size[0] // 2), y0 + rng.randrange(50, size[1] // 2)
+        draw.rectangle([x0, y0, x1, y1], outline=(0, 0, 0), width=3)
+        draw.ellipse([x0, y0, x1, y1], outline=(0, 0, 0), width=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+# ==================== 설치 ====================
+
+def install_fakes(corpus_size=5000, llm_latency=0.0, llm_jitter=0.0, search_latency=0.0,
+                  llm_error_rate=0.0, llm_stall_rate=0.0, llm_stall=10.0):
+    """
+    가짜 구성요소로 교체 (design_chatbot / api import 전에 호출)
+
+    - langchain_openai.ChatOpenAI → FakeChatOpenAI
+    - langchain_community.tools.TavilySearchResults → FakeWebSearch
+    - chromadb.PersistentClient → 합성 'design' 컬렉션을 가진 인메모리 클라이언트
+
+    Returns:
+        chromadb Client: 인메모리 클라이언트 (추가 컬렉션 생성용)
+    """
+    import chromadb
+    import langchain_openai
+    import langchain_community.tools
+
+    FAKE_CONFIG.update(llm_latency=llm_latency, llm_jitter=llm_jitter, search_latency=search_latency,
+                       llm_error_rate=llm_error_rate, llm_stall_rate=llm_stall_rate, llm_stall=llm_stall)
+
+    langchain_openai.ChatOpenAI = FakeChatOpenAI
+    langchain_community.tools.TavilySearchResults = FakeWebSearch
+
+    client = chromadb.EphemeralClient()
+    build_synthetic_collection(client, "design", corpus_size)
+    chromadb.PersistentClient = lambda *args, **kwargs: client
+    return client
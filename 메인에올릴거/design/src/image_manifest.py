@@ -0,0 +1,229 @@
+"""
+디자인 이미지 매니페스트(인덱스) 모듈
+
+design_id → (이미지 경로, 파일 크기, 가로/세로, 썸네일 경로)를 미리 만들어 JSON으로 저장하고,
+서버 시작 시 한 번 로드해 조회합니다.
+→ 검색 결과마다 파일명 조립 + os.path.exists를 호출하던 것을 딕셔너리 조회 1번으로 대체
+  (네트워크 마운트된 data/images에서 메타데이터 syscall 감소)
+
+매니페스트에 없는 design_id만 기존 방식(파일 존재 확인)으로 찾는다.
+
+목록:
+1. design_id_to_filename / filename_to_design_id: design_id ↔ 이미지 파일명 변환 규칙
+2. ImageManifest: 매니페스트 로드/조회/갱신/저장/생성
+3. get_manifest: 기본 매니페스트 (최초 1회 로드)
+
+사용법 (매니페스트 생성):
+    python image_manifest.py build               # 경로/크기/해상도
+    python image_manifest.py build --thumbnails  # + 썸네일 생성 (data/thumbnails)
+"""
+
+import os
+import sys
+import json
+import threading
+
+from PIL import Image
+
+from utils import DATA_DIR
+
+
+# ==================== 설정 ====================
+
+DEFAULT_IMAGES_DIR = os.path.join(DATA_DIR, "images")
+DEFAULT_MANIFEST_PATH = os.path.join(DATA_DIR, "images_manifest.json")
+DEFAULT_THUMBNAIL_DIR = os.path.join(DATA_DIR, "thumbnails")
+THUMBNAIL_SIZE = (256, 256)
+
+
+# ==================== 파일명 규칙 ====================
+
+def design_id_to_filename(design_id):
+    """
+    design_id → 이미지 파일명
+
+    예: "3020250000208-09-01-0-IMG-0" → "3020250000208-09-01-0_000.jpg"
+
+    Returns:
+        str: 파일명
+        None: 규칙에 맞지 않는 design_id
+    """
+    parts = design_id.split('-IMG-')
+    if len(parts) != 2:
+        return None
+    prefix, image_num = parts
+    return f"{prefix}_{image_num.zfill(3)}.jpg"
+
+
+def filename_to_design_id(filename):
+    """
+    이미지 파일명 → design_id (design_id_to_filename의 역변환)
+
+    예: "3020250000208-09-01-0_000.jpg" → "3020250000208-09-01-0-IMG-0"
+    """
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() != ".jpg" or "_" not in stem:
+        return None
+    prefix, image_num = stem.rsplit("_", 1)
+    if not image_num.isdigit():
+        return None
+    return f"{prefix}-IMG-{int(image_num)}"
+
+
+# ==================== 매니페스트 ====================
+
+class ImageManifest:
+    """design_id → {path, size, width, height, thumbnail} 인덱스"""
+
+    def __init__(self, images_dir=DEFAULT_IMAGES_DIR, manifest_path=DEFAULT_MANIFEST_PATH, entries=None):
+        self.images_dir = images_dir
+        self.manifest_path = manifest_path
+        self._entries = entries or {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, images_dir=DEFAULT_IMAGES_DIR, manifest_path=DEFAULT_MANIFEST_PATH):
+        """저장된 매니페스트 로드 (없으면 빈 매니페스트 → 모든 조회가 파일 확인으로 대체됨)"""
+        entries = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # 경로는 이미지 폴더 기준 파일명으로 저장 → 다른 머신/경로로 옮겨도 사용 가능
+            for design_id, entry in data.get("entries", {}).items():
+                entry = dict(entry)
+                entry["path"] = os.path.join(images_dir, entry.pop("file"))
+                if entry.get("thumbnail"):
+                    entry["thumbnail"] = os.path.join(os.path.dirname(manifest_path), entry["thumbnail"])
+                entries[design_id] = entry
+        return cls(images_dir, manifest_path, entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, design_id):
+        return design_id in self._entries
+
+    def design_ids(self):
+        """등록된 design_id 목록"""
+        return list(self._entries)
+
+    def get(self, design_id):
+        """design_id → 매니페스트 항목 (없으면 None)"""
+        return self._entries.get(design_id)
+
+    def path(self, design_id):
+        """design_id → 이미지 경로 (없으면 None)"""
+        entry = self._entries.get(design_id)
+        return entry["path"] if entry else None
+
+    def update(self, design_id, path, thumbnail=None):
+        """
+        항목 추가/갱신 (인덱서가 새 이미지를 추가할 때 호출, 저장은 save())
+
+        Returns:
+            dict: 갱신된 항목
+        """
+        with Image.open(path) as img:  # 헤더만 읽음 (디코딩 없음)
+            width, height = img.size
+        entry = {
+            "path": path,
+            "size": os.path.getsize(path),
+            "width": width,
+            "height": height,
+            "thumbnail": thumbnail,
+        }
+        with self._lock:
+            self._entries[design_id] = entry
+        return entry
+
+    def remember(self, design_id, path):
+        """파일 확인으로 찾은 경로를 메모리에만 기록 (다음 조회부터 syscall 없음)"""
+        with self._lock:
+            self._entries.setdefault(design_id, {"path": path})
+
+    def save(self):
+        """매니페스트를 JSON으로 저장 (임시 파일 → 교체)"""
+        base_dir = os.path.dirname(self.manifest_path)
+        with self._lock:
+            entries = {}
+            for design_id, entry in self._entries.items():
+                if "size" not in entry:
+                    continue  # remember()로만 기록된 항목은 저장하지 않음
+                stored = dict(entry)
+                stored["file"] = os.path.basename(stored.pop("path"))
+                if stored.get("thumbnail"):
+                    stored["thumbnail"] = os.path.relpath(stored["thumbnail"], base_dir)
+                entries[design_id] = stored
+
+        os.makedirs(base_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def build(self, with_thumbnails=False, thumbnail_dir=DEFAULT_THUMBNAIL_DIR):
+        """
+        이미지 폴더를 한 번 훑어 매니페스트 생성
+
+        Returns:
+            int: 등록된 이미지 수
+        """
+        if with_thumbnails:
+            os.makedirs(thumbnail_dir, exist_ok=True)
+
+        count = 0
+        with os.scandir(self.images_dir) as it:
+            for item in it:
+                design_id = filename_to_design_id(item.name)
+                if design_id is None or not item.is_file():
+                    continue
+
+                thumbnail = None
+                if with_thumbnails:
+                    thumbnail = os.path.join(thumbnail_dir, item.name)
+                    if not os.path.exists(thumbnail):
+                        make_thumbnail(item.path, thumbnail)
+
+                self.update(design_id, item.path, thumbnail)
+                count += 1
+                if count % 1000 == 0:
+                    print(f"  {count}개 처리...")
+        return count
+
+
+def make_thumbnail(src_path, dst_path, size=THUMBNAIL_SIZE):
+    """원본 이미지 → 썸네일 JPEG 저장"""
+    with Image.open(src_path) as img:
+        img.thumbnail(size)
+        img.convert("RGB").save(dst_path, format="JPEG", quality=80)
+
+
+# ==================== 기본 매니페스트 ====================
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    """기본 매니페스트 (프로세스당 최초 1회 로드)"""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = ImageManifest.load()
+                print(f"이미지 매니페스트 로드 완료: {len(_manifest)}개")
+    return _manifest
+
+
+# ==================== 매니페스트 생성 (CLI) ====================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+
+    manifest = ImageManifest(DEFAULT_IMAGES_DIR, DEFAULT_MANIFEST_PATH)
+    print(f"매니페스트 생성 중: {DEFAULT_IMAGES_DIR}")
+    total = manifest.build(with_thumbnails="--thumbnails" in sys.argv)
+    manifest.save()
+    print(f"✅ {total}개 이미지 → {DEFAULT_MANIFEST_PATH}")
@@ -0,0 +1,169 @@
+"""
+VLM 전송용 이미지 전처리 모듈
+
+GPT-4o에 이미지를 보내기 전에 한 번만 디코딩 → RGB 변환 → 리사이즈 → JPEG 재인코딩하고,
+결과(data URL)를 이미지별로 캐시합니다.
+
+리사이즈 기준 (OpenAI detail=high 처리 방식):
+  1) 2048 x 2048 안에 들어오도록 축소
+  2) 짧은 변이 768px이 되도록 축소
+  → 이보다 큰 이미지는 OpenAI 쪽에서 어차피 축소되므로, 미리 줄여 보내도 분석 품질은 같고
+    업로드 시간/요청 크기만 줄어든다. (작은 이미지는 확대하지 않음)
+
+목록:
+1. to_vlm_data_url: 이미지(bytes/경로/PIL) → 전처리된 data URL (캐시)
+2. get_preprocess_stats: 누적 절감 바이트/전처리 시간 통계
+"""
+
+import io
+import sys
+import time
+import base64
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+
+# ==================== 설정 ====================
+
+VLM_MAX_SIDE = 2048          # 1단계: 긴 변 상한
+VLM_SHORT_SIDE = 768         # 2단계: 짧은 변 상한 (VLM 타일 해상도)
+JPEG_QUALITY = 85            # 도면(선화) 기준 품질/용량 균형점
+CACHE_MAX_ITEMS = 128        # data URL 캐시 개수 (1개 약 50~200KB)
+
+
+# ==================== 캐시 & 통계 ====================
+
+_cache = OrderedDict()       # cache_key → data URL
+_lock = threading.Lock()
+_stats = {
+    "images": 0,             # 전처리한 이미지 수 (캐시 적중 제외)
+    "cache_hits": 0,
+    "original_bytes": 0,
+    "sent_bytes": 0,
+    "preprocess_ms": 0.0,
+}
+
+
+def get_preprocess_stats() -> dict:
+    """
+    누적 전처리 통계
+
+    Returns:
+        dict: images, cache_hits, original_bytes, sent_bytes, saved_bytes, saved_ratio, avg_preprocess_ms
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["saved_bytes"] = stats["original_bytes"] - stats["sent_bytes"]
+    stats["saved_ratio"] = stats["saved_bytes"] / stats["original_bytes"] if stats["original_bytes"] else 0.0
+    stats["avg_preprocess_ms"] = stats["preprocess_ms"] / stats["images"] if stats["images"] else 0.0
+    return stats
+
+
+# ==================== 전처리 ====================
+
+def _target_size(width, height):
+    """OpenAI detail=high 기준 목표 크기 (축소만, 확대 없음)"""
+    scale = min(1.0, VLM_MAX_SIDE / max(width, height))                   # 1단계
+    scale *= min(1.0, VLM_SHORT_SIDE / (min(width, height) * scale))      # 2단계
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _to_rgb(image):
+    """EXIF 회전 반영 + RGB 변환 (투명 배경은 흰색으로 합성: 도면 배경 유지)"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def to_vlm_data_url(image, cache_key=None, original_size=None) -> str:
+    """
+    이미지 → VLM 전송용 data URL (RGB, 리사이즈, JPEG 재인코딩)
+
+    Args:
+        image: 원본 이미지 bytes / 파일 경로 / PIL 이미지
+        cache_key: 캐시 키 (입력 이미지 해시, design_id 등)
+                   캐시에 있으면 image를 읽지 않고 바로 반환
+        original_size: PIL 이미지를 넘길 때 원본 바이트 수 (절감량 통계용)
+
+    Returns:
+        str: "data:image/jpeg;base64,..."
+    """
+    if cache_key is not None:
+        with _lock:
+            cached = _cache.get(cache_key)
+            if cached is not None:
+                _cache.move_to_end(cache_key)
+                _stats["cache_hits"] += 1
+                return cached
+
+    start = time.perf_counter()
+
+    # 원본 로드 (bytes/경로는 원본 크기 기록용으로 bytes를 유지)
+    original = None
+    if isinstance(image, Image.Image):
+        pil_image = image
+    else:
+        if isinstance(image, (bytes, memoryview)):
+            original = image  # 샤드 mmap 슬라이스(memoryview)도 복사 없이 사용
+        elif isinstance(image, bytearray):
+            original = bytes(image)
+        else:
+            with open(image, "rb") as f:
+                original = f.read()
+        pil_image = Image.open(io.BytesIO(original))
+
+    rgb = _to_rgb(pil_image)
+    size = _target_size(*rgb.size)
+    resized = size != rgb.size
+    if resized:
+        rgb = rgb.resize(size, Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    rgb.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    encoded = buffer.getvalue()
+
+    # 리사이즈가 필요 없던 JPEG 원본이 더 작으면 원본 그대로 전송
+    if original is not None and not resized and pil_image.format == "JPEG" and len(original) <= len(encoded):
+        encoded = original
+
+    url = f"data:image/jpeg;base64,{base64.b64encode(encoded).decode('utf-8')}"
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    with _lock:
+        _stats["images"] += 1
+        if original is not None:
+            original_size = len(original)
+        _stats["original_bytes"] += original_size or len(encoded)
+        _stats["sent_bytes"] += len(encoded)
+        _stats["preprocess_ms"] += elapsed_ms
+        if cache_key is not None:
+            _cache[cache_key] = url
+            while len(_cache) > CACHE_MAX_ITEMS:
+                _cache.popitem(last=False)
+
+    return url
+
+
+# ==================== 측정 (CLI) ====================
+
+if __name__ == "__main__":
+    # 사용법: python image_preprocess.py ../data/images/*.jpg
+    # 이미지별 원본/전송 바이트와 전처리 시간을 출력
+    for path in sys.argv[1:]:
+        with open(path, "rb") as f:
+            raw = f.read()
+        t0 = time.perf_counter()
+        data_url = to_vlm_data_url(raw)
+        ms = (time.perf_counter() - t0) * 1000
+        sent = len(data_url.split(",", 1)[1]) * 3 // 4
+        print(f"{path}: {len(raw) / 1024:.0f}KB → {sent / 1024:.0f}KB ({ms:.1f}ms)")
+
+    stats = get_preprocess_stats()
+    print(f"\n합계: {stats['original_bytes'] / 1024:.0f}KB → {stats['sent_bytes'] / 1024:.0f}KB "
+          f"({stats['saved_ratio']:.0%} 절감, 평균 {stats['avg_preprocess_ms']:.1f}ms)")
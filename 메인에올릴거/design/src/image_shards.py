@@ -0,0 +1,240 @@
+"""
+디자인 이미지 샤드 저장소 모듈
+
+수천~수만 개의 작은 JPEG 파일(data/images) 대신,
+큰 샤드 파일 몇 개 + design_id별 오프셋 인덱스로 묶어 저장하고 mmap으로 읽습니다.
+
+- 새 서버로 복사: 파일 수천 개 → 샤드 몇 개 (복사/압축 해제가 빠르고 inode 사용 적음)
+- 읽기: mmap 슬라이스(memoryview) → 파일 open/close 없이, 복사 없이 원본 JPEG bytes 반환
+- 저장 내용: 원본 JPEG bytes 그대로 + (선택) 미리 만든 썸네일
+
+디렉토리 구조 (data/shards/):
+    shard-g0001-00000.bin, ...   # 이미지 bytes를 이어 붙인 파일 (pack할 때마다 새 세대 g)
+    index.json                   # 샤드 파일 목록 + design_id → [샤드번호, 오프셋, 길이, 썸네일 오프셋, 썸네일 길이]
+
+다시 pack하면 새 세대 파일을 만든 뒤 index.json만 교체 (실행 중 서버가 mmap한 기존 파일은 덮어쓰지 않음
+→ Windows에서도 교체 가능), 새 인덱스에 없는 샤드 파일은 삭제 (아직 열려 있어 지울 수 없으면 다음 pack에서 삭제)
+
+목록:
+1. pack_shards: 이미지 폴더(매니페스트) → 샤드 파일 생성
+2. ShardStore: mmap 기반 읽기 (원본/썸네일)
+3. get_shard_store: 기본 샤드 저장소 (없으면 None → 기존 파일 경로 사용)
+
+사용법 (샤드 생성):
+    python image_shards.py pack               # 원본만
+    python image_shards.py pack --thumbnails  # + 썸네일
+"""
+
+import io
+import os
+import sys
+import mmap
+import json
+import threading
+
+from PIL import Image
+
+from utils import DATA_DIR
+
+
+# ==================== 설정 ====================
+
+DEFAULT_SHARD_DIR = os.path.join(DATA_DIR, "shards")
+SHARD_MAX_BYTES = 256 * 1024 * 1024     # 샤드 1개 최대 256MB
+THUMBNAIL_SIZE = (256, 256)
+
+
+# ==================== 샤드 생성 ====================
+
+def _thumbnail_bytes(data, size=THUMBNAIL_SIZE):
+    """원본 bytes → 썸네일 JPEG bytes"""
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail(size)
+        buffer = io.BytesIO()
+        img.convert("RGB").save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def pack_shards(items, shard_dir=DEFAULT_SHARD_DIR, with_thumbnails=False, shard_max_bytes=SHARD_MAX_BYTES):
+    """
+    (design_id, 이미지 경로) 목록 → 샤드 파일 + 인덱스 생성
+
+    Args:
+        items: [(design_id, image_path), ...]
+        shard_dir: 샤드 저장 폴더
+        with_thumbnails: 썸네일도 함께 저장할지 여부
+        shard_max_bytes: 샤드 1개 최대 크기
+
+    Returns:
+        int: 저장된 이미지 수
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    index_path = os.path.join(shard_dir, "index.json")
+    generation = 1
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as f:
+            generation = json.load(f).get("generation", 0) + 1
+
+    index, files = {}, []
+    shard_no, offset, out = 0, 0, None
+
+    def open_shard(no):
+        files.append(f"shard-g{generation:04d}-{no:05d}.bin")
+        return open(os.path.join(shard_dir, files[-1]), "wb")
+
+    try:
+        out = open_shard(shard_no)
+        for count, (design_id, path) in enumerate(items, start=1):
+            with open(path, "rb") as f:
+                data = f.read()
+            thumb = _thumbnail_bytes(data) if with_thumbnails else b""
+
+            # 현재 샤드가 가득 차면 다음 샤드로
+            if offset and offset + len(data) + len(thumb) > shard_max_bytes:
+                out.close()
+                shard_no, offset = shard_no + 1, 0
+                out = open_shard(shard_no)
+
+            out.write(data)
+            out.write(thumb)
+            index[design_id] = [shard_no, offset, len(data), offset + len(data), len(thumb)]
+            offset += len(data) + len(thumb)
+
+            if count % 1000 == 0:
+                print(f"  {count}개 처리... (샤드 {shard_no + 1}개)")
+    except BaseException:
+        # 생성 중 실패: 새 세대 파일만 삭제, 기존 샤드/인덱스는 그대로 사용
+        if out:
+            out.close()
+        for name in files:
+            if os.path.exists(os.path.join(shard_dir, name)):
+                os.remove(os.path.join(shard_dir, name))
+        raise
+    out.close()
+
+    # 인덱스만 원자적으로 교체 → 새로 여는 ShardStore부터 새 세대 파일 사용
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "generation": generation, "shards": len(files), "files": files,
+                   "entries": index}, f)
+    os.replace(index_path + ".tmp", index_path)
+
+    _remove_unused_shards(shard_dir, set(files))
+    return len(index)
+
+
+def _remove_unused_shards(shard_dir, keep):
+    """새 인덱스에 없는 샤드 파일 삭제 (실행 중 서버가 mmap한 파일은 Windows에서 실패 → 다음 pack에서 삭제)"""
+    for name in os.listdir(shard_dir):
+        if not name.startswith("shard-") or name in keep:
+            continue
+        try:
+            os.remove(os.path.join(shard_dir, name))
+        except OSError as e:
+            print(f"⚠️ 이전 샤드 삭제 보류 ({name}): {e}")
+
+
+# ==================== 샤드 읽기 ====================
+
+class ShardStore:
+    """mmap 기반 샤드 저장소 (읽기 전용)"""
+
+    def __init__(self, shard_dir=DEFAULT_SHARD_DIR):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, "index.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._index = data["entries"]
+        # 샤드 파일명 (version 1 인덱스는 세대 없이 shard-00000.bin)
+        self._files = data.get("files") or [f"shard-{no:05d}.bin" for no in range(data["shards"])]
+        self._maps = [None] * len(self._files)   # 샤드별 mmap (처음 접근 시 매핑)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, design_id):
+        return design_id in self._index
+
+    def _map(self, shard_no):
+        mapped = self._maps[shard_no]
+        if mapped is None:
+            with self._lock:
+                mapped = self._maps[shard_no]
+                if mapped is None:
+                    path = os.path.join(self.shard_dir, self._files[shard_no])
+                    with open(path, "rb") as f:
+                        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                    self._maps[shard_no] = mapped
+        return mapped
+
+    def get(self, design_id):
+        """
+        design_id → 원본 JPEG bytes (memoryview, 복사 없음)
+
+        Returns:
+            memoryview: 원본 이미지 bytes
+            None: 샤드에 없는 design_id
+        """
+        entry = self._index.get(design_id)
+        if entry is None:
+            return None
+        shard_no, offset, length = entry[0], entry[1], entry[2]
+        return self._map(shard_no)[offset:offset + length]
+
+    def get_thumbnail(self, design_id):
+        """design_id → 썸네일 JPEG bytes (memoryview, 썸네일 없이 생성했으면 None)"""
+        entry = self._index.get(design_id)
+        if entry is None or not entry[4]:
+            return None
+        shard_no, thumb_offset, thumb_length = entry[0], entry[3], entry[4]
+        return self._map(shard_no)[thumb_offset:thumb_offset + thumb_length]
+
+
+# ==================== 기본 샤드 저장소 ====================
+
+_store = None
+_store_loaded = False
+_store_lock = threading.Lock()
+
+
+def get_shard_store():
+    """
+    기본 샤드 저장소 (data/shards/index.json이 있을 때만)
+
+    Returns:
+        ShardStore: 샤드 저장소
+        None: 샤드를 만들지 않은 경우 → 기존 이미지 파일 사용
+    """
+    global _store, _store_loaded
+    if not _store_loaded:
+        with _store_lock:
+            if not _store_loaded:
+                if os.path.exists(os.path.join(DEFAULT_SHARD_DIR, "index.json")):
+                    _store = ShardStore(DEFAULT_SHARD_DIR)
+                    print(f"이미지 샤드 로드 완료: {len(_store)}개")
+                _store_loaded = True
+    return _store
+
+
+# ==================== 샤드 생성 (CLI) ====================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "pack":
+        print(__doc__)
+        sys.exit(1)
+
+    from image_manifest import get_manifest, filename_to_design_id, DEFAULT_IMAGES_DIR
+
+    # 매니페스트가 있으면 그 목록을, 없으면 이미지 폴더를 훑어서 사용
+    manifest = get_manifest()
+    if len(manifest):
+        items = [(design_id, manifest.path(design_id)) for design_id in sorted(manifest.design_ids())]
+    else:
+        items = sorted(
+            (filename_to_design_id(name), os.path.join(DEFAULT_IMAGES_DIR, name))
+            for name in os.listdir(DEFAULT_IMAGES_DIR)
+            if filename_to_design_id(name)
+        )
+
+    print(f"샤드 생성 중: {len(items)}개 이미지 → {DEFAULT_SHARD_DIR}")
+    total = pack_shards(items, with_thumbnails="--thumbnails" in sys.argv)
+    print(f"✅ {total}개 이미지 패킹 완료")
@@ -0,0 +1,375 @@
+"""
+신규 디자인 공보 증분 반영(ingest) 모듈
+
+design 컬렉션은 한 번 내려받은 고정 데이터라, 새로 공개/등록된 디자인이 검색되지 않습니다.
+→ 새 도면 이미지 + 메타데이터만 골라 배치로 임베딩해 Chroma에 upsert하고,
+  등록상태(admstStat) 등 메타데이터 변경은 재임베딩 없이 갱신합니다.
+
+- 워터마크: 입력 소스별로 마지막으로 반영한 파일 수정 시각을 data/ingest_state.json에 저장
+  → 매일 실행해도 그 이후에 추가/수정된 도면만 처리 (배치마다 저장 → 중단 후 재실행 시 이어서)
+  (수정 시각을 보존해 복사한 파일(cp -p 등)은 워터마크보다 이전일 수 있음 → --full)
+- 도면 파일은 data/images로 먼저 복사한 뒤 upsert하고 이미지 매니페스트에 추가 (get_design_image_bytes로 바로 조회 가능)
+- 열 수 없는(손상된) 도면은 건너뛰고 실행 기록(stats["failures"])에 남김 → 워터마크는 그대로 진행
+  (파일을 고쳐 다시 저장하면 수정 시각이 바뀌므로 다음 실행에서 다시 처리)
+- 반영 후 키워드 색인 / 출원번호 인덱스를 다시 생성 (실행 중인 API 서버는 재시작 시 반영)
+
+주의: chroma_db를 두 프로세스가 동시에 쓰면 안 됩니다.
+      - API를 단일 프로세스로 실행 중이면: API 중지 → ingest.py 실행 → API 재시작
+      - 모델 서버(model_server.py)로 실행 중이면: MODEL_SERVER_SOCKET을 설정하고 실행 → 모델 서버를 통해 반영
+        (API 워커는 키워드 색인 / 출원번호 인덱스 / 매니페스트를 재시작 시 다시 읽음)
+
+입력 형식:
+1) 매니페스트 JSON (목록)
+    [
+      {"image": "new/3020250001234-09-01-0_000.jpg",
+       "metadata": {"applicationNumber": "3020250001234", "articleName": "화장품 용기", "admstStat": "공개"}},
+      {"applicationNumber": "3020230035272", "admstStat": "등록"}     # 메타데이터만 변경 (재임베딩 없음)
+    ]
+    - design_id는 이미지 파일명 규칙(image_manifest.py)에서 계산 (다르면 "design_id" 키로 지정)
+2) 폴더
+    new/
+      3020250001234-09-01-0_000.jpg ...
+      metadata.json      # {"출원번호": {"articleName": ..., "admstStat": ...}, ...}
+      status.json        # (선택) {"출원번호": "등록", ...} 등록상태 변경
+
+목록:
+1. load_records: 입력(폴더/JSON) → 도면 레코드 + 메타데이터 변경 레코드
+2. IngestState: 소스별 워터마크 저장/로드
+3. ingest: 증분 반영 (배치 임베딩 + upsert + 메타데이터 갱신 + 매니페스트/색인 갱신)
+4. refresh_indexes: 키워드 색인 / 출원번호 인덱스 재생성 (메타데이터만 바뀌어도 호출, analysis_store.py에서도 사용)
+
+사용법:
+    python ingest.py new/                         # 폴더
+    python ingest.py new_designs.json             # 매니페스트 JSON
+    python ingest.py new/ --thumbnails --regions  # + 썸네일, 영역 인덱스
+    python ingest.py new/ --full                  # 워터마크 무시하고 전체 다시 반영
+    MODEL_SERVER_SOCKET=/tmp/design_model_server.sock python ingest.py new/   # 실행 중인 모델 서버를 통해 반영
+"""
+
+import os
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+from PIL import Image
+
+from utils import get_image_embeddings, DATA_DIR, CHROMA_DIR
+from model_server import MODEL_SERVER_SOCKET, RemoteChromaClient
+from image_manifest import (get_manifest, design_id_to_filename, filename_to_design_id, make_thumbnail,
+                            DEFAULT_IMAGES_DIR, DEFAULT_THUMBNAIL_DIR)
+
+
+# ==================== 설정 ====================
+
+DEFAULT_STATE_PATH = os.getenv("INGEST_STATE_PATH", os.path.join(DATA_DIR, "ingest_state.json"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))   # CLIP 배치 1회에 넣을 도면 수
+
+
+# ==================== 입력 읽기 ====================
+
+def _app_number(design_id):
+    return design_id.split("-")[0]
+
+
+def load_records(source):
+    """
+    입력 → (도면 레코드, 메타데이터 변경 레코드)
+
+    Returns:
+        tuple:
+            images: [{"design_id", "image"(경로), "metadata"}, ...]
+            updates: [{"applicationNumber", 변경할 필드...}, ...]
+    """
+    images, updates = [], []
+
+    if os.path.isdir(source):
+        def read_json(name):
+            path = os.path.join(source, name)
+            if not os.path.exists(path):
+                return {}
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+        metadata_by_app = read_json("metadata.json")
+        for name in sorted(os.listdir(source)):
+            design_id = filename_to_design_id(name)
+            if design_id is None:
+                continue
+            app_number = _app_number(design_id)
+            images.append({
+                "design_id": design_id,
+                "image": os.path.join(source, name),
+                "metadata": dict(metadata_by_app.get(app_number, {})),
+            })
+        updates = [{"applicationNumber": app, "admstStat": stat} for app, stat in read_json("status.json").items()]
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            items = json.load(f)
+        for item in items:
+            if "image" not in item:
+                updates.append(dict(item))
+                continue
+            path = item["image"] if os.path.isabs(item["image"]) else os.path.join(base_dir, item["image"])
+            design_id = item.get("design_id") or filename_to_design_id(os.path.basename(path))
+            if design_id is None or design_id_to_filename(design_id) is None:
+                print(f"  ⚠️ design_id를 알 수 없어 건너뜀: {path}")
+                continue
+            images.append({"design_id": design_id, "image": path, "metadata": dict(item.get("metadata", {}))})
+
+    for record in images:
+        record["metadata"].setdefault("applicationNumber", _app_number(record["design_id"]))
+    return images, updates
+
+
+# ==================== 워터마크 ====================
+
+class IngestState:
+    """소스별 워터마크 (마지막으로 반영한 파일 수정 시각, ns)"""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self.data = {"sources": {}, "runs": []}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def watermark(self, source):
+        """
+        Returns:
+            tuple: (워터마크 시각, 그 시각에 수정된 파일 중 이미 반영한 design_id 집합)
+        """
+        entry = self.data["sources"].get(os.path.abspath(source), {})
+        return entry.get("watermark_ns", 0), set(entry.get("watermark_ids", []))
+
+    def advance(self, source, processed):
+        """processed: 반영을 마친 [(수정 시각, design_id), ...] (시각 오름차순)"""
+        entry = self.data["sources"].setdefault(os.path.abspath(source), {})
+        watermark_ns = processed[-1][0]
+        ids = {design_id for mtime, design_id in processed if mtime == watermark_ns}
+        if entry.get("watermark_ns") == watermark_ns:
+            ids |= set(entry.get("watermark_ids", []))
+        entry["watermark_ns"] = watermark_ns
+        entry["watermark_ids"] = sorted(ids)
+        self.save()
+
+    def record_run(self, source, stats):
+        self.data["runs"] = (self.data["runs"] + [{
+            "source": os.path.abspath(source),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            **stats,
+        }])[-30:]   # 최근 30회만 유지
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# ==================== 반영 ====================
+
+def _store_image(record, images_dir, thumbnail_dir):
+    """도면 파일을 이미지 폴더로 복사 → (저장 경로, 썸네일 경로)"""
+    filename = design_id_to_filename(record["design_id"])
+    dst_path = os.path.join(images_dir, filename)
+    if os.path.abspath(record["image"]) != os.path.abspath(dst_path):
+        shutil.copy2(record["image"], dst_path)
+
+    thumbnail = None
+    if thumbnail_dir:
+        thumbnail = os.path.join(thumbnail_dir, filename)
+        make_thumbnail(dst_path, thumbnail)
+    return dst_path, thumbnail
+
+
+def _merge_metadata(collection, records):
+    """
+    upsert할 메타데이터 목록
+
+    이미 있는 도면(이미지/메타데이터 갱신): 저장된 메타데이터에 새 필드만 덮어씀
+    → dedup 클러스터(cluster_id 등), shape_descriptor처럼 다른 단계에서 쓴 필드 유지
+    새 도면: 다음 dedup_index.py build 전까지 혼자인 클러스터 (대표 도면 검색에서도 보이도록)
+    """
+    ids = [record["design_id"] for record in records]
+    current = collection.get(ids=ids, include=["metadatas"])
+    stored = dict(zip(current["ids"], current["metadatas"]))
+
+    metadatas = []
+    for record in records:
+        design_id = record["design_id"]
+        if design_id in stored:
+            metadatas.append({**(stored[design_id] or {}), **record["metadata"]})
+        else:
+            metadatas.append({**record["metadata"], "cluster_id": design_id, "is_representative": True,
+                              "cluster_size": 1})
+    return metadatas
+
+
+def _embed_batch(collection, batch, images_dir, thumbnail_dir, manifest):
+    """
+    도면 배치 → 이미지 폴더 복사 + CLIP 배치 임베딩 1회 → upsert + 매니페스트 갱신
+
+    열 수 없는(손상된) 도면은 배치에서 빼고 계속 진행
+
+    Returns:
+        list: 건너뛴 도면 [{"design_id", "image", "error"}, ...]
+    """
+    records, opened, failed = [], [], []
+    for record in batch:
+        try:
+            with Image.open(record["image"]) as img:
+                opened.append(img.convert("RGB"))
+        except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"  ⚠️ 도면을 열 수 없어 건너뜀 ({record['design_id']}): {error}")
+            failed.append({"design_id": record["design_id"], "image": record["image"], "error": error})
+            continue
+        records.append(record)
+    if not records:
+        return failed
+
+    embeddings = get_image_embeddings(opened)
+    if embeddings is None:
+        raise RuntimeError("CLIP 임베딩 실패")
+
+    # 이미지 파일을 먼저 저장 → 검색에 나온 도면은 항상 이미지를 조회할 수 있음 (upsert 후 중단되어도)
+    stored = [_store_image(record, images_dir, thumbnail_dir) for record in records]
+    collection.upsert(
+        ids=[record["design_id"] for record in records],
+        embeddings=embeddings,
+        metadatas=_merge_metadata(collection, records),
+    )
+    for record, (path, thumbnail) in zip(records, stored):
+        manifest.update(record["design_id"], path, thumbnail)
+    return failed
+
+
+def _apply_updates(collection, updates):
+    """
+    메타데이터 변경 (재임베딩 없음): 출원번호의 모든 도면에서 값이 달라진 것만 update
+
+    Returns:
+        int: 갱신한 도면 수
+    """
+    changed = 0
+    for update in updates:
+        app_number = str(update["applicationNumber"])
+        fields = {k: v for k, v in update.items() if k != "applicationNumber"}
+        current = collection.get(where={"applicationNumber": app_number}, include=["metadatas"])
+
+        ids, metadatas = [], []
+        for design_id, metadata in zip(current["ids"], current["metadatas"]):
+            if any(metadata.get(k) != v for k, v in fields.items()):
+                ids.append(design_id)
+                metadatas.append({**metadata, **fields})
+        if ids:
+            collection.update(ids=ids, metadatas=metadatas)
+            changed += len(ids)
+    return changed
+
+
+def ingest(collection, source, state=None, batch_size=INGEST_BATCH_SIZE, full=False,
+           images_dir=DEFAULT_IMAGES_DIR, thumbnail_dir=None):
+    """
+    입력 소스의 신규/수정 도면과 메타데이터 변경을 컬렉션에 반영
+
+    반영한 도면이나 메타데이터 변경이 있으면 키워드 색인 / 출원번호 인덱스도 다시 생성
+    (등록상태 변경은 도면 수가 그대로라 get_lexical_index의 변경 감지로는 알 수 없음)
+
+    Args:
+        collection: design 컬렉션
+        source: 입력 폴더 또는 매니페스트 JSON 경로
+        state: IngestState (워터마크)
+        full: True면 워터마크를 무시하고 모든 도면 반영
+        thumbnail_dir: 지정하면 썸네일도 생성
+
+    Returns:
+        dict: {"embedded": 임베딩한 도면 수, "skipped": 워터마크 이전이라 건너뛴 수,
+               "failed": 열 수 없어 건너뛴 수, "failures": [{"design_id", "image", "error"}, ...],
+               "updated": 메타데이터 갱신 수}
+    """
+    state = state or IngestState()
+    manifest = get_manifest()
+    os.makedirs(images_dir, exist_ok=True)
+    if thumbnail_dir:
+        os.makedirs(thumbnail_dir, exist_ok=True)
+
+    images, updates = load_records(source)
+
+    # 워터마크 이후에 추가/수정된 도면만 (수정 시각 순으로 처리 → 배치마다 워터마크 저장)
+    # 워터마크와 같은 시각의 파일은 이미 반영한 design_id만 건너뜀 (배치 경계에 같은 시각 파일이 걸친 경우)
+    watermark, done_ids = (0, set()) if full else state.watermark(source)
+    pending = []
+    for record in images:
+        mtime = os.stat(record["image"]).st_mtime_ns
+        if mtime > watermark or (mtime == watermark and record["design_id"] not in done_ids):
+            pending.append((mtime, record))
+    pending.sort(key=lambda item: item[0])
+    stats = {"embedded": 0, "skipped": len(images) - len(pending), "failed": 0, "failures": [], "updated": 0}
+
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        failed = _embed_batch(collection, [record for _, record in chunk], images_dir, thumbnail_dir, manifest)
+        manifest.save()
+        # 손상된 도면도 워터마크에 포함 (매 실행마다 다시 시도하지 않음, 실패 목록은 실행 기록에 남음)
+        state.advance(source, [(mtime, record["design_id"]) for mtime, record in chunk])
+        stats["embedded"] += len(chunk) - len(failed)
+        stats["failed"] += len(failed)
+        stats["failures"].extend(failed)
+        print(f"  {stats['embedded'] + stats['failed']}/{len(pending)}개 도면 처리 (실패 {stats['failed']}개)")
+
+    stats["updated"] = _apply_updates(collection, updates)
+    if stats["embedded"] or stats["updated"]:
+        refresh_indexes(collection)
+        print("  키워드 색인 / 출원번호 인덱스 갱신")
+    state.record_run(source, stats)
+    return stats
+
+
+def refresh_indexes(collection):
+    """컬렉션에서 만드는 색인(키워드 / 출원번호) 다시 생성"""
+    from lexical_index import LexicalIndex
+    from design_lookup import DesignLookup
+
+    for index in (LexicalIndex(), DesignLookup()):
+        index.build(collection)
+        index.save()
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="신규 디자인 증분 반영")
+    parser.add_argument("source", help="입력 폴더 또는 매니페스트 JSON")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--full", action="store_true", help="워터마크 무시하고 전체 다시 반영")
+    parser.add_argument("--thumbnails", action="store_true", help="썸네일 생성 (data/thumbnails)")
+    parser.add_argument("--regions", action="store_true", help="새 도면을 영역 인덱스에도 추가")
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--collection", default="design")
+    args = parser.parse_args()
+
+    if MODEL_SERVER_SOCKET:
+        # 모델 서버 프로세스가 chroma_db를 열고 있으므로 서버를 통해 반영 (임베딩도 서버에서 계산)
+        client = RemoteChromaClient()
+    else:
+        client = chromadb.PersistentClient(path=args.chroma_dir)
+    collection = client.get_collection(name=args.collection)
+    print(f"증분 반영: {args.source} → '{args.collection}' (현재 {collection.count()}개 도면)")
+
+    stats = ingest(collection, args.source, batch_size=args.batch_size, full=args.full,
+                   thumbnail_dir=DEFAULT_THUMBNAIL_DIR if args.thumbnails else None)
+    print(f"✅ 임베딩 {stats['embedded']}개, 건너뜀 {stats['skipped']}개, 메타데이터 갱신 {stats['updated']}개")
+    for failure in stats["failures"]:
+        print(f"  ⚠️ 실패: {failure['image']} ({failure['error']})")
+
+    if stats["embedded"] and args.regions:
+        from region_index import get_region_collection, build_region_index
+        region_stats = build_region_index(collection, get_region_collection(client, create=True))
+        print(f"✅ 영역 인덱스: 도면 {region_stats['designs']}개 추가")
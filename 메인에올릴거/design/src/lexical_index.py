@@ -0,0 +1,227 @@
+"""
+디자인 메타데이터 키워드(BM25) 검색 모듈
+
+search_design_db는 텍스트 → (번역) → CLIP 벡터 검색만 하므로,
+정확한 물품명이나 출원번호가 질의에 있어도 키워드로 맞추지 못합니다.
+→ design 컬렉션 메타데이터(articleName, applicationNumber 등)로 역색인(BM25)을 만들어
+  벡터 검색과 함께 실행하고 순위 합산(RRF)합니다.
+
+- 문서 단위: 출원번호 1건 (같은 출원의 도면들은 메타데이터가 같으므로 1문서로 묶음)
+- 토큰화: 영문/숫자 단어 + 한글 어절과 글자 2-gram (형태소 분석기 없이 부분 일치 지원)
+- 질의의 출원번호 정확 일치는 design_lookup.py(출원번호 인덱스)에서 처리
+- 색인은 data/lexical_index.json에 저장, 컬렉션 크기가 바뀌면 다시 생성
+
+목록:
+1. tokenize: 텍스트 → 검색 토큰
+2. LexicalIndex: 역색인 생성/저장/로드, BM25 검색
+3. hybrid_search: 벡터 검색 결과 + 키워드 검색 결과 RRF 합산
+4. get_lexical_index: 기본 색인 (최초 사용 시 로드 또는 생성, 파일이 다시 저장되면 다시 로드)
+
+사용법 (색인 미리 생성):
+    python lexical_index.py build
+"""
+
+import os
+import re
+import sys
+import json
+import math
+from collections import Counter, defaultdict
+
+from utils import DATA_DIR, CHROMA_DIR, METADATA_SKIP_FIELDS, iter_collection, IndexCache
+
+
+# ==================== 설정 ====================
+
+DEFAULT_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(DATA_DIR, "lexical_index.json"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+
+
+# ==================== 토큰화 ====================
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+|[가-힣]+")
+
+
+def tokenize(text):
+    """
+    텍스트 → 검색 토큰 목록
+
+    한글 어절은 그대로 + 글자 2-gram (띄어쓰기가 달라도 부분 일치)
+    예: "화장품용기 3020250000208" → ["화장품용기", "화장", "장품", "품용", "용기", "3020250000208"]
+    """
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(str(text).lower()):
+        tokens.append(word)
+        if '가' <= word[0] <= '힣' and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+# ==================== 역색인 ====================
+
+class LexicalIndex:
+    """출원번호 단위 BM25 역색인"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.source_count = 0        # 색인 생성 시점의 컬렉션 도면 수 (변경 감지용)
+        self.docs = []               # [(출원번호, 대표 design_id, metadata), ...]
+        self.doc_len = []            # 문서별 토큰 수
+        self.postings = {}           # 토큰 → [[문서 번호, 빈도], ...]
+        self._avg_len = 0.0
+
+    def __len__(self):
+        return len(self.docs)
+
+    # ---------- 생성 / 저장 / 로드 ----------
+
+    def build(self, collection):
+        """컬렉션 메타데이터 전체로 역색인 생성 (출원번호별 1문서)"""
+        by_app = {}
+        total = 0
+        for page in iter_collection(collection, include=["metadatas"]):
+            for design_id, metadata in zip(page["ids"], page["metadatas"]):
+                metadata = metadata or {}
+                app_number = str(metadata.get("applicationNumber", design_id.split("-")[0]))
+                # 대표 도면: design_id 정렬상 가장 앞 (보통 IMG-0)
+                if app_number not in by_app or design_id < by_app[app_number][0]:
+                    by_app[app_number] = (design_id, metadata)
+            total += len(page["ids"])
+
+        postings = defaultdict(list)
+        self.docs, self.doc_len = [], []
+        for doc_id, (app_number, (design_id, metadata)) in enumerate(sorted(by_app.items())):
+            text = " ".join(str(v) for k, v in metadata.items() if k not in METADATA_SKIP_FIELDS)
+            counts = Counter(tokenize(f"{app_number} {text}"))
+            for token, tf in counts.items():
+                postings[token].append([doc_id, tf])
+            self.docs.append((app_number, design_id, metadata))
+            self.doc_len.append(sum(counts.values()))
+
+        self.postings = dict(postings)
+        self.source_count = total
+        self._reindex()
+        return len(self.docs)
+
+    def _reindex(self):
+        self._avg_len = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source_count": self.source_count,
+                "docs": self.docs,
+                "doc_len": self.doc_len,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """저장된 색인 로드 (없으면 False)"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.source_count = data["source_count"]
+        self.docs = [tuple(doc) for doc in data["docs"]]
+        self.doc_len = data["doc_len"]
+        self.postings = data["postings"]
+        self._reindex()
+        return True
+
+    # ---------- 검색 ----------
+
+    def search(self, query, n_results=10):
+        """
+        BM25 키워드 검색
+
+        Returns:
+            list: [(출원번호, 대표 design_id, metadata, 점수), ...] 점수 내림차순
+        """
+        scores = defaultdict(float)
+        n_docs = len(self.docs)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / self._avg_len)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(*self.docs[doc_id], score) for doc_id, score in ranked]
+
+
+# ==================== 하이브리드 검색 ====================
+
+def hybrid_search(vector_results, lexical_results, n_results=5, rrf_k=RRF_K):
+    """
+    벡터 검색 결과 + 키워드 검색 결과를 출원번호 단위 RRF로 합산
+
+    두 점수는 척도가 달라(거리 vs BM25) 순위만 사용한다.
+
+    Args:
+        vector_results: search_and_filter_similar_designs 결과 (없으면 None)
+        lexical_results: LexicalIndex.search 결과
+        n_results: 반환할 출원 수
+
+    Returns:
+        list: [{'design_id', 'metadata', 'distance'(벡터 검색에 없으면 None),
+                'lexical_score'(키워드 검색에 없으면 None), 'score'}, ...] 합산 점수 내림차순
+    """
+    fused = {}
+
+    if vector_results is not None:
+        pairs = sorted(zip(vector_results['ids'][0], vector_results['distances'][0], vector_results['metadatas'][0]),
+                       key=lambda p: p[1])
+        for rank, (design_id, distance, metadata) in enumerate(pairs, start=1):
+            app_number = str(metadata.get('applicationNumber', 'N/A'))
+            item = fused.setdefault(app_number, {'design_id': design_id, 'metadata': metadata,
+                                                 'distance': None, 'lexical_score': None, 'score': 0.0})
+            item['distance'] = distance
+            item['score'] += 1.0 / (rrf_k + rank)
+
+    for rank, (app_number, design_id, metadata, lexical_score) in enumerate(lexical_results, start=1):
+        item = fused.setdefault(app_number, {'design_id': design_id, 'metadata': metadata,
+                                             'distance': None, 'lexical_score': None, 'score': 0.0})
+        item['lexical_score'] = lexical_score
+        item['score'] += 1.0 / (rrf_k + rank)
+
+    return sorted(fused.values(), key=lambda item: item['score'], reverse=True)[:n_results]
+
+
+# ==================== 기본 색인 ====================
+
+_default_index = IndexCache(LexicalIndex, "키워드 색인")
+
+
+def get_lexical_index(collection):
+    """
+    기본 키워드 색인
+
+    저장된 색인이 없거나 컬렉션 도면 수가 달라졌으면 다시 생성해 저장한다.
+    실행 중 색인 파일이 다시 저장되면(ingest.refresh_indexes) 다음 조회에서 다시 로드한다.
+    """
+    return _default_index.get(collection)
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=CHROMA_DIR)
+    index = LexicalIndex()
+    total = index.build(client.get_collection(name="design"))
+    index.save()
+    print(f"✅ {total}개 출원 → {DEFAULT_INDEX_PATH}")
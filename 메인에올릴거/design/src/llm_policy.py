@@ -0,0 +1,258 @@
+"""
+LLM/VLM 호출 정책 모듈 (마감 시간 + 재시도 + 헤징 + 서킷 브레이커)
+
+그래프 노드의 chain.invoke는 OpenAI 클라이언트 기본 동작 그대로 실행되어,
+느리거나 실패한 호출 1건이 수 초 멈춤이나 api.py의 500으로 이어집니다.
+→ 모든 LLM/VLM 호출을 call_llm(정책 이름, 함수, 입력)으로 감싸 같은 규칙을 적용
+
+- 마감 시간(deadline): 재시도/대기 포함 호출 전체 상한 → 넘으면 LLMDeadlineExceeded
+- 재시도: 재시도 가능한 오류(429, 5xx, 타임아웃, 연결 오류)만 지수 백오프(+지터)로 재시도
+- 헤징(선택): hedge_after초 안에 응답이 없으면 같은 요청을 하나 더 보내 먼저 온 응답 사용 (꼬리 지연 감소, 비용 증가)
+- 서킷 브레이커: 연속 실패가 임계값을 넘으면 일정 시간 바로 실패(CircuitOpenError) → 장애 시 대기열이 쌓이지 않음
+
+OpenAI 클라이언트 자체 재시도는 끄고(max_retries=0) 이 모듈에서만 재시도한다. (design_chatbot.py)
+테스트: fakes.py의 FakeChatOpenAI가 지연/오류를 주입 (benchmark.py --llm-error-rate / --llm-stall-rate)
+
+목록:
+1. LLMUnavailableError / LLMDeadlineExceeded / CircuitOpenError: 정책 예외
+2. is_retryable: 재시도 가능한 오류 판별
+3. CircuitBreaker: 서킷 브레이커
+4. LLMCallPolicy: 정책별 호출 (마감/재시도/헤징)
+5. POLICIES / call_llm: 기본 정책 (analyze / compare / report / general / translate)
+"""
+
+import os
+import time
+import random
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from tracing import Counter, Gauge
+
+
+# ==================== 설정 ====================
+
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))   # OpenAI 요청 1건 타임아웃 (초)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))            # 헤징 시작 시간 (초, 0이면 끔)
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))        # 서킷을 여는 연속 실패 수
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))     # 서킷이 열려 있는 시간 (초)
+DEADLINE_RETRY_AFTER = 5.0                                             # 마감 시간 초과(504) 응답의 Retry-After (초)
+LLM_CALL_WORKERS = 32                                                  # 마감 시간 적용용 호출 스레드 수
+
+# 재시도 가능한 HTTP 상태 / 예외 클래스 이름 (openai 패키지를 직접 import하지 않고 판별)
+_RETRYABLE_STATUS = {408, 409, 429}
+_RETRYABLE_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError"}
+
+
+# ==================== 메트릭 ====================
+
+LLM_RETRIES = Counter("design_llm_retries_total", "정책별 LLM 호출 재시도 수")
+LLM_HEDGES = Counter("design_llm_hedges_total", "정책별 헤징(중복 요청) 수")
+LLM_FAILURES = Counter("design_llm_policy_failures_total", "정책별 최종 실패 수 (reason: deadline/circuit_open/error)")
+LLM_CIRCUIT_OPEN = Gauge("design_llm_circuit_open", "서킷 브레이커 열림 여부 (1=열림)")
+
+
+# ==================== 예외 ====================
+
+class LLMUnavailableError(RuntimeError):
+    """LLM을 지금 사용할 수 없음 (api.py에서 503/504로 응답)"""
+
+    status_code = 503
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(LLMUnavailableError):
+    """마감 시간 안에 응답을 받지 못함 (일시적 지연이므로 잠시 후 재시도 안내)"""
+
+    status_code = 504
+
+    def __init__(self, message, retry_after=DEADLINE_RETRY_AFTER):
+        super().__init__(message, retry_after=retry_after)
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """서킷 브레이커가 열려 호출하지 않음"""
+
+
+def is_retryable(error):
+    """재시도 가능한 오류인지 (429, 5xx, 타임아웃, 연결 오류)"""
+    if isinstance(error, LLMUnavailableError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int) and (status in _RETRYABLE_STATUS or status >= 500):
+        return True
+    return type(error).__name__ in _RETRYABLE_NAMES
+
+
+# ==================== 서킷 브레이커 ====================
+
+class CircuitBreaker:
+    """
+    연속 실패 수 기반 서킷 브레이커
+
+    closed → (연속 실패 failures회) → open (cooldown초 동안 바로 실패)
+           → half-open (시험 호출 1건 허용) → 성공하면 closed, 실패하면 다시 open
+    """
+
+    def __init__(self, name, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """호출 전 확인 (열려 있으면 CircuitOpenError)"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._trial_running:
+                raise CircuitOpenError(f"LLM 호출이 일시 중단되었습니다. ({self.name}: 연속 실패)",
+                                       retry_after=max(1.0, remaining))
+            self._trial_running = True   # half-open: 이 호출 1건만 시험
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+        LLM_CIRCUIT_OPEN.set(0, breaker=self.name)
+
+    def release_trial(self):
+        """상태 변경 없이 half-open 시험 슬롯만 반납 (서비스 상태를 판단할 수 없는 결과: 요청 자체의 오류 등)"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+                opened = True
+            else:
+                opened = False
+        if opened:
+            LLM_CIRCUIT_OPEN.set(1, breaker=self.name)
+
+
+# ==================== 호출 정책 ====================
+
+# 마감 시간 적용을 위해 호출은 별도 스레드에서 실행 (마감 후에도 진행 중인 요청은 끝까지 실행되고 결과만 버림)
+_executor = ThreadPoolExecutor(max_workers=LLM_CALL_WORKERS, thread_name_prefix="llm-call")
+
+
+class LLMCallPolicy:
+    """정책별 LLM 호출 (마감 시간 + 재시도 + 헤징 + 서킷 브레이커)"""
+
+    def __init__(self, name, deadline=90.0, max_retries=2, backoff_base=1.0, backoff_max=8.0,
+                 hedge_after=LLM_HEDGE_AFTER, breaker=None):
+        self.name = name
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs)를 정책에 따라 실행
+
+        Raises:
+            LLMDeadlineExceeded: 마감 시간 초과
+            CircuitOpenError: 서킷 브레이커 열림
+            기타: 재시도 불가능한 오류 또는 재시도 후에도 실패한 마지막 오류
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+                result = self._attempt(fn, args, kwargs, deadline)
+            except LLMUnavailableError as e:
+                reason = "deadline" if isinstance(e, LLMDeadlineExceeded) else "circuit_open"
+                if isinstance(e, LLMDeadlineExceeded):
+                    self.breaker.record_failure()
+                LLM_FAILURES.inc(policy=self.name, reason=reason)
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # 요청 자체의 오류(400 등) → 서비스 상태를 알 수 없으므로 브레이커 상태는 그대로
+                    # (half-open 시험 호출이었으면 슬롯만 반납 → 다음 호출이 다시 시험)
+                    self.breaker.release_trial()
+                    LLM_FAILURES.inc(policy=self.name, reason="error")
+                    raise
+                self.breaker.record_failure()
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    LLM_FAILURES.inc(policy=self.name, reason="error")
+                    raise
+                LLM_RETRIES.inc(policy=self.name, error=type(e).__name__)
+                print(f"  LLM 재시도 ({self.name}, {attempt + 1}/{self.max_retries}): {type(e).__name__}")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _submit(self, fn, args, kwargs):
+        # 호출 스레드에서도 요청 트레이스(span)가 이어지도록 컨텍스트 복사 (제출마다 새로 복사)
+        return _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+    def _attempt(self, fn, args, kwargs, deadline):
+        """1회 시도 (헤징 시 요청 2개 중 먼저 성공한 결과)"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded(f"LLM 응답 시간 초과 ({self.name}: {self.deadline:.0f}초)")
+
+        futures = [self._submit(fn, args, kwargs)]
+        if self.hedge_after and self.hedge_after < remaining:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                LLM_HEDGES.inc(policy=self.name)
+                futures.append(self._submit(fn, args, kwargs))
+
+        error = None
+        while futures:
+            remaining = deadline - time.monotonic()
+            done, pending = wait(futures, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMDeadlineExceeded(f"LLM 응답 시간 초과 ({self.name}: {self.deadline:.0f}초)")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            futures = list(pending)
+        raise error
+
+
+# 기본 정책 (호출 종류별 마감 시간/재시도 수, 서킷 브레이커는 OpenAI 장애를 함께 감지하도록 공유)
+_openai_breaker = CircuitBreaker("openai")
+
+POLICIES = {
+    "analyze": LLMCallPolicy("analyze", deadline=60.0, max_retries=2, breaker=_openai_breaker),
+    "compare": LLMCallPolicy("compare", deadline=60.0, max_retries=2, breaker=_openai_breaker),
+    "report": LLMCallPolicy("report", deadline=90.0, max_retries=1, breaker=_openai_breaker),
+    "general": LLMCallPolicy("general", deadline=60.0, max_retries=2, breaker=_openai_breaker),
+    "translate": LLMCallPolicy("translate", deadline=15.0, max_retries=1, breaker=_openai_breaker),
+}
+
+
+def call_llm(policy, fn, *args, **kwargs):
+    """
+    정책 이름으로 LLM 호출
+
+    사용 예:
+        answer = call_llm("compare", chain.invoke, {...})
+    """
+    return POLICIES[policy].call(fn, *args, **kwargs)
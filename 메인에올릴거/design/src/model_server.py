@@ -0,0 +1,264 @@
+"""
+공유 모델 서버 모듈 (CLIP + ChromaDB를 한 프로세스에만 로드)
+
+uvicorn 워커를 여러 개 띄우면 워커마다 CLIP ViT-B/32, ChromaDB 클라이언트(HNSW 인덱스)를
+각각 메모리에 올립니다. (utils.py / design_chatbot.py 모듈 전역 변수)
+→ 모델 서버 프로세스 1개가 CLIP과 ChromaDB를 갖고, API 워커들은 로컬 Unix 소켓으로 요청
+
+- 서버: python model_server.py  (소켓: MODEL_SERVER_SOCKET 또는 --socket)
+- 워커: MODEL_SERVER_SOCKET 환경변수를 설정하고 실행하면 자동으로 클라이언트 모드
+    · utils.get_image_embedding(s) / CLIP 텍스트 인코딩 → 서버 호출 (워커는 torch/CLIP 미로드)
+    · design_chatbot의 chroma_client → RemoteChromaClient (컬렉션 query/get/count/upsert를 서버로 전달)
+- 이미지는 워커에서 CLIP 입력 크기(짧은 변 224)로 줄인 원시 픽셀로 보냄 → 전송량 감소
+
+주의: LangGraph 체크포인터(MemorySaver)는 워커 프로세스별 메모리이므로,
+      여러 워커로 실행할 때는 로드밸런서에서 thread_id 기준 고정 라우팅(sticky)이 필요합니다.
+주의: 서버/워커 모두 같은 MODEL_SERVER_AUTHKEY가 필요합니다. (없으면 서버가 시작하지 않음)
+      소켓 파일은 서버 실행 사용자만 접근 가능(0600), AF_UNIX 소켓이라 Windows에서는 사용할 수 없습니다.
+
+목록:
+1. ModelServerClient / get_client: 워커 쪽 클라이언트 (연결 풀, 끊기면 재연결)
+2. RemoteChromaClient / RemoteCollection: ChromaDB 클라이언트/컬렉션 대리 객체
+3. serve: 서버 실행 (연결마다 스레드)
+
+사용법:
+    export MODEL_SERVER_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python model_server.py                               # /tmp/design_model_server.sock
+    MODEL_SERVER_SOCKET=/tmp/design_model_server.sock uvicorn api:app --workers 4
+"""
+
+import os
+import sys
+import queue
+import argparse
+import threading
+from multiprocessing.connection import Listener, Client
+
+
+# ==================== 설정 ====================
+
+# 설정되어 있으면 워커는 클라이언트 모드 (utils.py, design_chatbot.py에서 확인)
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+DEFAULT_SOCKET = "/tmp/design_model_server.sock"
+AUTHKEY = os.getenv("MODEL_SERVER_AUTHKEY", "").encode()   # 필수 (서버/워커 공통 연결 인증 키, 기본값 없음)
+CLIP_INPUT_SIZE = 224   # ViT-B/32 입력 크기 (preprocess의 Resize 기준)
+
+# 서버로 전달을 허용하는 컬렉션 메서드
+_COLLECTION_METHODS = {"query", "get", "count", "add", "upsert", "update", "delete"}
+
+
+# ==================== 클라이언트 (API 워커) ====================
+
+class ModelServerError(RuntimeError):
+    """모델 서버에서 처리 중 발생한 예외"""
+
+
+class ModelServerClient:
+    """
+    모델 서버 클라이언트
+
+    multiprocessing Connection은 스레드 간 공유가 안전하지 않으므로,
+    호출마다 풀에서 연결 1개를 빌려 쓰고 돌려준다. (그래프가 스레드 풀에서 실행되므로)
+    """
+
+    def __init__(self, address, authkey=AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self._pool = queue.LifoQueue()
+
+    def _connect(self):
+        return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+
+    def call(self, method, *args):
+        """서버 메서드 호출 (연결이 끊겼으면 1회 재연결 후 재시도)"""
+        for attempt in range(2):
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.send((method, args))
+                status, result = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            self._pool.put(conn)
+            if status == "error":
+                raise ModelServerError(result)
+            return result
+
+    def embed_images(self, images):
+        """PIL 이미지 목록 → CLIP 임베딩 목록 (CLIP 입력 크기로 줄여서 전송)"""
+        payload = []
+        for image in images:
+            image = shrink_for_clip(image)
+            payload.append((image.mode, image.size, image.tobytes()))
+        return self.call("embed_images", payload)
+
+    def encode_text(self, text):
+        """영문 텍스트 → CLIP 텍스트 임베딩"""
+        return self.call("encode_text", text)
+
+
+def shrink_for_clip(image):
+    """
+    CLIP preprocess의 첫 단계(짧은 변 224로 BICUBIC 리사이즈)를 워커에서 미리 수행
+
+    긴 변은 torchvision Resize와 같은 규칙(int(224 * 긴 변 / 짧은 변))으로 계산하므로,
+    서버의 preprocess에서는 이미 목표 크기라 다시 리사이즈하지 않는다.
+    """
+    from PIL import Image
+
+    image = image.convert("RGB")
+    width, height = image.size
+    short, long = min(width, height), max(width, height)
+    if short <= CLIP_INPUT_SIZE:
+        return image
+    new_long = int(CLIP_INPUT_SIZE * long / short)
+    size = (CLIP_INPUT_SIZE, new_long) if width <= height else (new_long, CLIP_INPUT_SIZE)
+    return image.resize(size, Image.BICUBIC)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """기본 클라이언트 (MODEL_SERVER_SOCKET 주소)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if not AUTHKEY:
+                raise ModelServerError("MODEL_SERVER_AUTHKEY가 설정되지 않았습니다. (모델 서버와 같은 값 필요)")
+            _client = ModelServerClient(MODEL_SERVER_SOCKET)
+        return _client
+
+
+class RemoteCollection:
+    """ChromaDB 컬렉션 대리 객체 (메서드 호출을 모델 서버로 전달)"""
+
+    def __init__(self, client, name):
+        self._client = client
+        self.name = name
+
+    def __getattr__(self, method):
+        if method not in _COLLECTION_METHODS:
+            raise AttributeError(method)
+        return lambda **kwargs: self._client.call("collection", self.name, method, kwargs)
+
+    def count(self):
+        return self._client.call("collection", self.name, "count", {})
+
+
+class RemoteChromaClient:
+    """chromadb.PersistentClient 대리 객체 (컬렉션 조회/생성만 지원)"""
+
+    def __init__(self, client=None):
+        self._client = client or get_client()
+
+    def get_collection(self, name):
+        self._client.call("get_collection", name, False)
+        return RemoteCollection(self._client, name)
+
+    def get_or_create_collection(self, name):
+        self._client.call("get_collection", name, True)
+        return RemoteCollection(self._client, name)
+
+
+# ==================== 서버 ====================
+
+class _Handler:
+    """서버 쪽 요청 처리 (CLIP / ChromaDB는 서버 프로세스에만 로드)"""
+
+    def __init__(self, chroma_dir):
+        import chromadb
+        import utils   # 서버 프로세스에서는 MODEL_SERVER_SOCKET이 없으므로 로컬 CLIP 로드
+
+        self.utils = utils
+        self.chroma = chromadb.PersistentClient(path=chroma_dir)
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def _collection(self, name, create=False):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = (self.chroma.get_or_create_collection(name=name) if create
+                                           else self.chroma.get_collection(name=name))
+            return self._collections[name]
+
+    def embed_images(self, payload):
+        from PIL import Image
+        images = [Image.frombytes(mode, size, data) for mode, size, data in payload]
+        return self.utils.get_image_embeddings(images)
+
+    def encode_text(self, text):
+        return self.utils.encode_text(text)
+
+    def get_collection(self, name, create):
+        self._collection(name, create)
+        return True
+
+    def collection(self, name, method, kwargs):
+        if method not in _COLLECTION_METHODS:
+            raise ValueError(f"지원하지 않는 메서드: {method}")
+        return getattr(self._collection(name), method)(**kwargs)
+
+
+def _serve_connection(conn, handler):
+    """연결 1개 처리 (워커 스레드 1개가 재사용하는 연결)"""
+    with conn:
+        while True:
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method.startswith("_") or not hasattr(handler, method):
+                    raise ValueError(f"알 수 없는 요청: {method}")
+                conn.send(("ok", getattr(handler, method)(*args)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve(socket_path=DEFAULT_SOCKET, chroma_dir=None, authkey=AUTHKEY):
+    """모델 서버 실행 (종료: Ctrl+C)"""
+    if not authkey:
+        raise RuntimeError("MODEL_SERVER_AUTHKEY를 설정해야 모델 서버를 시작할 수 있습니다.")
+    from utils import CHROMA_DIR   # utils가 이 모듈을 import하므로 실행 시점에 가져옴
+
+    chroma_dir = chroma_dir or CHROMA_DIR
+    handler = _Handler(chroma_dir)
+    handler.utils.load_clip()   # 첫 요청 전에 CLIP 로드
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)   # 이전 실행에서 남은 소켓 파일
+    old_umask = os.umask(0o177)   # 소켓 파일 생성 시점부터 다른 사용자 접근 차단
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    with listener:
+        print(f"모델 서버 실행 중: {socket_path} (ChromaDB: {chroma_dir})")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_connection, args=(conn, handler), daemon=True).start()
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLIP + ChromaDB 공유 모델 서버")
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET or DEFAULT_SOCKET)
+    parser.add_argument("--chroma-dir", default=None)
+    args = parser.parse_args()
+
+    if not AUTHKEY:
+        print("MODEL_SERVER_AUTHKEY가 없습니다. 서버와 API 워커에 같은 임의 문자열을 설정하세요.")
+        sys.exit(1)
+
+    # 서버 자신은 로컬 모드로 CLIP을 로드해야 하므로 클라이언트 모드 설정 제거 (utils import 전)
+    os.environ.pop("MODEL_SERVER_SOCKET", None)
+    serve(args.socket, args.chroma_dir)
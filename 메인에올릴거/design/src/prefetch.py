@@ -0,0 +1,140 @@
+"""
+후보 이미지 프리페치 모듈
+
+show_results_node에서 interrupt로 사용자 선택을 기다리는 동안,
+검색된 후보 k개의 이미지를 백그라운드에서 미리 읽고 VLM 전송용으로 전처리해 둡니다.
+→ /chat/select 시점에는 디스크 읽기/인코딩 없이 바로 VLM 비교를 시작
+
+- 스레드(thread_id)별 캐시: 세션 수(LRU)와 세션당 후보 수 모두 상한
+- 선택(옵션): 1순위 후보의 VLM 비교를 미리 시작 (사용자가 가장 자주 고르는 후보)
+
+목록:
+1. CandidatePrefetcher: 후보 이미지 프리페치 / 1순위 비교 선실행 / 조회 / 정리
+2. prefetcher: 기본 인스턴스 (design_chatbot.py에서 사용)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from image_preprocess import to_vlm_data_url
+from utils import get_design_image_bytes
+
+
+# ==================== 설정 ====================
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))               # 이미지 로드/전처리 스레드 수
+PREFETCH_MAX_THREADS = int(os.getenv("PREFETCH_MAX_THREADS", "32"))      # 캐시를 유지할 최대 세션 수
+PREFETCH_MAX_PER_THREAD = int(os.getenv("PREFETCH_MAX_PER_THREAD", "10"))  # 세션당 최대 후보 수
+# 1순위 후보 VLM 비교 선실행 (선택되지 않으면 호출 비용이 낭비되므로 기본 off)
+SPECULATIVE_TOP1 = os.getenv("PREFETCH_SPECULATIVE_TOP1", "0") == "1"
+
+
+# ==================== 프리페처 ====================
+
+def _load_candidate(design_id):
+    """후보 이미지(샤드/파일) → VLM 전송용 data URL"""
+    data = get_design_image_bytes(design_id)
+    if data is None:
+        raise FileNotFoundError(design_id)
+    return to_vlm_data_url(data)
+
+
+class CandidatePrefetcher:
+    """thread_id별 후보 이미지(data URL) 프리페치 캐시"""
+
+    def __init__(self, workers=PREFETCH_WORKERS, max_threads=PREFETCH_MAX_THREADS,
+                 max_per_thread=PREFETCH_MAX_PER_THREAD):
+        self.max_threads = max_threads
+        self.max_per_thread = max_per_thread
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._images = OrderedDict()       # thread_id → {design_id: Future[data URL]}
+        self._speculative = {}             # (thread_id, design_id) → Future[비교 결과]
+
+    def prefetch(self, thread_id, candidates):
+        """
+        후보 이미지 로드 + 전처리를 백그라운드로 시작
+
+        interrupt 재개 시 show_results_node가 다시 실행되므로,
+        이미 시작한 후보는 건너뛴다. (중복 실행 없음)
+
+        Args:
+            thread_id: 세션 ID
+            candidates: comparison_results 목록 (design_id 포함)
+        """
+        with self._lock:
+            futures = self._images.setdefault(thread_id, {})
+            self._images.move_to_end(thread_id)
+
+            for comp in candidates[:self.max_per_thread]:
+                design_id = comp.get('design_id')
+                if not design_id or design_id in futures:
+                    continue
+                futures[design_id] = self._executor.submit(_load_candidate, design_id)
+
+            self._evict_threads()
+
+    def speculate(self, thread_id, design_id, compare_fn):
+        """1순위 후보 VLM 비교를 미리 시작 (이미 시작했으면 무시)"""
+        key = (thread_id, design_id)
+        with self._lock:
+            if key not in self._speculative:
+                self._speculative[key] = self._executor.submit(compare_fn)
+
+    def get_image(self, thread_id, design_id):
+        """
+        프리페치된 data URL 반환 (아직 처리 중이면 완료까지 대기)
+
+        Returns:
+            str: data URL
+            None: 프리페치되지 않았거나 실패 → 호출 측에서 직접 로드
+        """
+        with self._lock:
+            future = self._images.get(thread_id, {}).get(design_id)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def take_speculative(self, thread_id, design_id):
+        """
+        선실행한 비교 결과 반환 (처리 중이면 완료까지 대기)
+
+        Returns:
+            str: 비교 결과
+            None: 선실행하지 않았거나 실패
+        """
+        with self._lock:
+            future = self._speculative.pop((thread_id, design_id), None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def discard(self, thread_id):
+        """세션 캐시 정리 (상세 비교가 끝났거나 세션이 삭제된 경우)"""
+        with self._lock:
+            futures = self._images.pop(thread_id, {})
+            for key in [k for k in self._speculative if k[0] == thread_id]:
+                self._speculative.pop(key).cancel()
+        for future in futures.values():
+            future.cancel()
+
+    def _evict_threads(self):
+        """세션 수 상한 초과 시 가장 오래된 세션 캐시 삭제 (lock 보유 상태에서 호출)"""
+        while len(self._images) > self.max_threads:
+            old_thread_id, futures = self._images.popitem(last=False)
+            for future in futures.values():
+                future.cancel()
+            for key in [k for k in self._speculative if k[0] == old_thread_id]:
+                self._speculative.pop(key).cancel()
+
+
+# 기본 프리페처 (design_chatbot.py 공용)
+prefetcher = CandidatePrefetcher()
@@ -0,0 +1,267 @@
+"""
+운영 중 프로파일링 모듈 (요청 단위 cProfile + 구간 샘플링 프로파일러)
+
+/chat/image가 느려졌을 때 tracing.py의 span만으로는 PIL 디코딩, CLIP, Chroma,
+응답 이미지 base64 인코딩(_run_image_search) 중 어디서 시간이 쓰이는지 함수 단위로 보기 어렵습니다.
+→ 필요할 때만 켜는 프로파일링 두 가지
+  1. 요청 단위: X-Profile 헤더(값 = PROFILE_ADMIN_TOKEN)를 보낸 요청만 cProfile로 측정
+     - 엔드포인트의 동기 작업은 스레드 풀에서 실행되므로(run_in_threadpool), 그 호출마다 cProfile을 켜고 합산
+     - 결과: data/profiles/req-*.prof (pstats, snakeviz 등으로 열기) + 요약 텍스트(첫 줄에 요청 ID), 응답 헤더 X-Profile-Id
+  2. 구간 샘플링: 관리자 엔드포인트가 N초 동안 모든 스레드 스택을 주기적으로 수집 (py-spy 방식, 코드 수정 없음)
+     - 결과: data/profiles/sample-*.folded (flamegraph.pl / speedscope 입력 형식) + 함수별 상위 목록
+
+PROFILE_ADMIN_TOKEN이 없으면 모두 꺼짐:
+미들웨어를 등록하지 않고, run_in_threadpool도 starlette 원본 그대로 → 기본 경로 추가 비용 없음
+
+목록:
+1. PROFILING_ENABLED / check_token: 설정 + 관리자 토큰 확인
+2. run_in_threadpool: 요청 프로파일이 켜져 있으면 스레드 풀 호출마다 cProfile (api.py에서 starlette 대신 사용)
+3. begin_request_profile / new_profile_id / save_request_profile: 요청 단위 프로파일 시작/ID 발급/저장 (api.py 미들웨어)
+4. sample_stacks: 구간 샘플링 프로파일러
+5. list_profiles / load_profile: 저장된 프로파일 조회
+
+사용법:
+    PROFILE_ADMIN_TOKEN=secret python api.py
+    curl -H "X-Profile: secret" -F image=@a.jpg http://localhost:8000/chat/image     # 응답 헤더 X-Profile-Id
+    curl -H "X-Admin-Token: secret" http://localhost:8000/admin/profiles/{X-Profile-Id}
+    curl -H "X-Admin-Token: secret" -X POST -F seconds=10 http://localhost:8000/admin/profile/sample
+"""
+
+import io
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import Counter as _Counter
+
+from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+
+from utils import DATA_DIR
+
+
+# ==================== 설정 ====================
+
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")   # 비어 있으면 프로파일링 전체 비활성
+PROFILING_ENABLED = bool(PROFILE_ADMIN_TOKEN)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))          # 종류별로 보관할 최근 프로파일 수
+PROFILE_MAX_SECONDS = 60.0          # 샘플링 최대 시간 (초)
+PROFILE_SAMPLE_INTERVAL = 0.005     # 샘플링 간격 기본값 (초)
+PROFILE_TOP = 40                    # 요약에 포함할 함수 수
+
+_PROFILE_ID = re.compile(r"[A-Za-z0-9_-]+")   # 프로파일 ID = 파일명 (경로 문자 불가)
+_request_profiles = contextvars.ContextVar("request_profiles", default=None)
+_sample_lock = threading.Lock()     # 샘플링은 한 번에 1개만
+
+
+def check_token(token):
+    """관리자 토큰 확인 (비활성 상태면 항상 False)"""
+    return PROFILING_ENABLED and bool(token) and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+
+# ==================== 요청 단위 cProfile ====================
+
+async def _profiled_run_in_threadpool(func, *args, **kwargs):
+    """
+    현재 요청에 프로파일이 켜져 있으면 워커 스레드에서 cProfile로 실행
+
+    cProfile은 스레드별로 동작하므로 호출마다 Profile을 따로 만들어 요청 목록에 추가 (저장 시 합산)
+    """
+    profiles = _request_profiles.get()
+    if profiles is None:
+        return await _run_in_threadpool(func, *args, **kwargs)
+
+    def run():
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            profiles.append(profile)
+
+    return await _run_in_threadpool(run)
+
+
+# 비활성이면 starlette 원본 그대로 (contextvar 조회도 없음)
+run_in_threadpool = _profiled_run_in_threadpool if PROFILING_ENABLED else _run_in_threadpool
+
+
+def begin_request_profile():
+    """
+    현재 요청의 프로파일 수집 시작 (미들웨어에서 call_next 전에 호출)
+
+    Returns:
+        list: 스레드 풀 호출별 cProfile.Profile이 쌓이는 목록 (save_request_profile에 전달)
+    """
+    profiles = []
+    _request_profiles.set(profiles)
+    return profiles
+
+
+def new_profile_id():
+    """요청 프로파일 ID (서버에서 발급 → 클라이언트가 보낸 X-Request-ID를 파일명에 쓰지 않음)"""
+    return time.strftime("req-%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+
+
+def _valid_profile_id(profile_id):
+    return isinstance(profile_id, str) and _PROFILE_ID.fullmatch(profile_id) is not None
+
+
+def save_request_profile(profile_id, profiles, wall_seconds, label=""):
+    """
+    요청 프로파일 합산 → {profile_id}.prof (pstats) + {profile_id}.txt (누적 시간 상위 함수)
+
+    Returns:
+        str: 요약 텍스트 경로 (스레드 풀 호출이 없었으면 None)
+    """
+    if not _valid_profile_id(profile_id):   # 파일명으로 쓰므로 경로 문자 차단
+        raise ValueError(f"잘못된 프로파일 ID: {profile_id!r}")
+    if not profiles:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    stats = pstats.Stats(profiles[0])
+    for profile in profiles[1:]:
+        stats.add(profile)
+    stats.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+
+    out = io.StringIO()
+    out.write(f"# {label} 전체 {wall_seconds * 1000:.1f}ms, 스레드 풀 호출 {len(profiles)}회 "
+              f"(나머지는 이벤트 루프/대기열/네트워크)\n")
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+
+    _prune(".prof", keep_also=".txt")
+    return path
+
+
+# ==================== 구간 샘플링 ====================
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(seconds, interval=PROFILE_SAMPLE_INTERVAL, top=20):
+    """
+    seconds초 동안 모든 스레드 스택을 interval마다 수집 (sys._current_frames, 샘플링 스레드 자신은 제외)
+
+    Returns:
+        dict: {"profile_id", "samples", "seconds", "top_inclusive": [...], "top_self": [...]}
+              (folded 스택은 data/profiles/{profile_id}.folded)
+        None: 다른 샘플링이 실행 중
+    """
+    if not _sample_lock.acquire(blocking=False):
+        return None
+    try:
+        seconds = min(max(seconds, interval), PROFILE_MAX_SECONDS)
+        me = threading.get_ident()
+        stacks = _Counter()
+        rounds = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))   # 스택 최상단 = 스레드 이름
+                stacks[";".join(reversed(stack))] += 1
+            rounds += 1
+            time.sleep(interval)
+    finally:
+        _sample_lock.release()
+
+    # 함수별 포함(inclusive: 스택 어딘가에 있음) / 자체(self: 스택 맨 아래) 샘플 수
+    inclusive, self_counts = _Counter(), _Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]
+        for name in set(frames):
+            inclusive[name] += count
+        if frames:
+            self_counts[frames[-1]] += count
+
+    profile_id = time.strftime("sample-%Y%m%d-%H%M%S")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    _prune(".folded")
+
+    return {
+        "profile_id": profile_id,
+        "samples": rounds,
+        "seconds": round(seconds, 2),
+        "top_inclusive": [{"function": name, "samples": count} for name, count in inclusive.most_common(top)],
+        "top_self": [{"function": name, "samples": count} for name, count in self_counts.most_common(top)],
+    }
+
+
+# ==================== 조회 ====================
+
+def list_profiles():
+    """저장된 프로파일 목록 (최근 순)"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILE_DIR):
+        stem, ext = os.path.splitext(name)
+        if ext in (".prof", ".folded"):
+            path = os.path.join(PROFILE_DIR, name)
+            entries.append({
+                "profile_id": stem,
+                "kind": "request" if ext == ".prof" else "sample",
+                "created_at": os.path.getmtime(path),
+                "bytes": os.path.getsize(path),
+            })
+    entries.sort(key=lambda entry: entry["created_at"], reverse=True)
+    return entries
+
+
+def load_profile(profile_id, raw=False):
+    """
+    프로파일 조회
+
+    Args:
+        raw: True면 원본 파일 경로 (.prof / .folded), False면 요약 텍스트
+
+    Returns:
+        str: 파일 경로 (raw) 또는 텍스트
+        None: 없는 프로파일
+    """
+    if not _valid_profile_id(profile_id):   # 경로 탈출 방지
+        return None
+    for ext in (".prof", ".folded"):
+        path = os.path.join(PROFILE_DIR, profile_id + ext)
+        if not os.path.exists(path):
+            continue
+        if raw:
+            return path
+        summary = os.path.join(PROFILE_DIR, profile_id + ".txt") if ext == ".prof" else path
+        with open(summary, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+
+def _prune(ext, keep_also=None):
+    """ext 종류의 프로파일을 최근 PROFILE_KEEP개만 남기고 삭제 (keep_also: 같이 지울 요약 확장자)"""
+    files = sorted((os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.endswith(ext)),
+                   key=os.path.getmtime, reverse=True)
+    for path in files[PROFILE_KEEP:]:
+        for target in (path, os.path.splitext(path)[0] + keep_also if keep_also else None):
+            if target and os.path.exists(target):
+                os.remove(target)
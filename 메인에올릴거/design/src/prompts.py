@@ -37,6 +37,21 @@ output: score(1~10) + feedback (JSON)
 input: 사용자 쿼리 + 생성된 답변
 output: score(1~10) + feedback (JSON)
 
+8. BATCH_REPORT_PROMPT: 여러 디자인을 한 번에 비교한 결과로 통합 FTO 리포트 생성
+
+input: 입력 디자인 분석 + 디자인별 상세 비교 결과 목록
+output: 통합 리포트 텍스트
+
+9. IMAGE_REFERENCE_COMPARISON_PROMPT: 비교 대상 형상 분석이 미리 계산되어 있을 때의 비교 (analysis_store.py)
+
+input: 입력 이미지 URL + 비교 이미지 URL + 비교 대상 형상 분석 (압축 JSON)
+output: 유사점, 비유사점 (JSON, 비교 대상 분석은 다시 작성하지 않음)
+
+10. TEXT_COMPARISON_PROMPT: 이미지 없이 두 형상 분석 텍스트만으로 비교 (DESIGN_COMPARISON_MODE=text)
+
+input: 입력 디자인 형상 분석 + 비교 대상 형상 분석 (압축 JSON)
+output: 유사점, 비유사점 (JSON)
+
 """
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -67,6 +82,30 @@ REPORT_PROMPT = ChatPromptTemplate.from_messages([
     ("user", "{user_query}")
 ])
 
+# 통합 리포트 프롬프트 (여러 디자인 일괄 비교용)
+BATCH_REPORT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+당신은 디자인 FTO(Freedom To Operate) 전문 어시스턴트입니다.
+입력 디자인을 여러 비교 대상 디자인과 각각 비교한 결과를 바탕으로,
+실무자가 후보들을 한눈에 검토할 수 있는 통합 리포트를 작성하세요.
+
+=== 입력 디자인 분석 ===
+{input_analysis}
+
+=== 디자인별 상세 비교 ===
+{detailed_comparisons}
+
+[리포트 구조]
+1. 입력 디자인 요약
+2. 비교 대상 디자인 목록 (출원번호, 상품명, 등록상태, 유사도 거리)
+3. 디자인별 유사한 점 / 차이점 요약
+4. 위험도 순위 (입력 디자인과 가장 유사해 주의가 필요한 순서)
+5. FTO 관점 종합 의견
+6. 주의사항: 본 리포트는 참고용이며, 최종 판단은 변리사와 상의하세요.
+"""),
+    ("user", "{user_query}")
+])
+
 print("프롬프트 정의 완료!")
 
 
@@ -172,6 +211,82 @@ IMAGE_COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
 
 
 
+# 비교 대상 형상 분석이 미리 계산된 경우: 분석 단계를 생략하고 유사점/비유사점만 작성 (출력 토큰 감소)
+IMAGE_REFERENCE_COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+당신은 대한민국 특허청 디자인 심사관의 판단 기준을 설명하는 FTO(Freedom To Operate) 보조 어시스턴트입니다.
+
+아래 두 개의 디자인 도면 이미지를 보고 입력 디자인(첫 번째 이미지)과
+비교 대상 디자인(두 번째 이미지)의 유사점/비유사점을 비교하십시오.
+비교 대상 디자인의 형상 분석은 아래에 미리 주어져 있으므로 다시 작성하지 마십시오.
+
+=== 비교 대상 디자인 형상 분석 ===
+{reference_analysis}
+
+⚠️ 중요 규칙
+- 비교 분석: 형상, 실루엣, 전체 형태 측면에서만 비교
+- 기능, 재질, 사용 용도는 고려하지 마십시오
+- 억지로 유사하다고 판단하지 마십시오
+- 차이가 명확한 경우, 비유사점을 중심으로 작성하십시오
+
+[분석 단계]
+1단계: 두 디자인 간 가장 차이가 큰 항목을 선택하여 구체적인 차이 서술
+2단계: 구조적으로 불가피한 공통 요소만 유사점으로 정리
+
+출력 형식 (JSON):
+{{
+  "유사한_점": [
+    {{"항목": "...", "설명": "..."}}
+  ],
+  "비유사한_점": [
+    {{"항목": "...", "설명": "..."}}
+  ]
+}}
+    """),
+    ("user", [
+        {"type": "text", "text": "[입력 디자인 - 첫 번째 이미지]"},
+        {"type": "image_url", "image_url": {"url": "{input_image_url}"}},
+        {"type": "text", "text": "[비교 대상 디자인 - 두 번째 이미지]"},
+        {"type": "image_url", "image_url": {"url": "{comparison_image_url}"}}
+    ])
+])
+
+
+# 텍스트 전용 비교: 입력 분석 vs 미리 계산한 비교 대상 분석 (이미지 재전송 없음 → 빠르고 저렴, 정밀도는 낮음)
+TEXT_COMPARISON_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+당신은 대한민국 특허청 디자인 심사관의 판단 기준을 설명하는 FTO(Freedom To Operate) 보조 어시스턴트입니다.
+
+아래 두 디자인의 형상 관찰 기록만을 근거로 유사점/비유사점을 비교하십시오.
+두 기록은 같은 형식(물품, 전체 실루엣, 몸체 형태, 상부 구조, 하부 형태, 비례 관계)으로 작성되어 있습니다.
+
+=== 입력 디자인 형상 분석 ===
+{input_analysis}
+
+=== 비교 대상 디자인 형상 분석 ===
+{reference_analysis}
+
+⚠️ 중요 규칙
+- 기록에 없는 형상 요소를 추측하지 마십시오 ("관찰되지 않음" 항목은 비교하지 않음)
+- 형상, 실루엣, 전체 형태 측면에서만 비교
+- 기능, 재질, 사용 용도는 고려하지 마십시오
+- 억지로 유사하다고 판단하지 마십시오
+- 차이가 명확한 경우, 비유사점을 중심으로 작성하십시오
+
+출력 형식 (JSON):
+{{
+  "유사한_점": [
+    {{"항목": "...", "설명": "..."}}
+  ],
+  "비유사한_점": [
+    {{"항목": "...", "설명": "..."}}
+  ]
+}}
+    """),
+    ("user", "두 디자인의 형상 분석을 비교해주세요.")
+])
+
+
 # ==================== 텍스트 검색용 프롬프트 ====================
 
 # 텍스트 검색용 통합 프롬프트: 형상 요약 + 부합도 판단을 한 번에 수행
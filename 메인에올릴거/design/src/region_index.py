@@ -0,0 +1,375 @@
+"""
+부분(영역) 도면 인덱스 모듈
+
+도면 1장당 전역 CLIP 벡터 1개만으로는, 몸체가 다른 제품에 붙은 비슷한 캡/펌프 헤드 같은
+부분디자인(부분 유사)을 놓치기 쉽습니다.
+→ 도면을 여러 영역(상/하/좌/우 절반 + 중앙)으로 잘라 각각 임베딩하고,
+  별도 컬렉션(design_regions)에 design_id와 함께 저장해 영역 단위로 검색합니다.
+
+CPU에서도 색인/검색 비용이 감당되도록:
+- 흰 여백을 먼저 잘라낸 뒤(내용 영역 기준) 영역을 나눔
+- 거의 빈(선이 없는) 영역은 임베딩하지 않음
+- 한 도면 안에서 거의 같은 영역 벡터(대칭 도면 등)는 1개만 저장
+- 여러 도면의 영역을 모아 CLIP 배치 forward 1회로 임베딩, 중단 후 재실행 시 이어서 진행
+  (쓸 만한 영역이 없는 도면은 data/region_empty.json에 기록 → 재실행 시 다시 자르지 않음)
+
+목록:
+1. crop_regions: 도면 → (영역 이름, 정사각 PIL 이미지) 목록
+2. build_region_index: 기존 design 컬렉션 → 영역 컬렉션 생성 (배치, 재개 가능)
+3. search_regions: 질의 도면의 영역들로 영역 컬렉션 검색 → 출원번호별 합산
+4. search_with_regions: 전역 검색 + 영역 검색 결과 RRF 합산 (하이브리드)
+5. get_region_collection: 영역 컬렉션 (없으면 None)
+
+사용법 (영역 인덱스 생성):
+    python region_index.py build               # 전체
+    python region_index.py build --limit 1000  # 일부만 (시험용)
+"""
+
+import io
+import os
+import json
+import argparse
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from utils import (get_image_embedding, get_image_embeddings, get_design_image_bytes,
+                   search_and_filter_similar_designs, search_multi_view, fuse_results,
+                   iter_collection, DATA_DIR, CHROMA_DIR)
+
+
+# ==================== 설정 ====================
+
+REGION_COLLECTION = os.getenv("REGION_COLLECTION", "design_regions")
+REGION_BATCH_SIZE = int(os.getenv("REGION_BATCH_SIZE", "32"))      # CLIP 배치 1회에 넣을 도면 수
+REGION_MIN_INK = float(os.getenv("REGION_MIN_INK", "0.01"))        # 선(어두운 픽셀) 비율이 이보다 작으면 빈 영역
+REGION_DEDUP_SIMILARITY = float(os.getenv("REGION_DEDUP_SIMILARITY", "0.97"))  # 같은 도면 내 중복 영역 기준 (코사인)
+REGION_EMPTY_PATH = os.getenv("REGION_EMPTY_PATH", os.path.join(DATA_DIR, "region_empty.json"))  # 영역 없는 도면 목록
+REGION_FETCH_FACTOR = 5   # 영역별 검색 개수 = n_results * 배수 (한 출원의 영역이 여러 개 걸리므로 넉넉히)
+
+# 영역 이름 → 내용 영역 기준 상대 좌표 (left, top, right, bottom)
+# 캡/펌프 헤드/손잡이 같은 부분은 대개 도면의 한쪽 절반에 들어감
+REGIONS = {
+    "top": (0.0, 0.0, 1.0, 0.5),
+    "bottom": (0.0, 0.5, 1.0, 1.0),
+    "left": (0.0, 0.0, 0.5, 1.0),
+    "right": (0.5, 0.0, 1.0, 1.0),
+    "center": (0.25, 0.25, 0.75, 0.75),
+}
+
+_INK_THRESHOLD = 200      # 이 값보다 어두운 픽셀을 선으로 간주 (흰 배경 도면 기준)
+
+
+# ==================== 영역 자르기 ====================
+
+def _open(image):
+    """경로 / bytes / memoryview / PIL 이미지 → RGB PIL 이미지"""
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(bytes(image))).convert("RGB")
+    return Image.open(image).convert("RGB")
+
+
+def _ink_ratio(gray):
+    """그레이스케일 이미지에서 선(어두운 픽셀) 비율"""
+    histogram = gray.histogram()
+    return sum(histogram[:_INK_THRESHOLD]) / max(1, gray.width * gray.height)
+
+
+def _pad_square(image):
+    """흰 배경으로 정사각형 패딩 (CLIP 전처리의 중앙 크롭에 영역 가장자리가 잘리지 않도록)"""
+    side = max(image.size)
+    canvas = Image.new("RGB", (side, side), (255, 255, 255))
+    canvas.paste(image, ((side - image.width) // 2, (side - image.height) // 2))
+    return canvas
+
+
+def crop_regions(image):
+    """
+    도면 → 영역 이미지 목록
+
+    흰 여백을 잘라 내용 영역을 구한 뒤 REGIONS 비율로 나누고,
+    선이 거의 없는 영역은 제외한다.
+
+    Args:
+        image: 경로 / bytes / PIL 이미지
+
+    Returns:
+        list: [(영역 이름, 정사각 PIL 이미지), ...]
+    """
+    image = _open(image)
+    gray = image.convert("L")
+
+    # 내용 영역 (흰 여백 제거): 반전 후 선 픽셀만 남겨 bounding box
+    bbox = ImageOps.invert(gray).point(lambda p: 255 if p > 255 - _INK_THRESHOLD else 0).getbbox()
+    if bbox is None:
+        return []
+    left, top, right, bottom = bbox
+    width, height = right - left, bottom - top
+
+    regions = []
+    for name, (x0, y0, x1, y1) in REGIONS.items():
+        box = (left + int(width * x0), top + int(height * y0),
+               left + int(width * x1), top + int(height * y1))
+        if box[2] - box[0] < 8 or box[3] - box[1] < 8:
+            continue
+        if _ink_ratio(gray.crop(box)) < REGION_MIN_INK:
+            continue
+        regions.append((name, _pad_square(image.crop(box))))
+    return regions
+
+
+def _dedup_regions(names, embeddings):
+    """한 도면 안에서 서로 거의 같은 영역 벡터 제거 (앞의 것 유지)"""
+    if not names:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+    kept = []
+    for i in range(len(names)):
+        if all(float(vectors[i] @ vectors[j]) < REGION_DEDUP_SIMILARITY for j in kept):
+            kept.append(i)
+    return kept
+
+
+# ==================== 인덱스 생성 ====================
+
+def get_region_collection(chroma_client, create=False):
+    """
+    영역 컬렉션 반환
+
+    Returns:
+        chromadb Collection
+        None: create=False이고 아직 만들지 않은 경우
+    """
+    if create:
+        return chroma_client.get_or_create_collection(name=REGION_COLLECTION)
+    try:
+        return chroma_client.get_collection(name=REGION_COLLECTION)
+    except Exception:
+        return None
+
+
+def _iter_collection(collection):
+    """컬렉션 전체 (id, metadata)를 페이지 단위로 순회"""
+    for page in iter_collection(collection, include=["metadatas"]):
+        yield from zip(page["ids"], page["metadatas"])
+
+
+def _indexed_design_ids(region_collection):
+    """이미 영역을 색인한 design_id 집합 (재실행 시 건너뛰기용)"""
+    return {metadata.get("design_id") for _, metadata in _iter_collection(region_collection)}
+
+
+def _load_empty(path):
+    """쓸 만한 영역이 없었던 design_id 집합 (영역 컬렉션에 남지 않으므로 별도 파일)"""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return set(json.load(f))
+
+
+def _save_empty(path, design_ids):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sorted(design_ids), f)
+    os.replace(path + ".tmp", path)
+
+
+def build_region_index(source_collection, region_collection, batch_size=REGION_BATCH_SIZE, limit=None,
+                       empty_path=REGION_EMPTY_PATH):
+    """
+    design 컬렉션의 각 도면 → 영역 임베딩 → 영역 컬렉션에 저장
+
+    이미 색인한 design_id는 건너뛰므로 중단 후 다시 실행하면 이어서 진행된다.
+
+    Args:
+        source_collection: 기존 design 컬렉션 (design_id, 메타데이터 원본)
+        region_collection: 영역 컬렉션 (get_region_collection(client, create=True))
+        batch_size: CLIP 배치 1회에 넣을 도면 수
+        limit: 이번 실행에서 처리할 최대 도면 수
+        empty_path: 쓸 만한 영역이 없는 도면 목록 파일 (None이면 기록하지 않음)
+
+    Returns:
+        dict: {"designs": 저장한 도면 수, "regions": 저장한 영역 수, "skipped": 빈/중복 영역 수,
+               "empty": 영역이 없어 기록만 한 도면 수, "failed": 임베딩 실패로 다음 실행에 다시 시도할 도면 수}
+    """
+    empty = _load_empty(empty_path)
+    done = _indexed_design_ids(region_collection) | empty
+    stats = {"designs": 0, "regions": 0, "skipped": 0, "empty": 0, "failed": 0}
+
+    def flush(batch):
+        # batch: [(design_id, metadata, [(영역 이름, 이미지), ...]), ...]
+        # 통계는 upsert 성공 후에만 반영 (임베딩 실패한 도면은 다음 실행에서 다시 처리)
+        if not batch:
+            return
+        images = [region for _, _, regions in batch for _, region in regions]
+        embeddings = get_image_embeddings(images)
+        if embeddings is None:
+            print(f"⚠️ 영역 임베딩 실패: 도면 {len(batch)}개 (다음 실행에서 다시 시도)")
+            stats["failed"] += len(batch)
+            return
+
+        ids, vectors, metadatas = [], [], []
+        skipped = 0
+        cursor = 0
+        for design_id, metadata, regions in batch:
+            names = [name for name, _ in regions]
+            design_vectors = embeddings[cursor:cursor + len(regions)]
+            cursor += len(regions)
+
+            kept = _dedup_regions(names, design_vectors)
+            skipped += len(REGIONS) - len(kept)
+            for i in kept:
+                ids.append(f"{design_id}#{names[i]}")
+                vectors.append(design_vectors[i])
+                metadatas.append({**metadata, "design_id": design_id, "region": names[i]})
+
+        region_collection.upsert(ids=ids, embeddings=vectors, metadatas=metadatas)
+        stats["designs"] += len(batch)
+        stats["regions"] += len(ids)
+        stats["skipped"] += skipped
+
+    batch, queued, new_empty = [], 0, False
+    for design_id, metadata in _iter_collection(source_collection):
+        if design_id in done:
+            continue
+        if limit is not None and queued >= limit:
+            break
+
+        data = get_design_image_bytes(design_id)
+        if data is None:
+            continue
+        try:
+            regions = crop_regions(data)
+        except Exception as e:
+            print(f"  영역 추출 실패 ({design_id}): {e}")
+            continue
+        queued += 1
+
+        if not regions:
+            # 빈 도면: 영역 컬렉션에 남는 것이 없으므로 별도로 기록 (재실행 시 건너뜀)
+            empty.add(design_id)
+            stats["empty"] += 1
+            new_empty = True
+            continue
+
+        batch.append((design_id, metadata or {}, regions))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+            print(f"  {stats['designs']}개 도면 / {stats['regions']}개 영역 저장")
+    flush(batch)
+
+    if new_empty:
+        _save_empty(empty_path, empty)
+    return stats
+
+
+# ==================== 영역 검색 ====================
+
+def search_regions(region_collection, image, n_results=10, fusion="max"):
+    """
+    질의 도면의 전체 + 영역들로 영역 컬렉션 검색 → 출원번호별 합산
+
+    질의 영역 임베딩은 배치 forward 1회, 벡터 검색은 다중 질의 1회로 처리한다.
+
+    Args:
+        region_collection: 영역 컬렉션
+        image: 질의 도면 (경로 / bytes / PIL 이미지)
+        n_results: 반환할 출원 수
+        fusion: "max"(가장 잘 맞은 영역 기준) | "rrf"
+
+    Returns:
+        dict: search_and_filter_similar_designs와 같은 형식
+              (ids는 영역이 아닌 원본 design_id, metadata['region']에 일치한 영역 이름)
+    """
+    image = _open(image)
+    queries = [_pad_square(image)] + [region for _, region in crop_regions(image)]
+    embeddings = get_image_embeddings(queries)
+    if embeddings is None:
+        return {'ids': [[]], 'distances': [[]], 'metadatas': [[]]}
+
+    results = search_multi_view(region_collection, embeddings, n_results=n_results,
+                                fusion=fusion, fetch_k=n_results * REGION_FETCH_FACTOR)
+    results['ids'][0] = [metadata.get('design_id', region_id)
+                         for region_id, metadata in zip(results['ids'][0], results['metadatas'][0])]
+    return results
+
+
+def _restrict_to_source(image_collection, results, where):
+    """
+    영역 검색 결과 중 design 컬렉션에서 where를 만족하는 도면만 남김 (대표 도면 검색)
+
+    영역 컬렉션의 메타데이터는 색인 시점 복사본이라 dedup_index.py build 이후의 클러스터 정보와 다를 수 있음
+    → 클러스터 필드는 design 컬렉션 값으로 바꾸고 일치한 영역 이름만 유지
+    """
+    ids, distances, metadatas = results['ids'][0], results['distances'][0], results['metadatas'][0]
+    if not ids:
+        return results
+    page = image_collection.get(ids=list(dict.fromkeys(ids)), where=where, include=["metadatas"])
+    current = dict(zip(page['ids'], page['metadatas']))
+
+    kept = [(design_id, distance, {**current[design_id], 'region': metadata.get('region')})
+            for design_id, distance, metadata in zip(ids, distances, metadatas) if design_id in current]
+    return {'ids': [[item[0] for item in kept]],
+            'distances': [[item[1] for item in kept]],
+            'metadatas': [[item[2] for item in kept]]}
+
+
+def search_with_regions(image_collection, region_collection, image, n_results=10, query_embedding=None,
+                        where=None):
+    """
+    전역 검색(도면 전체) + 영역 검색 결과를 RRF로 합산
+
+    두 검색의 거리 척도가 달라 순위 기준(RRF)으로만 합친다.
+    표시 거리는 출원별로 더 가까운 쪽 값.
+
+    Args:
+        image_collection: design 컬렉션
+        region_collection: 영역 컬렉션
+        image: 질의 도면 (경로 / bytes / PIL 이미지)
+        n_results: 반환할 출원 수
+        query_embedding: 이미 계산한 전역 임베딩 (없으면 계산)
+        where: design 컬렉션 메타데이터 필터 (대표 도면만 검색 등, 영역 결과에도 적용)
+    """
+    image = _open(image)
+    if query_embedding is None:
+        query_embedding = get_image_embedding(image)
+
+    global_results = search_and_filter_similar_designs(image_collection, query_embedding, n_results=n_results * 2,
+                                                       where=where)
+    region_results = search_regions(region_collection, image, n_results=n_results * 2)
+    if where is not None:
+        region_results = _restrict_to_source(image_collection, region_results, where)
+
+    # 두 결과 모두 거리 오름차순 → 다중 질의 결과 형식으로 묶어 합산
+    combined = {key: [global_results[key][0], region_results[key][0]] for key in ('ids', 'distances', 'metadatas')}
+    return fuse_results(combined, n_results=n_results, fusion="rrf")
+
+
+# ==================== 실행 ====================
+
+if __name__ == "__main__":
+    import chromadb
+
+    parser = argparse.ArgumentParser(description="부분(영역) 도면 인덱스 생성")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--limit", type=int, help="이번 실행에서 처리할 최대 도면 수")
+    parser.add_argument("--batch-size", type=int, default=REGION_BATCH_SIZE)
+    parser.add_argument("--chroma-dir", default=CHROMA_DIR)
+    parser.add_argument("--collection", default="design")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=args.chroma_dir)
+    source = client.get_collection(name=args.collection)
+    regions = get_region_collection(client, create=True)
+    print(f"영역 인덱스 생성 중: {source.count()}개 도면 → '{REGION_COLLECTION}' (현재 {regions.count()}개 영역)")
+
+    stats = build_region_index(source, regions, batch_size=args.batch_size, limit=args.limit)
+    print(f"✅ 도면 {stats['designs']}개 → 영역 {stats['regions']}개 저장 (빈/중복 영역 {stats['skipped']}개 제외, "
+          f"영역 없는 도면 {stats['empty']}개, 임베딩 실패 {stats['failed']}개)")
@@ -0,0 +1,236 @@
+"""
+대화 세션(thread) 저장소 모듈 (체크포인터 수명 관리 + 메모리 상한)
+
+/chat/image, /chat/text 요청마다 새 thread_id의 그래프 상태가 MemorySaver에 쌓이고,
+리포트를 받은 뒤에도, 사용자가 선택(interrupt) 도중 떠나도 삭제되지 않습니다.
+→ MemorySaver를 감싸 세션별 마지막 사용 시각과 메모리(직렬화 바이트)를 추적하고
+  - 유휴 TTL: 마지막 사용 후 SESSION_IDLE_TTL_SECONDS가 지나면 삭제
+    (리포트까지 끝난 세션은 SESSION_FINISHED_TTL_SECONDS 후 삭제)
+  - 세션 수 / 전체 바이트 상한: 넘으면 가장 오래 쓰지 않은 세션부터 삭제 (LRU)
+  - 명시적 삭제: DELETE /threads/{thread_id}
+→ 몇 주 동안 실행해도 체크포인터 메모리가 상한 안에서 유지
+
+세션이 삭제되면 on_evict 콜백(프리페치 캐시 정리 등)을 호출
+만료 확인은 체크포인트 저장 시에 같이 수행 (SESSION_SWEEP_SECONDS 간격, 별도 스레드 없음)
+
+목록:
+1. BoundedMemorySaver: 세션 수명/메모리 상한이 있는 MemorySaver (그래프 checkpointer)
+2. 세션 메트릭: design_sessions / design_session_bytes / design_sessions_evicted_total
+
+사용법:
+    saver = BoundedMemorySaver(on_evict=[prefetcher.discard])
+    graph = workflow.compile(checkpointer=saver)
+    saver.delete("thread-id")     # → 해제한 바이트 수
+    saver.stats()                 # {"sessions": ..., "bytes": ..., ...}
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from tracing import Counter, Gauge
+
+
+# ==================== 설정 ====================
+
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(3600)))          # 1시간 미사용 세션 삭제
+SESSION_FINISHED_TTL_SECONDS = int(os.getenv("SESSION_FINISHED_TTL_SECONDS", str(300)))   # 리포트까지 끝난 세션은 5분 후 삭제
+SESSION_MAX_THREADS = int(os.getenv("SESSION_MAX_THREADS", "2000"))                        # 최대 세션 수
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(512 * 1024 * 1024)))             # 전체 세션 최대 512MB (직렬화 기준)
+SESSION_SWEEP_SECONDS = 30          # 유휴 세션 확인 간격
+
+
+# ==================== 메트릭 ====================
+
+SESSIONS = Gauge("design_sessions", "체크포인터에 보관 중인 대화 세션 수")
+SESSION_BYTES = Gauge("design_session_bytes", "대화 세션 체크포인트 직렬화 바이트 합계")
+SESSIONS_EVICTED = Counter("design_sessions_evicted_total", "삭제된 대화 세션 수 (reason: idle/finished/lru/bytes/deleted)")
+
+
+# ==================== 저장소 ====================
+
+def _sizeof(value):
+    """체크포인터 저장 항목(직렬화 bytes를 담은 tuple/dict) → 바이트 수"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    return 0
+
+
+class _Session:
+    __slots__ = ("bytes", "last_used", "ttl")
+
+    def __init__(self, ttl):
+        self.bytes = 0
+        self.last_used = time.monotonic()
+        self.ttl = ttl
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    세션별 마지막 사용 시각/바이트를 추적하는 MemorySaver
+
+    바이트는 MemorySaver가 보관하는 직렬화 값(체크포인트, 채널 값, 중간 쓰기)의 길이 합
+    → 실제 파이썬 객체 메모리와 정확히 같지는 않지만, 세션 간 비교/상한 기준으로 사용
+    """
+
+    def __init__(self, idle_ttl=SESSION_IDLE_TTL_SECONDS, finished_ttl=SESSION_FINISHED_TTL_SECONDS,
+                 max_threads=SESSION_MAX_THREADS, max_bytes=SESSION_MAX_BYTES, on_evict=None):
+        super().__init__()
+        self.idle_ttl = idle_ttl
+        self.finished_ttl = finished_ttl
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.on_evict = list(on_evict or [])
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()   # thread_id → _Session (오래 쓰지 않은 순)
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+
+    # ----- 체크포인터 (그래프가 호출) -----
+
+    def get_tuple(self, config):
+        self._touch(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        # 이번에 추가된 항목만 계산 (체크포인트 1개 + 새 버전 채널 값)
+        added = _sizeof(self.storage.get(thread_id, {}).get(checkpoint_ns, {}).get(checkpoint["id"]))
+        added += sum(_sizeof(self.blobs.get((thread_id, checkpoint_ns, channel, version)))
+                     for channel, version in new_versions.items())
+        self._account(thread_id, added)
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        key = (config["configurable"]["thread_id"], config["configurable"].get("checkpoint_ns", ""),
+               config["configurable"]["checkpoint_id"])
+        before = _sizeof(self.writes.get(key))
+        super().put_writes(config, writes, task_id, task_path)
+        self._account(key[0], _sizeof(self.writes.get(key)) - before)
+
+    def delete_thread(self, thread_id):
+        if self.delete(thread_id) is None:
+            super().delete_thread(thread_id)
+
+    # ----- 세션 관리 (API) -----
+
+    def has(self, thread_id):
+        with self._lock:
+            return thread_id in self._sessions
+
+    def thread_bytes(self, thread_id):
+        """세션 1개 메모리 (직렬화 바이트, 없는 세션이면 None)"""
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            return session.bytes if session else None
+
+    def mark_finished(self, thread_id):
+        """리포트까지 끝난 세션 → 짧은 TTL 적용 (더 이상 재개할 interrupt가 없음)"""
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is not None:
+                session.ttl = min(session.ttl, self.finished_ttl)
+
+    def delete(self, thread_id, reason="deleted"):
+        """
+        세션 삭제 (체크포인트 + 채널 값 + 중간 쓰기) 후 on_evict 콜백 호출
+
+        Returns:
+            int: 해제한 바이트 수 (없는 세션이면 None)
+        """
+        with self._lock:
+            session = self._sessions.pop(thread_id, None)
+            if session is not None:
+                self._total_bytes -= session.bytes
+                self._update_gauges()
+        if session is None:
+            return None
+
+        super().delete_thread(thread_id)
+        SESSIONS_EVICTED.inc(reason=reason)
+        for callback in self.on_evict:
+            try:
+                callback(thread_id)
+            except Exception as e:
+                print(f"⚠️ 세션 정리 콜백 실패 ({thread_id}): {type(e).__name__}: {e}")
+        return session.bytes
+
+    def sweep(self):
+        """TTL이 지난 세션 삭제 → 삭제한 세션 수"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_sweep = now
+            expired = [(thread_id, "finished" if session.ttl < self.idle_ttl else "idle")
+                       for thread_id, session in self._sessions.items()
+                       if now - session.last_used > session.ttl]
+        for thread_id, reason in expired:
+            self.delete(thread_id, reason=reason)
+        return len(expired)
+
+    def stats(self, top=5):
+        """세션 수/바이트 합계 + 메모리를 가장 많이 쓰는 세션 top개"""
+        with self._lock:
+            largest = sorted(self._sessions.items(), key=lambda item: item[1].bytes, reverse=True)[:top]
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "largest": [{"thread_id": thread_id, "bytes": session.bytes} for thread_id, session in largest],
+            }
+
+    # ----- 내부 -----
+
+    def _touch(self, thread_id):
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(thread_id)
+
+    def _account(self, thread_id, added):
+        """세션 바이트 갱신 + 상한 초과 시 LRU 삭제 대상 선정 (현재 세션은 제외)"""
+        evict = []
+        with self._lock:
+            session = self._sessions.get(thread_id)
+            if session is None:
+                session = self._sessions[thread_id] = _Session(self.idle_ttl)
+            session.bytes += added
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(thread_id)
+            self._total_bytes += added
+
+            count, total = len(self._sessions), self._total_bytes
+            for old_thread_id, old in self._sessions.items():
+                if old_thread_id == thread_id:
+                    break
+                if count > self.max_threads:
+                    evict.append((old_thread_id, "lru"))
+                elif total > self.max_bytes:
+                    evict.append((old_thread_id, "bytes"))
+                else:
+                    break
+                count -= 1
+                total -= old.bytes
+            self._update_gauges()
+            sweep_due = time.monotonic() - self._last_sweep > SESSION_SWEEP_SECONDS
+
+        for old_thread_id, reason in evict:
+            self.delete(old_thread_id, reason=reason)
+        if sweep_due:
+            self.sweep()
+
+    def _update_gauges(self):
+        SESSIONS.set(len(self._sessions))
+        SESSION_BYTES.set(self._total_bytes)
@@ -0,0 +1,101 @@
+"""
+admission.py 테스트 (토큰 버킷 / 클라이언트 키 / 동시 실행 상한 + 대기열)
+
+사용법:
+    cd src && python -m pytest test_admission.py -q
+"""
+
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from admission import TokenBucket, ClientRateLimiter, EndpointLimiter, AdmissionRejected, client_key
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=20.0, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+
+    wait = bucket.take()
+    assert 0 < wait <= 1 / 20.0
+    time.sleep(wait + 0.01)
+    assert bucket.take() == 0.0
+
+
+def test_rate_limiter_rejects_with_retry_after():
+    limiter = ClientRateLimiter(per_minute=60, burst=2)
+    limiter.check("ip:1.2.3.4", "image")
+    limiter.check("ip:1.2.3.4", "image")
+    with pytest.raises(AdmissionRejected) as error:
+        limiter.check("ip:1.2.3.4", "image")
+    assert error.value.status_code == 429
+    assert error.value.retry_after >= 1
+
+    limiter.check("ip:5.6.7.8", "image")   # 다른 클라이언트는 별도 버킷
+
+
+def test_rate_limiter_disabled():
+    limiter = ClientRateLimiter(per_minute=0, burst=1)
+    for _ in range(10):
+        limiter.check("ip:1.2.3.4", "image")
+
+
+def test_client_key_ignores_untrusted_client_id():
+    assert client_key("1.2.3.4", "random-id", trusted_proxies=frozenset()) == "ip:1.2.3.4"
+    assert client_key("10.0.0.1", "user-7", trusted_proxies=frozenset({"10.0.0.1"})) == "id:user-7"
+    assert client_key("10.0.0.1", None, trusted_proxies=frozenset({"10.0.0.1"})) == "ip:10.0.0.1"
+    assert client_key(None) == "ip:unknown"
+
+
+def test_endpoint_limiter_queue_full():
+    async def scenario():
+        limiter = EndpointLimiter("test", max_concurrency=1, max_queue=1, queue_timeout=1.0)
+        release = asyncio.Event()
+        order = []
+
+        async def request(name):
+            async with limiter.slot():
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(request("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request("second"))   # 대기열 1칸 사용
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as error:
+            async with limiter.slot():
+                pass
+        assert error.value.status_code == 503
+        assert error.value.retry_after >= 1
+
+        release.set()
+        await asyncio.gather(first, second)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+
+
+def test_endpoint_limiter_queue_timeout():
+    async def scenario():
+        limiter = EndpointLimiter("test", max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as error:
+            async with limiter.slot():
+                pass
+        release.set()
+        await holder
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503
@@ -0,0 +1,87 @@
+"""
+analysis_schema.py 테스트 (VLM 응답 검증 + 압축 JSON)
+
+사용법:
+    cd src && python -m pytest test_analysis_schema.py -q
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("langchain_core")
+
+from analysis_schema import parse_analysis, parse_comparison, compact_analysis, compact_comparison
+
+
+ANALYSIS = """분석 결과입니다.
+```json
+{
+  "물품": "용기",
+  "형상_관찰": {
+    "전체_실루엣": "세로로 긴 원통형",
+    "몸체_형태": "원통형 몸체",
+    "상부_구조": "펌프형 캡",
+    "하부_형태": "평평한 바닥",
+    "비례_관계": "높이가 폭의 약 3배"
+  }
+}
+```
+이상입니다."""
+
+COMPARISON = """```json
+{
+  "유사한_점": [{"항목": "하부_형태", "설명": "두 디자인 모두 평평한 바닥"}],
+  "비유사한_점": [{"항목": "상부_구조", "설명": "펌프형 캡과 스크류 캡"}]
+}
+```"""
+
+
+def test_parse_analysis_code_block():
+    analysis = parse_analysis(ANALYSIS)
+    assert analysis.article == "용기"
+    assert analysis.shape.top == "펌프형 캡"
+
+
+def test_parse_analysis_fills_missing_observations():
+    analysis = parse_analysis('{"물품": "병", "형상_관찰": {"전체_실루엣": "원통형"}}')
+    assert analysis.shape.silhouette == "원통형"
+    assert analysis.shape.body == "관찰되지 않음"
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    None,
+    "JSON이 아닌 응답",
+    '{"물품": "병"}',                 # 필수 필드(형상_관찰) 없음
+    '{"물품": "병", "형상_관찰": ',   # 잘린 JSON
+])
+def test_parse_analysis_invalid(text):
+    assert parse_analysis(text) is None
+
+
+def test_compact_analysis_round_trip():
+    compact = compact_analysis(ANALYSIS)
+    assert "\n" not in compact and ": " not in compact
+    assert json.loads(compact)["형상_관찰"]["상부_구조"] == "펌프형 캡"
+    assert parse_analysis(compact) == parse_analysis(ANALYSIS)
+
+
+def test_compact_analysis_falls_back_to_text():
+    assert compact_analysis("JSON이 아닌 응답") == "JSON이 아닌 응답"
+
+
+def test_parse_comparison():
+    comparison = parse_comparison(COMPARISON)
+    assert comparison.target is None
+    assert [point.item for point in comparison.similarities] == ["하부_형태"]
+    assert comparison.differences[0].description == "펌프형 캡과 스크류 캡"
+    assert parse_comparison('{"유사한_점": []}') is None
+
+
+def test_compact_comparison_with_reference():
+    compact = compact_comparison(COMPARISON, reference=compact_analysis(ANALYSIS))
+    data = json.loads(compact)
+    assert data["비교_디자인_분석"]["물품"] == "용기"
+    assert "비교_디자인_분석" not in json.loads(compact_comparison(COMPARISON))
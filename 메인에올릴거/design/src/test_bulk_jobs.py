@@ -0,0 +1,117 @@
+"""
+bulk_jobs.py 테스트 (업로드 저장 / 남은 작업 폴더 정리 / OpenAI 장애 시 재시도 / 읽을 수 없는 도면)
+
+도면 검토(screen_items) 대신 결과를 정해 둔 함수를 사용합니다.
+screen_items 테스트는 design_chatbot 대신 가짜 모듈을 등록합니다 (검색/VLM까지 가지 않는 경우만).
+
+사용법:
+    cd src && python -m pytest test_bulk_jobs.py -q
+"""
+
+import os
+import sys
+import time
+import types
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+import bulk_jobs
+from bulk_jobs import JobStore, BulkJobRunner
+
+
+# ==================== 등록 ====================
+
+def test_commit_registers_streamed_items(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.begin()
+    items = [store.add_item(job_id, idx, f"{idx}.png", b"png", ".png") for idx in range(3)]
+
+    # commit 전에는 워커가 가져가지 않음
+    assert store.claim("worker") is None
+    assert store.progress(job_id) is None
+
+    store.commit(job_id, items, {"n_results": 5, "compare_top": 0})
+    assert store.progress(job_id)["total"] == 3
+    assert [item["filename"] for item in store.pending_items(job_id, 10)] == ["0.png", "1.png", "2.png"]
+    assert all(os.path.exists(item["image_path"]) for item in store.pending_items(job_id, 10))
+
+
+def test_discard_and_orphan_purge(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path))
+    discarded = store.begin()
+    store.add_item(discarded, 0, "a.png", b"png", ".png")
+    store.discard(discarded)
+    assert not os.path.exists(store.job_dir(discarded))
+
+    # commit 전에 멈춘 작업 폴더는 BULK_STALE_SECONDS가 지나면 정리, 등록된 작업 폴더는 남김
+    orphan = store.begin()
+    job_id = store.create([("b.png", b"png", ".png")], {})
+    monkeypatch.setattr(bulk_jobs, "BULK_STALE_SECONDS", 0)
+    time.sleep(0.01)
+    store.purge()
+    assert not os.path.exists(store.job_dir(orphan))
+    assert os.path.exists(store.job_dir(job_id))
+    assert os.path.exists(store.path)
+
+
+# ==================== 실행 ====================
+
+def test_llm_outage_leaves_items_pending_and_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_jobs, "BULK_RETRY_SECONDS", 0.01)
+    store = JobStore(str(tmp_path))
+    job_id = store.create([(f"{idx}.png", b"png", ".png") for idx in range(2)], {})
+    calls = []
+
+    def screen(items, n_results, compare_top, on_item=None):
+        calls.append([item["idx"] for item in items])
+        if len(calls) == 1:   # 첫 묶음: 1장 분석, 1장은 OpenAI 장애
+            return {0: ("done", {"analysis": "ok"}, None),
+                    1: ("pending", None, "CircuitOpenError: open")}
+        return {item["idx"]: ("done", {"analysis": "ok"}, None) for item in items}
+
+    runner = BulkJobRunner(store, screen=screen, batch_size=2)
+    runner._run(store.claim(runner.owner))
+
+    assert calls == [[0, 1], [1]]
+    progress = store.progress(job_id)
+    assert progress["status"] == "done"
+    assert (progress["done"], progress["failed"]) == (2, 0)
+
+
+def test_item_pending_beyond_max_attempts_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_jobs, "BULK_RETRY_SECONDS", 0.001)
+    monkeypatch.setattr(bulk_jobs, "BULK_MAX_ATTEMPTS", 3)
+    store = JobStore(str(tmp_path))
+    job_id = store.create([(f"{idx}.png", b"png", ".png") for idx in range(2)], {})
+    calls = []
+
+    def screen(items, n_results, compare_top, on_item=None):
+        # 도면 1은 매번 마감 시간 초과 (해당 도면만의 문제)
+        calls.append([item["idx"] for item in items])
+        return {item["idx"]: ("pending", None, "LLMDeadlineExceeded: 마감 시간 초과") if item["idx"] == 1
+                else ("done", {"analysis": "ok"}, None) for item in items}
+
+    runner = BulkJobRunner(store, screen=screen, batch_size=2)
+    runner._run(store.claim(runner.owner))
+
+    assert calls == [[0, 1], [1], [1]]
+    progress = store.progress(job_id)
+    assert progress["status"] == "done"
+    assert (progress["done"], progress["failed"]) == (1, 1)
+    assert "3회 시도" in store.results(job_id)[1]["error"]
+
+
+def test_unreadable_item_fails_alone(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "design_chatbot", types.SimpleNamespace(
+        llm=None, output_parser=None, image_collection=None, search_where=None, compare_with_design=None))
+    store = JobStore(str(tmp_path))
+    job_id = store.create([("a.png", b"not an image", ".png"), ("b.png", b"png", ".png")], {})
+    items = store.pending_items(job_id, 10)
+    os.remove(items[1]["image_path"])
+
+    outcomes = bulk_jobs.screen_items(items, n_results=5, compare_top=0)
+    assert [status for status, _, _ in outcomes.values()] == ["failed", "failed"]
+    assert outcomes[0][2].startswith("도면을 읽을 수 없음: UnidentifiedImageError")
+    assert outcomes[1][2].startswith("도면을 읽을 수 없음: FileNotFoundError")
@@ -0,0 +1,58 @@
+"""
+dedup_index.py 테스트 (LSH 유사 중복 클러스터링)
+
+사용법:
+    cd src && python -m pytest test_dedup_index.py -q
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+
+from dedup_index import find_clusters
+
+
+def _unit(rng, dim):
+    vector = rng.standard_normal(dim)
+    return vector / np.linalg.norm(vector)
+
+
+def test_near_duplicates_cluster_together():
+    rng = np.random.default_rng(1)
+    dim = 64
+    vectors, expected = [], []
+    for _ in range(4):
+        base = _unit(rng, dim)
+        members = []
+        for _ in range(3):
+            members.append(len(vectors))
+            vectors.append(base + rng.standard_normal(dim) * 0.002)
+        expected.append(sorted(members))
+    singles = []
+    for _ in range(6):
+        singles.append(len(vectors))
+        vectors.append(_unit(rng, dim))
+
+    clusters = find_clusters(np.array(vectors), similarity=0.97, bits=8, tables=4)
+
+    assert sorted(sorted(cluster) for cluster in clusters) == sorted(expected + [[i] for i in singles])
+    assert sum(len(cluster) for cluster in clusters) == len(vectors)
+
+
+def test_representative_is_closest_to_centroid():
+    rng = np.random.default_rng(2)
+    base = _unit(rng, 32)
+    offset = _unit(rng, 32) * 0.01
+    # 평균 방향 = base → base가 대표 도면 (입력 순서상 가운데)
+    clusters = find_clusters(np.array([base + offset, base, base - offset]), similarity=0.99, bits=4, tables=2)
+    assert clusters == [[1, 0, 2]]
+
+
+def test_dissimilar_vectors_stay_apart():
+    rng = np.random.default_rng(3)
+    vectors = np.array([_unit(rng, 128) for _ in range(50)])
+    clusters = find_clusters(vectors, similarity=0.97, bits=2, tables=4)   # 버킷이 커도 유사도 기준으로 판단
+    assert all(len(cluster) == 1 for cluster in clusters)
+    assert len(clusters) == 50
@@ -0,0 +1,65 @@
+"""
+image_shards.py 테스트 (샤드 생성/읽기, 다시 pack할 때 세대 교체)
+
+사용법:
+    cd src && python -m pytest test_image_shards.py -q
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+
+from image_shards import pack_shards, ShardStore
+
+
+def _items(tmp_path, count, size=100):
+    items = []
+    for idx in range(count):
+        path = tmp_path / f"{idx}.bin"
+        path.write_bytes(bytes([idx]) * size)
+        items.append((f"design-{idx}", str(path)))
+    return items
+
+
+def _shard_files(shard_dir):
+    return sorted(name for name in os.listdir(shard_dir) if name.startswith("shard-"))
+
+
+def test_pack_and_read(tmp_path):
+    shard_dir = tmp_path / "shards"
+    assert pack_shards(_items(tmp_path, 5), shard_dir=str(shard_dir), shard_max_bytes=250) == 5
+
+    store = ShardStore(str(shard_dir))
+    assert len(_shard_files(shard_dir)) == 3
+    assert bytes(store.get("design-3")) == bytes([3]) * 100
+    assert store.get("missing") is None
+
+
+def test_repack_with_fewer_shards_removes_old_files(tmp_path):
+    shard_dir = tmp_path / "shards"
+    items = _items(tmp_path, 5)
+    pack_shards(items, shard_dir=str(shard_dir), shard_max_bytes=250)
+    old = ShardStore(str(shard_dir))
+    old_bytes = bytes(old.get("design-4"))   # 기존 세대 샤드를 mmap한 상태
+
+    pack_shards(items[:2], shard_dir=str(shard_dir), shard_max_bytes=10_000)
+
+    assert _shard_files(shard_dir) == ["shard-g0002-00000.bin"]
+    new = ShardStore(str(shard_dir))
+    assert len(new) == 2 and bytes(new.get("design-1")) == bytes([1]) * 100
+    assert old_bytes == bytes([4]) * 100
+
+
+def test_failed_pack_keeps_previous_generation(tmp_path):
+    shard_dir = tmp_path / "shards"
+    items = _items(tmp_path, 2)
+    pack_shards(items, shard_dir=str(shard_dir))
+
+    with pytest.raises(FileNotFoundError):
+        pack_shards(items + [("design-x", str(tmp_path / "missing.bin"))], shard_dir=str(shard_dir))
+
+    assert _shard_files(shard_dir) == ["shard-g0001-00000.bin"]
+    assert bytes(ShardStore(str(shard_dir)).get("design-0")) == bytes([0]) * 100
@@ -0,0 +1,120 @@
+"""
+ingest.py 테스트 (워터마크 / 손상된 도면 건너뛰기 / 이미지 저장 순서)
+
+CLIP 대신 고정 임베딩 함수, Chroma 대신 호출을 기록하는 컬렉션을 사용합니다.
+
+사용법:
+    cd src && python -m pytest test_ingest.py -q
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+
+from PIL import Image
+
+import ingest
+from ingest import IngestState
+from image_manifest import ImageManifest
+
+
+# ==================== 워터마크 ====================
+
+def test_advance_keeps_ids_at_watermark(tmp_path):
+    state = IngestState(str(tmp_path / "state.json"))
+    state.advance("new", [(100, "a"), (200, "b"), (200, "c")])
+    assert state.watermark("new") == (200, {"b", "c"})
+
+    # 같은 시각 파일이 다음 배치에 이어지면 합침
+    state.advance("new", [(200, "d")])
+    assert state.watermark("new") == (200, {"b", "c", "d"})
+
+    # 워터마크가 앞으로 가면 이전 시각의 ID는 버림
+    state.advance("new", [(300, "e")])
+    assert state.watermark("new") == (300, {"e"})
+
+    # 저장 후 다시 로드해도 같음
+    assert IngestState(state.path).watermark("new") == (300, {"e"})
+    assert IngestState(state.path).watermark("other") == (0, set())
+
+
+# ==================== 반영 ====================
+
+class _RecordingCollection:
+    def __init__(self, images_dir, stored=None):
+        self.images_dir = images_dir
+        self.upserts = []
+        self.metadatas = dict(stored or {})
+
+    def upsert(self, ids, embeddings, metadatas):
+        # upsert 시점에 이미지 파일이 이미 저장되어 있어야 함
+        for design_id in ids:
+            assert os.path.exists(os.path.join(self.images_dir, ingest.design_id_to_filename(design_id)))
+        self.upserts.append(list(ids))
+        self.metadatas.update(zip(ids, metadatas))
+
+    def get(self, include, ids=None, where=None):
+        if ids is None:
+            return {"ids": [], "metadatas": []}
+        found = [design_id for design_id in ids if design_id in self.metadatas]
+        return {"ids": found, "metadatas": [self.metadatas[design_id] for design_id in found]}
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    source = tmp_path / "new"
+    images_dir = tmp_path / "images"
+    source.mkdir()
+    manifest = ImageManifest(str(images_dir), str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(ingest, "get_manifest", lambda: manifest)
+    monkeypatch.setattr(ingest, "get_image_embeddings", lambda images: [[0.0] * 4 for _ in images])
+    refreshed = []
+    monkeypatch.setattr(ingest, "refresh_indexes", refreshed.append)
+    return source, images_dir, manifest, IngestState(str(tmp_path / "state.json")), refreshed
+
+
+def test_corrupt_image_is_skipped_and_watermark_advances(setup):
+    source, images_dir, manifest, state, refreshed = setup
+    Image.new("RGB", (32, 32), "white").save(source / "3020250000001-09-01-0_000.jpg")
+    (source / "3020250000001-09-01-0_001.jpg").write_bytes(b"not a jpeg")
+    Image.new("RGB", (32, 32), "black").save(source / "3020250000002-09-01-0_000.jpg")
+
+    collection = _RecordingCollection(str(images_dir))
+    stats = ingest.ingest(collection, str(source), state=state, batch_size=2, images_dir=str(images_dir))
+
+    assert stats["embedded"] == 2
+    assert stats["failed"] == 1
+    assert stats["failures"][0]["design_id"] == "3020250000001-09-01-0-IMG-1"
+    assert sorted(sum(collection.upserts, [])) == ["3020250000001-09-01-0-IMG-0", "3020250000002-09-01-0-IMG-0"]
+    assert "3020250000001-09-01-0-IMG-1" not in manifest
+    assert refreshed == [collection]
+
+    # 다시 실행하면 손상된 도면도 다시 시도하지 않음
+    again = ingest.ingest(collection, str(source), state=state, batch_size=2, images_dir=str(images_dir))
+    assert again["embedded"] == 0 and again["failed"] == 0 and again["skipped"] == 3
+    assert refreshed == [collection]
+
+
+def test_reingest_keeps_cluster_and_descriptor(setup):
+    source, images_dir, manifest, state, refreshed = setup
+    Image.new("RGB", (32, 32), "white").save(source / "3020250000001-09-01-0_000.jpg")
+    Image.new("RGB", (32, 32), "black").save(source / "3020250000002-09-01-0_000.jpg")
+
+    existing = "3020250000001-09-01-0-IMG-0"
+    collection = _RecordingCollection(str(images_dir), stored={existing: {
+        "applicationNumber": "3020250000001", "articleName": "용기", "cluster_id": "other-IMG-0",
+        "is_representative": False, "cluster_size": 3, "shape_descriptor": "원통형",
+    }})
+    ingest.ingest(collection, str(source), state=state, images_dir=str(images_dir))
+
+    # 기존 도면: 클러스터 / 형상 설명 유지
+    kept = collection.metadatas[existing]
+    assert (kept["cluster_id"], kept["is_representative"], kept["cluster_size"]) == ("other-IMG-0", False, 3)
+    assert kept["shape_descriptor"] == "원통형" and kept["articleName"] == "용기"
+
+    # 새 도면: 혼자인 클러스터
+    new = collection.metadatas["3020250000002-09-01-0-IMG-0"]
+    assert (new["cluster_id"], new["is_representative"], new["cluster_size"]) == ("3020250000002-09-01-0-IMG-0", True, 1)
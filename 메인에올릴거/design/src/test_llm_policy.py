@@ -0,0 +1,169 @@
+"""
+llm_policy.py 테스트 (재시도 / 서킷 브레이커 / 마감 시간 / 헤징)
+
+fakes.py의 FakeChatOpenAI로 오류(429)와 긴 지연을 주입해 확인합니다. (API 키/네트워크 불필요)
+
+사용법:
+    cd src && python -m pytest test_llm_policy.py -q
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+import fakes
+from fakes import FakeChatOpenAI, FakeRateLimitError
+from llm_policy import (LLMCallPolicy, CircuitBreaker, LLMDeadlineExceeded, CircuitOpenError,
+                        DEADLINE_RETRY_AFTER)
+
+
+@pytest.fixture
+def fake_config(monkeypatch):
+    """테스트마다 FAKE_CONFIG를 바꾸고 끝나면 원래대로"""
+    def configure(**values):
+        for key, value in values.items():
+            monkeypatch.setitem(fakes.FAKE_CONFIG, key, value)
+    return configure
+
+
+def _policy(name, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 0.02)
+    kwargs.setdefault("hedge_after", 0)
+    return LLMCallPolicy(name, **kwargs)
+
+
+def test_retry_then_success():
+    llm = FakeChatOpenAI()
+    calls = []
+
+    def flaky(prompt):
+        calls.append(prompt)
+        if len(calls) == 1:
+            raise FakeRateLimitError("가짜 rate limit 오류")
+        return llm.invoke(prompt)
+
+    result = _policy("retry", max_retries=2).call(flaky, "안녕")
+    assert result.content.startswith("[fake:")
+    assert len(calls) == 2
+
+
+def test_retry_gives_up_after_max_retries(fake_config):
+    fake_config(llm_error_rate=1.0)
+    llm = FakeChatOpenAI()
+    calls = []
+
+    def invoke(prompt):
+        calls.append(prompt)
+        return llm.invoke(prompt)
+
+    with pytest.raises(FakeRateLimitError):
+        _policy("give_up", max_retries=2).call(invoke, "안녕")
+    assert len(calls) == 3
+
+
+def test_non_retryable_error_is_not_retried():
+    calls = []
+
+    def bad_request(prompt):
+        calls.append(prompt)
+        raise ValueError("잘못된 요청")
+
+    with pytest.raises(ValueError):
+        _policy("bad_request", max_retries=2).call(bad_request, "안녕")
+    assert len(calls) == 1
+
+
+def test_breaker_opens_and_recovers_after_cooldown(fake_config):
+    llm = FakeChatOpenAI()
+    calls = []
+
+    def invoke(prompt):
+        calls.append(prompt)
+        return llm.invoke(prompt)
+
+    policy = _policy("breaker", max_retries=0, breaker=CircuitBreaker("test", failures=2, cooldown=0.2))
+
+    fake_config(llm_error_rate=1.0)
+    for _ in range(2):
+        with pytest.raises(FakeRateLimitError):
+            policy.call(invoke, "안녕")
+
+    # 열림: 호출하지 않고 바로 실패 (Retry-After용 남은 시간 포함)
+    with pytest.raises(CircuitOpenError) as error:
+        policy.call(invoke, "안녕")
+    assert error.value.status_code == 503
+    assert error.value.retry_after >= 1.0
+    assert len(calls) == 2
+
+    # half-open: 시험 호출이 실패하면 다시 열림
+    time.sleep(0.25)
+    with pytest.raises(FakeRateLimitError):
+        policy.call(invoke, "안녕")
+    with pytest.raises(CircuitOpenError):
+        policy.call(invoke, "안녕")
+    assert len(calls) == 3
+
+    # half-open: 시험 호출이 성공하면 닫힘
+    fake_config(llm_error_rate=0.0)
+    time.sleep(0.25)
+    assert policy.call(invoke, "안녕").content.startswith("[fake:")
+    assert policy.call(invoke, "안녕").content.startswith("[fake:")
+    assert len(calls) == 5
+
+
+def test_non_retryable_error_does_not_close_half_open_breaker():
+    breaker = CircuitBreaker("test", failures=3, cooldown=0.1)
+    policy = _policy("half_open_bad_request", max_retries=0, breaker=breaker)
+
+    def unavailable(prompt):
+        raise FakeRateLimitError("가짜 rate limit 오류")
+
+    def bad_request(prompt):
+        raise ValueError("잘못된 요청")
+
+    for _ in range(3):
+        with pytest.raises(FakeRateLimitError):
+            policy.call(unavailable, "안녕")
+
+    # half-open 시험 호출이 요청 오류(400 등)로 끝나면 닫지 않고 다음 호출이 다시 시험
+    time.sleep(0.15)
+    with pytest.raises(ValueError):
+        policy.call(bad_request, "안녕")
+    with pytest.raises(FakeRateLimitError):
+        policy.call(unavailable, "안녕")
+    with pytest.raises(CircuitOpenError):
+        policy.call(bad_request, "안녕")
+
+
+def test_deadline_exceeded(fake_config):
+    fake_config(llm_stall_rate=1.0, llm_stall=0.5)
+    llm = FakeChatOpenAI()
+    policy = _policy("deadline", deadline=0.1, max_retries=2, breaker=CircuitBreaker("deadline"))
+
+    start = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded) as error:
+        policy.call(llm.invoke, "안녕")
+    assert time.monotonic() - start < 0.4
+    assert error.value.status_code == 504
+    assert error.value.retry_after == DEADLINE_RETRY_AFTER
+
+
+def test_hedging_uses_first_response():
+    llm = FakeChatOpenAI()
+    calls = []
+
+    def slow_first(prompt):
+        calls.append(prompt)
+        if len(calls) == 1:
+            time.sleep(0.5)   # 첫 요청만 꼬리 지연
+        return llm.invoke(prompt)
+
+    policy = _policy("hedge", deadline=2.0, hedge_after=0.05, breaker=CircuitBreaker("hedge"))
+    start = time.monotonic()
+    result = policy.call(slow_first, "안녕")
+    assert time.monotonic() - start < 0.4
+    assert result.content.startswith("[fake:")
+    assert len(calls) == 2
@@ -0,0 +1,44 @@
+"""
+profiling.py 테스트 (프로파일 ID 발급 / 경로 문자 차단)
+
+사용법:
+    cd src && python -m pytest test_profiling.py -q
+"""
+
+import cProfile
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("langchain_core")
+
+import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _profile():
+    profile = cProfile.Profile()
+    profile.runcall(sum, range(100))
+    return profile
+
+
+def test_save_and_load_with_server_id(profile_dir):
+    profile_id = profiling.new_profile_id()
+    assert profile_id != profiling.new_profile_id()
+
+    path = profiling.save_request_profile(profile_id, [_profile()], 0.01, label="GET /health (요청 ID abc)")
+    assert path == str(profile_dir / f"{profile_id}.txt")
+    assert "요청 ID abc" in profiling.load_profile(profile_id)
+
+
+@pytest.mark.parametrize("profile_id", ["../escape", "a/b", "..", "", "id with space", None])
+def test_path_characters_rejected(profile_dir, profile_id):
+    with pytest.raises(ValueError):
+        profiling.save_request_profile(profile_id, [_profile()], 0.01)
+    assert profiling.load_profile(profile_id) is None
+    assert list(profile_dir.iterdir()) == []
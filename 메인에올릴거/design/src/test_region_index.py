@@ -0,0 +1,95 @@
+"""
+region_index.py 테스트 (영역 인덱스 생성: 빈 도면 기록 / 임베딩 실패 재시도)
+
+CLIP 대신 고정 임베딩 함수, Chroma 대신 메모리 컬렉션을 사용합니다.
+
+사용법:
+    cd src && python -m pytest test_region_index.py -q
+"""
+
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+
+from PIL import Image, ImageDraw
+
+import region_index
+
+
+class _MemoryCollection:
+    def __init__(self, items=None):
+        self.items = dict(items or {})   # id → metadata
+
+    def get(self, include=None, limit=None, offset=0, **kwargs):
+        ids = list(self.items)[offset:offset + limit if limit else None]
+        return {"ids": ids, "metadatas": [self.items[i] for i in ids]}
+
+    def upsert(self, ids, embeddings, metadatas):
+        self.items.update(zip(ids, metadatas))
+
+
+def _png(draw):
+    image = Image.new("RGB", (200, 200), "white")
+    if draw:
+        pen = ImageDraw.Draw(image)
+        pen.rectangle((20, 20, 180, 180), outline="black", width=6)
+        pen.line((20, 20, 180, 180), fill="black", width=6)
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    images = {"drawn": _png(True), "blank": _png(False)}
+    monkeypatch.setattr(region_index, "get_design_image_bytes", images.get)
+    rng = np.random.default_rng(0)
+    monkeypatch.setattr(region_index, "get_image_embeddings",
+                        lambda batch: [list(rng.standard_normal(8)) for _ in batch])
+    source = _MemoryCollection({"drawn": {"applicationNumber": "1"}, "blank": {"applicationNumber": "2"}})
+    return source, str(tmp_path / "region_empty.json"), monkeypatch
+
+
+def test_blank_design_is_recorded_once(setup):
+    source, empty_path, _ = setup
+    regions = _MemoryCollection()
+
+    stats = region_index.build_region_index(source, regions, empty_path=empty_path)
+    assert (stats["designs"], stats["empty"]) == (1, 1)
+    assert {metadata["design_id"] for metadata in regions.items.values()} == {"drawn"}
+
+    again = region_index.build_region_index(source, regions, empty_path=empty_path)
+    assert (again["designs"], again["empty"]) == (0, 0)
+
+
+def test_failed_embedding_is_not_counted(setup):
+    source, empty_path, monkeypatch = setup
+    regions = _MemoryCollection()
+    monkeypatch.setattr(region_index, "get_image_embeddings", lambda batch: None)
+
+    stats = region_index.build_region_index(source, regions, empty_path=empty_path)
+    assert (stats["designs"], stats["regions"], stats["failed"]) == (0, 0, 1)
+    assert regions.items == {}
+
+
+def test_restrict_to_source_uses_current_cluster_metadata():
+    image_collection = _MemoryCollection({"a": {"cluster_id": "a", "is_representative": True},
+                                          "b": {"cluster_id": "a", "is_representative": False}})
+
+    def get(ids, where, include):
+        found = [i for i in ids if all(image_collection.items[i].get(k) == v for k, v in where.items())]
+        return {"ids": found, "metadatas": [image_collection.items[i] for i in found]}
+    image_collection.get = get
+
+    # 영역 메타데이터는 색인 시점 복사본 (b가 대표였던 때)
+    results = {"ids": [["b", "a"]], "distances": [[0.1, 0.2]],
+               "metadatas": [[{"is_representative": True, "region": "top"}, {"region": "left"}]]}
+    restricted = region_index._restrict_to_source(image_collection, results, {"is_representative": True})
+
+    assert restricted["ids"] == [["a"]]
+    assert restricted["distances"] == [[0.2]]
+    assert restricted["metadatas"][0][0] == {"cluster_id": "a", "is_representative": True, "region": "left"}
@@ -0,0 +1,95 @@
+"""
+session_store.py 테스트 (BoundedMemorySaver 세션 수/바이트 상한, 삭제, TTL)
+
+그래프 대신 체크포인터의 put / put_writes를 직접 호출합니다.
+
+사용법:
+    cd src && python -m pytest test_session_store.py -q
+"""
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from session_store import BoundedMemorySaver
+
+
+def _put(saver, thread_id, payload="x" * 100):
+    """체크포인트 1개 저장 (채널 값 1개) → put_writes에 쓸 config"""
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": payload}
+    checkpoint["channel_versions"] = {"messages": 1}
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, checkpoint, {}, {"messages": 1})
+
+
+def test_put_and_put_writes_are_accounted():
+    saver = BoundedMemorySaver()
+    config = _put(saver, "a")
+    after_put = saver.thread_bytes("a")
+    assert after_put > 0
+
+    saver.put_writes(config, [("messages", "y" * 500)], task_id="task-1")
+    assert saver.thread_bytes("a") > after_put + 400
+    assert saver.stats()["bytes"] == saver.thread_bytes("a")
+
+
+def test_max_threads_evicts_least_recently_used():
+    evicted = []
+    saver = BoundedMemorySaver(max_threads=2, on_evict=[evicted.append])
+    _put(saver, "a")
+    _put(saver, "b")
+    saver.get_tuple({"configurable": {"thread_id": "a", "checkpoint_ns": ""}})   # a 사용 → b가 가장 오래됨
+    _put(saver, "c")
+
+    assert evicted == ["b"]
+    assert saver.has("a") and saver.has("c") and not saver.has("b")
+    assert saver.get_tuple({"configurable": {"thread_id": "b", "checkpoint_ns": ""}}) is None
+
+
+def test_max_bytes_evicts_oldest_but_not_current():
+    saver = BoundedMemorySaver()
+    _put(saver, "a", payload="x" * 400)
+    saver.max_bytes = saver.thread_bytes("a") * 2 + 100   # 세션 2개까지 들어가는 상한
+    _put(saver, "b", payload="x" * 400)
+    _put(saver, "c", payload="x" * 400)
+    assert not saver.has("a")
+    assert saver.has("b") and saver.has("c")
+    assert saver.stats()["bytes"] <= saver.max_bytes
+
+    # 세션 1개가 상한보다 커도 현재 세션은 삭제하지 않음
+    _put(saver, "d", payload="x" * saver.max_bytes)
+    assert saver.has("d") and saver.stats()["sessions"] == 1
+
+
+def test_delete_returns_freed_bytes():
+    evicted = []
+    saver = BoundedMemorySaver(on_evict=[evicted.append])
+    _put(saver, "a")
+    size = saver.thread_bytes("a")
+
+    assert saver.delete("a") == size
+    assert saver.delete("a") is None
+    assert evicted == ["a"]
+    assert saver.stats()["bytes"] == 0
+    assert saver.get_tuple({"configurable": {"thread_id": "a", "checkpoint_ns": ""}}) is None
+
+
+def test_finished_sessions_expire_first():
+    saver = BoundedMemorySaver(idle_ttl=3600, finished_ttl=0)
+    _put(saver, "done")
+    _put(saver, "open")
+    saver.mark_finished("done")
+
+    assert saver.sweep() == 1
+    assert not saver.has("done") and saver.has("open")
+
+
+def test_idle_sweep():
+    saver = BoundedMemorySaver(idle_ttl=0)
+    _put(saver, "a")
+    _put(saver, "b")
+    assert saver.sweep() == 2
+    assert saver.stats()["sessions"] == 0
@@ -0,0 +1,57 @@
+"""
+upload_store.py 테스트 (메모리 캐시 바이트 상한 / 선택 대기 세션 업로드 보호)
+
+사용법:
+    cd src && python -m pytest test_upload_store.py -q
+"""
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image
+
+from upload_store import UploadStore
+
+
+def _png(color, size=(100, 100)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_memory_cache_bounded_by_bytes(tmp_path):
+    # 100x100 RGB = 30,000 픽셀 바이트 → 2개까지 들어가는 상한
+    store = UploadStore(root=str(tmp_path), memory_cache_items=64, memory_cache_bytes=70_000)
+    paths = [store.save(_png(color)).path for color in ("red", "green", "blue")]
+
+    assert len(store._entries) == 2
+    assert store._cache_bytes <= 70_000
+    # 캐시에서 밀려난 업로드는 디스크에서 다시 읽음
+    assert store.open_image(paths[0]).size == (100, 100)
+
+
+def test_single_entry_larger_than_cap_is_kept(tmp_path):
+    store = UploadStore(root=str(tmp_path), memory_cache_bytes=1)
+    path = store.save(_png("red")).path
+    assert store.open_image(path).size == (100, 100)
+    assert len(store._entries) == 1
+
+
+def test_pinned_uploads_survive_ttl(tmp_path):
+    store = UploadStore(root=str(tmp_path), ttl_seconds=1)
+    kept = store.save(_png("red")).path
+    expired = store.save(_png("blue")).path
+    for path in (kept, expired):
+        os.utime(path, (0, 0))
+
+    store.pin("thread-1", [kept])
+    assert store.cleanup()["removed"] == 1
+    assert os.path.exists(kept) and not os.path.exists(expired)
+
+    store.unpin("thread-1")
+    assert store.cleanup()["removed"] == 1
+    assert not os.path.exists(kept)
@@ -0,0 +1,72 @@
+"""
+utils.py 테스트 (IndexCache: 인덱스 파일이 다시 저장되면 실행 중에도 다시 로드)
+
+사용법:
+    cd src && python -m pytest test_utils.py -q
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("langchain_core")
+
+from utils import IndexCache
+
+
+class _Collection:
+    def __init__(self, count):
+        self._count = count
+
+    def count(self):
+        return self._count
+
+
+def _factory(path):
+    class _Index:
+        def __init__(self):
+            self.path = path
+            self.source_count = None
+
+        def load(self):
+            if not os.path.exists(self.path):
+                return False
+            with open(self.path, encoding="utf-8") as f:
+                self.source_count = json.load(f)["source_count"]
+            return True
+
+        def build(self, collection):
+            self.source_count = collection.count()
+
+        def save(self):
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"source_count": self.source_count}, f)
+    return _Index
+
+
+def test_reloads_when_file_is_rewritten(tmp_path):
+    path = str(tmp_path / "index.json")
+    cache = IndexCache(_factory(path), "테스트 색인", check_seconds=0)
+
+    assert cache.get(_Collection(3)).source_count == 3   # 없으면 생성
+    first = cache.get(_Collection(3))
+    assert cache.get(_Collection(3)) is first             # 파일이 그대로면 같은 객체
+
+    # 다른 프로세스(ingest.refresh_indexes)가 다시 저장
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"source_count": 5}, f)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+    assert cache.get(_Collection(5)).source_count == 5
+
+
+def test_check_interval_limits_reload(tmp_path):
+    path = str(tmp_path / "index.json")
+    cache = IndexCache(_factory(path), "테스트 색인", check_seconds=3600)
+    first = cache.get(_Collection(3))
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"source_count": 5}, f)
+    assert cache.get(_Collection(5)) is first
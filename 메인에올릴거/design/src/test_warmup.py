@@ -0,0 +1,52 @@
+"""
+warmup.py 테스트 (필수 단계 재시도 / 선택 단계 건너뛰기)
+
+사용법:
+    cd src && python -m pytest test_warmup.py -q
+"""
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from warmup import Warmup
+
+
+def _flaky(failures):
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise OSError("모델 서버 연결 실패")
+    return step, calls
+
+
+def test_required_step_retries_until_success():
+    step, calls = _flaky(failures=2)
+    warmup = Warmup(retries=3, retry_seconds=0.001)
+    warmup.run([("clip", step, True)])
+
+    assert warmup.ready
+    assert len(calls) == 3
+    assert warmup.snapshot()["steps"]["clip"] == {"seconds": pytest.approx(0, abs=1), "error": None, "attempts": 3}
+
+
+def test_required_step_fails_after_retries():
+    step, calls = _flaky(failures=10)
+    warmup = Warmup(retries=2, retry_seconds=0.001)
+    warmup.run([("clip", step, True), ("chroma", lambda: None, True)])
+
+    assert warmup.status == "failed"
+    assert len(calls) == 3
+    assert "clip" in warmup.error and "chroma" not in warmup.steps
+
+
+def test_optional_step_is_not_retried():
+    step, calls = _flaky(failures=1)
+    warmup = Warmup(retries=3, retry_seconds=0.001)
+    warmup.run([("page_cache", step, False)])
+
+    assert warmup.ready
+    assert len(calls) == 1
+    assert warmup.steps["page_cache"]["error"].startswith("OSError")
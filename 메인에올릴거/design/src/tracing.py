@@ -0,0 +1,292 @@
+"""
+지연시간 계측(트레이싱) 모듈
+
+그래프 노드 / LLM·VLM 호출 / CLIP 임베딩 / Chroma 검색마다 구간(span) 시간을 재고,
+Prometheus 텍스트 형식(/metrics)으로 내보냅니다. (외부 라이브러리 없이 표준 라이브러리만 사용)
+
+- span(name): 구간 시간 측정 → 히스토그램(design_span_seconds) + 요청별 트레이스에 기록
+- traced_node(name): 그래프 노드 함수 데코레이터
+- LLMTracer: LangChain 콜백 → LLM/VLM 호출 시간, 토큰 수, 전송 바이트 기록
+- 요청 ID: api.py 미들웨어가 X-Request-ID 헤더 값(없으면 새로 발급)을 설정
+  → 요청 1건이 끝나면 span 목록을 JSON 한 줄로 출력 (TRACE_LOG=0 이면 출력 안 함)
+
+목록:
+1. Counter / Histogram / Gauge / render_metrics: 메트릭 저장 + Prometheus 텍스트 출력
+2. start_request / finish_request / get_request_id: 요청 단위 트레이스
+3. span / traced_node: 구간 측정
+4. LLMTracer / llm_tracer: LLM 호출 콜백 (기본 인스턴스)
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# ==================== 설정 ====================
+
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"    # 요청별 트레이스 JSON 출력 여부
+
+# 히스토그램 버킷 (초): 수 ms(CLIP/Chroma) ~ 수십 초(GPT-4o 리포트)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+# ==================== 메트릭 ====================
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class Counter:
+    """단조 증가 카운터"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name, self.help = name, help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    """현재값 게이지 (set/inc/dec)"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram 형식)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name, self.help = name, help_text
+        self.buckets = tuple(buckets)
+        self._values = {}   # label key → [버킷별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            data = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, data in self._values.items():
+                for bound, count in zip(self.buckets, data):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {data[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {data[-2]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {data[-1]}")
+        return lines
+
+
+def render_metrics() -> str:
+    """등록된 모든 메트릭 → Prometheus 텍스트 형식"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# 공용 메트릭
+SPAN_SECONDS = Histogram("design_span_seconds", "구간(노드/CLIP/Chroma)별 소요 시간")
+SPAN_ERRORS = Counter("design_span_errors_total", "구간별 예외 발생 수")
+HTTP_SECONDS = Histogram("design_http_request_seconds", "HTTP 요청 처리 시간")
+LLM_SECONDS = Histogram("design_llm_call_seconds", "LLM/VLM 호출 시간")
+LLM_TOKENS = Counter("design_llm_tokens_total", "LLM/VLM 토큰 사용량")
+LLM_REQUEST_BYTES = Counter("design_llm_request_bytes_total", "LLM/VLM 요청 본문 크기(바이트, 이미지 포함)")
+
+
+# ==================== 요청 단위 트레이스 ====================
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_spans = contextvars.ContextVar("spans", default=None)
+
+
+def start_request(request_id=None):
+    """요청 시작: 요청 ID 설정 + span 목록 초기화 (api.py 미들웨어에서 호출)"""
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    _spans.set([])
+    return request_id
+
+
+def get_request_id():
+    """현재 요청 ID (요청 밖이면 None)"""
+    return _request_id.get()
+
+
+def finish_request(**fields):
+    """요청 종료: span 목록을 JSON 한 줄로 출력"""
+    spans = _spans.get() or []
+    if TRACE_LOG:
+        record = {"request_id": _request_id.get(), **fields, "spans": spans}
+        print(json.dumps(record, ensure_ascii=False))
+    return spans
+
+
+def _record_span(name, seconds, attrs, error=None):
+    SPAN_SECONDS.observe(seconds, span=name)
+    if error is not None:
+        SPAN_ERRORS.inc(span=name, error=type(error).__name__)
+    spans = _spans.get()
+    if spans is not None:
+        entry = {"name": name, "ms": round(seconds * 1000, 2), **attrs}
+        if error is not None:
+            entry["error"] = type(error).__name__
+        spans.append(entry)
+
+
+# ==================== 구간 측정 ====================
+
+@contextmanager
+def span(name, **attrs):
+    """
+    구간 시간 측정
+
+    사용 예:
+        with span("chroma.query", n_results=10) as s:
+            results = collection.query(...)
+            s["results"] = len(results["ids"][0])   # 측정 후 속성 추가 가능
+    """
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        _record_span(name, time.perf_counter() - start, attrs, error=e)
+        raise
+    _record_span(name, time.perf_counter() - start, attrs)
+
+
+def traced_node(name):
+    """그래프 노드 데코레이터: 노드 실행 시간을 node.{name} span으로 기록"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(f"node.{name}"):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================== LLM 호출 콜백 ====================
+
+def _message_bytes(messages):
+    """LangChain 메시지 목록의 본문 크기(바이트) 추정 (이미지 data URL 포함)"""
+    total = 0
+    for message in messages:
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            total += len(content.encode("utf-8"))
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict):
+                    if part.get("type") == "image_url":
+                        total += len(part.get("image_url", {}).get("url", ""))
+                    else:
+                        total += len(str(part.get("text", "")).encode("utf-8"))
+    return total
+
+
+class LLMTracer(BaseCallbackHandler):
+    """
+    LangChain 콜백: LLM/VLM 호출 1건마다 시간/토큰/전송 바이트 기록
+
+    사용: ChatOpenAI(..., callbacks=[LLMTracer()])
+    """
+
+    def __init__(self):
+        self._starts = {}   # run_id → (시작 시각, 모델명, 전송 바이트)
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        sent = sum(_message_bytes(batch) for batch in messages)
+        with self._lock:
+            self._starts[run_id] = (time.perf_counter(), model, sent)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, None, error)
+
+    def _finish(self, run_id, response, error=None):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        start, model, sent = started
+        seconds = time.perf_counter() - start
+
+        usage = ((response.llm_output or {}).get("token_usage") or {}) if response is not None else {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+
+        LLM_SECONDS.observe(seconds, model=model)
+        LLM_REQUEST_BYTES.inc(sent, model=model)
+        LLM_TOKENS.inc(prompt_tokens, model=model, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, model=model, type="completion")
+        _record_span("llm.call", seconds, {
+            "model": model,
+            "bytes_sent": sent,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }, error=error)
+
+
+# 기본 LLM 콜백 (design_chatbot.py, utils.py의 ChatOpenAI 공용)
+llm_tracer = LLMTracer()
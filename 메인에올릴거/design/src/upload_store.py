@@ -0,0 +1,295 @@
+"""
+업로드 이미지 저장소 모듈
+
+사용자가 업로드한 이미지를 내용 해시(sha256) 기반으로 저장하고,
+한 번 읽은 이미지는 메모리에 보관해 그래프의 여러 노드가 공유합니다.
+
+- 내용 주소 저장: temp_uploads/{sha256}.{ext}
+  → 같은 이미지는 한 번만 저장, 파일명이 같은 다른 이미지끼리 덮어쓰지 않음
+- 원자적 쓰기: 임시 파일에 쓴 뒤 os.replace (쓰는 도중의 파일을 다른 요청이 읽지 않음)
+- 크기 제한: 업로드 1건 최대 바이트 + 디코딩 후 최대 픽셀 수
+- 메모리 캐시: (원본 bytes, 디코딩된 PIL 이미지)를 LRU로 보관 → 업로드 1건당 디스크/디코딩 1회
+  개수(UPLOAD_MEMORY_CACHE_ITEMS) + 바이트(원본 + 디코딩 픽셀, UPLOAD_MEMORY_CACHE_BYTES) 상한
+- 청소(janitor): 백그라운드 스레드가 TTL 만료 파일 삭제 + 전체 용량 초과 시 오래된 파일부터 삭제
+  (선택 대기(interrupt) 중인 세션이 pin한 업로드는 삭제하지 않음 → 세션이 삭제되면 unpin)
+
+목록:
+1. UploadTooLargeError / InvalidImageError: 업로드 거부 사유
+2. StoredUpload: 저장된 업로드 정보
+3. UploadStore: 저장/조회/청소
+4. upload_store: 기본 저장소 인스턴스 (api.py, design_chatbot.py 공용)
+"""
+
+import io
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from PIL import Image
+
+
+# ==================== 설정 ====================
+
+# ./temp_uploads : 사용자가 업로드한 이미지를 임시 저장하는 폴더 (api.py 실행 위치 기준)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./temp_uploads")
+
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))        # 업로드 1건 20MB
+MAX_IMAGE_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(40_000_000)))              # 디코딩 후 4천만 픽셀
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", str(6 * 3600)))              # 6시간 후 삭제
+MAX_TOTAL_BYTES = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", str(2 * 1024 * 1024 * 1024)))  # 디스크 최대 2GB
+MEMORY_CACHE_ITEMS = int(os.getenv("UPLOAD_MEMORY_CACHE_ITEMS", "64"))                # 메모리 캐시 개수
+MEMORY_CACHE_BYTES = int(os.getenv("UPLOAD_MEMORY_CACHE_BYTES", str(512 * 1024 * 1024)))  # 메모리 캐시 512MB (원본 + 픽셀)
+JANITOR_INTERVAL_SECONDS = int(os.getenv("UPLOAD_JANITOR_INTERVAL_SECONDS", "300"))   # 5분마다 청소
+
+# PIL 포맷 → 저장 확장자
+_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "BMP": ".bmp", "TIFF": ".tif", "WEBP": ".webp"}
+
+
+# ==================== 예외 ====================
+
+class UploadTooLargeError(ValueError):
+    """업로드 크기(바이트/픽셀) 제한 초과"""
+
+
+class InvalidImageError(ValueError):
+    """이미지로 디코딩할 수 없는 업로드"""
+
+
+# ==================== 저장된 업로드 ====================
+
+@dataclass
+class StoredUpload:
+    """저장된 업로드 1건"""
+    sha256: str       # 내용 해시 (파일명, 캐시 키)
+    path: str         # 디스크 경로 (그래프 state의 image_path로 전달)
+    size: int         # 바이트 수
+    format: str       # PIL 포맷 (JPEG, PNG, ...)
+    deduplicated: bool  # 이미 같은 내용이 저장되어 있었는지 여부
+
+
+# ==================== 업로드 저장소 ====================
+
+class UploadStore:
+    """내용 해시 기반 업로드 저장소 + 메모리 캐시 + 청소 스레드"""
+
+    def __init__(self, root=UPLOAD_DIR, max_upload_bytes=MAX_UPLOAD_BYTES,
+                 ttl_seconds=UPLOAD_TTL_SECONDS, max_total_bytes=MAX_TOTAL_BYTES,
+                 memory_cache_items=MEMORY_CACHE_ITEMS, memory_cache_bytes=MEMORY_CACHE_BYTES):
+        self.root = root
+        self.max_upload_bytes = max_upload_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = max_total_bytes
+        self.memory_cache_items = memory_cache_items
+        self.memory_cache_bytes = memory_cache_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # sha256 → {"bytes": ..., "image": PIL.Image, "size": ...}
+        self._cache_bytes = 0
+        self._path_index = {}           # 절대경로 → sha256
+        self._pinned = {}               # thread_id → {절대경로, ...} (청소 제외)
+        self._janitor = None
+        self._stop = threading.Event()
+
+        os.makedirs(self.root, exist_ok=True)
+
+    # ----- 저장 -----
+
+    def save(self, contents: bytes) -> StoredUpload:
+        """
+        업로드 bytes 검증 후 내용 해시 경로에 저장
+
+        Raises:
+            UploadTooLargeError: 크기 제한 초과
+            InvalidImageError: 이미지가 아님
+        """
+        image = self.validate(contents)
+        sha = hashlib.sha256(contents).hexdigest()
+        ext = _EXTENSIONS.get(image.format, ".img")
+        path = os.path.join(self.root, f"{sha}{ext}")
+
+        deduplicated = os.path.exists(path)
+        if deduplicated:
+            os.utime(path)  # 재업로드 시 TTL 연장
+        else:
+            # 임시 파일에 쓴 뒤 교체 → 쓰는 도중의 파일이 노출되지 않음
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(contents)
+            os.replace(tmp_path, path)
+
+        self._remember(sha, path, contents, image)
+        return StoredUpload(sha256=sha, path=path, size=len(contents),
+                            format=image.format or "", deduplicated=deduplicated)
+
+    def validate(self, contents: bytes):
+        """
+        업로드 bytes 크기/이미지 검증만 수행 (저장하지 않음, bulk_jobs.py처럼 저장 위치가 다른 경우)
+
+        Returns:
+            PIL 이미지 (디코딩 완료)
+
+        Raises:
+            UploadTooLargeError: 크기 제한 초과
+            InvalidImageError: 이미지가 아님
+        """
+        if len(contents) > self.max_upload_bytes:
+            raise UploadTooLargeError(
+                f"이미지 크기가 너무 큽니다. (최대 {self.max_upload_bytes // (1024 * 1024)}MB)"
+            )
+        return self._decode(contents)
+
+    def _decode(self, contents: bytes):
+        """bytes → PIL 이미지 (픽셀 수 제한 확인 후 실제 디코딩까지 1회 수행)"""
+        try:
+            image = Image.open(io.BytesIO(contents))
+            if image.width * image.height > MAX_IMAGE_PIXELS:
+                raise UploadTooLargeError("이미지 해상도가 너무 큽니다.")
+            image.load()
+        except UploadTooLargeError:
+            raise
+        except Exception:
+            raise InvalidImageError("유효하지 않은 이미지입니다.")
+        return image
+
+    # ----- 조회 (노드 공용) -----
+
+    def load(self, path):
+        """
+        이미지 경로 → (원본 bytes, sha256)
+
+        저장소에 있는 업로드는 메모리 캐시에서 반환하고,
+        그 외 경로(run_chatbot 로컬 실행 등)는 1회 읽어 캐시한다.
+        """
+        entry = self._lookup(path)
+        return entry["bytes"], entry["sha256"]
+
+    def open_image(self, path):
+        """이미지 경로 → 디코딩된 PIL 이미지 (캐시 공유, 재디코딩 없음)"""
+        return self._lookup(path)["image"]
+
+    def _lookup(self, path):
+        key = os.path.abspath(path)
+        with self._lock:
+            sha = self._path_index.get(key)
+            entry = self._entries.get(sha) if sha else None
+            if entry is not None:
+                self._entries.move_to_end(sha)
+                return entry
+
+        # 캐시 미스: 디스크에서 1회 읽고 디코딩
+        with open(path, "rb") as f:
+            contents = f.read()
+        image = Image.open(io.BytesIO(contents))
+        image.load()
+        sha = hashlib.sha256(contents).hexdigest()
+        return self._remember(sha, path, contents, image)
+
+    def _remember(self, sha, path, contents, image):
+        # 원본 bytes + 디코딩된 픽셀 (RGB 4천만 픽셀이면 약 120MB)
+        size = len(contents) + image.width * image.height * len(image.getbands())
+        entry = {"sha256": sha, "bytes": contents, "image": image, "size": size}
+        with self._lock:
+            old = self._entries.pop(sha, None)
+            if old is not None:
+                self._cache_bytes -= old["size"]
+            self._entries[sha] = entry
+            self._cache_bytes += size
+            self._path_index[os.path.abspath(path)] = sha
+            # 개수/바이트 상한 초과 시 오래된 항목부터 삭제 (방금 넣은 항목은 남김 → 호출자가 사용)
+            while len(self._entries) > 1 and (len(self._entries) > self.memory_cache_items
+                                              or self._cache_bytes > self.memory_cache_bytes):
+                old_sha, old = self._entries.popitem(last=False)
+                self._cache_bytes -= old["size"]
+                self._path_index = {p: s for p, s in self._path_index.items() if s != old_sha}
+        return entry
+
+    # ----- 세션 보호 -----
+
+    def pin(self, thread_id, paths):
+        """세션이 쓰는 업로드를 청소 대상에서 제외 (선택 대기 중 TTL이 지나도 유지)"""
+        with self._lock:
+            self._pinned[thread_id] = {os.path.abspath(path) for path in paths if path}
+
+    def unpin(self, thread_id):
+        """세션 삭제 시 호출 (session_store on_evict) → 이후 TTL/용량 기준으로 청소"""
+        with self._lock:
+            self._pinned.pop(thread_id, None)
+
+    # ----- 청소 -----
+
+    def cleanup(self):
+        """
+        TTL 만료 파일 삭제 후, 전체 용량이 제한을 넘으면 오래된 파일부터 삭제
+
+        Returns:
+            dict: {"removed": 삭제 파일 수, "freed_bytes": 확보 바이트, "total_bytes": 남은 용량}
+        """
+        now = time.time()
+        with self._lock:
+            pinned = set().union(*self._pinned.values())
+        files = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if os.path.isfile(path) and os.path.abspath(path) not in pinned:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        files.sort()  # 오래된 순
+        total = sum(size for _, size, _ in files)
+        removed, freed = 0, 0
+        for mtime, size, path in files:
+            expired = self.ttl_seconds and now - mtime > self.ttl_seconds
+            if not expired and total <= self.max_total_bytes:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._forget(path)
+            total -= size
+            removed += 1
+            freed += size
+
+        return {"removed": removed, "freed_bytes": freed, "total_bytes": total}
+
+    def _forget(self, path):
+        key = os.path.abspath(path)
+        with self._lock:
+            sha = self._path_index.pop(key, None)
+            entry = self._entries.pop(sha, None) if sha else None
+            if entry is not None:
+                self._cache_bytes -= entry["size"]
+
+    def start_janitor(self, interval=JANITOR_INTERVAL_SECONDS):
+        """백그라운드 청소 스레드 시작 (이미 실행 중이면 무시)"""
+        if self._janitor and self._janitor.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    result = self.cleanup()
+                    if result["removed"]:
+                        print(f"[업로드 청소] {result['removed']}개 파일 삭제 "
+                              f"({result['freed_bytes'] / 1024 / 1024:.1f}MB 확보)")
+                except Exception as e:
+                    print(f"[업로드 청소] 실패: {e}")
+
+        self._janitor = threading.Thread(target=run, name="upload-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        """백그라운드 청소 스레드 중지"""
+        self._stop.set()
+
+
+# 기본 저장소 (api.py 업로드 저장 + design_chatbot.py 노드 조회 공용)
+upload_store = UploadStore()
@@ -4,25 +4,66 @@
 디자인 분석에 필요한 헬퍼 함수들을 제공합니다.
 
 목록:
-1. get_image_embedding: 이미지 파일 -> CLIP 임베딩 벡터 반환
+1. get_image_embedding: 이미지 파일(또는 PIL 이미지) -> CLIP 임베딩 벡터 반환
+   get_image_embeddings: 여러 이미지 -> CLIP 임베딩 벡터 목록 (한 번의 배치 forward)
 2. get_text_embedding: 텍스트 -> CLIP 임베딩 벡터 반환 (텍스트로 이미지 검색 가능!)
+   encode_text: 영문 텍스트 -> CLIP 임베딩 (번역 없음)
 3. design_id_to_local_image : ChromaDB design_id를 로컬 이미지 경로로 변환
   (ChromaDB에서 유사 도면 벡터를 찾고, 해당 도면의 로컬 이미지를 불러올 때 사용)
+  (이미지 매니페스트를 먼저 조회하고, 없을 때만 파일 존재 확인)
 4. search_and_filter_similar_designs: 벡터DB에서 유사 디자인 검색 후 필터링
+   search_similar_designs_batch: 여러 입력 이미지를 다중 질의 1회로 검색 후 이미지별 필터링
+5. get_design_image_bytes / get_design_thumbnail_bytes: design_id → 이미지 bytes
+  (이미지 샤드가 있으면 mmap에서, 없으면 로컬 이미지 파일에서)
+6. search_multi_view: 한 제품의 여러 도면으로 한 번에 검색 후 출원번호별 점수 합산
+   fuse_results: 여러 검색 결과 목록을 출원번호 단위로 합산 (RRF / 최소 거리)
+7. iter_collection: 컬렉션 전체를 페이지 단위로 조회 (색인/배치 모듈 공통)
+   load_or_build_index: 저장된 인덱스 로드, 없거나 컬렉션이 바뀌었으면 다시 생성
+   IndexCache: 프로세스 기본 인덱스 (파일이 다시 저장되면 실행 중에도 다시 로드)
+   DATA_DIR / CHROMA_DIR / METADATA_SKIP_FIELDS: 모듈 공통 기본 경로 / 내부 메타데이터 필드
 
 """
 
 import os
-import clip
-import torch
+import time
+import threading
 from pathlib import Path
 from PIL import Image
 
 
+# ==================== 공통 경로 ====================
+# utils.py 기준 상대 경로 (data/, chroma_db/를 쓰는 모듈은 여기서 기본 경로를 가져감)
+# image_manifest / image_shards도 여기서 가져가므로 아래 모듈 import보다 먼저 정의
+_BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DATA_DIR = os.path.join(_BASE_DIR, "data")
+CHROMA_DIR = os.path.join(_BASE_DIR, "chroma_db")
+
+# image_manifest / image_shards는 모듈 단위로 import (서로 import하므로 함수는 호출 시점에 참조)
+import image_manifest
+import image_shards
+from tracing import span, llm_tracer
+from model_server import MODEL_SERVER_SOCKET, get_client
+from llm_policy import call_llm, LLM_REQUEST_TIMEOUT
+
+
 # ==================== 전역 변수 ====================
-# CLIP 모델 로드 (ViT-B/32)
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model, preprocess = clip.load("ViT-B/32", device=device)
+# CLIP 모델 (ViT-B/32): 첫 사용 시 로드
+# MODEL_SERVER_SOCKET이 설정된 워커는 로드하지 않고 모델 서버(model_server.py)에 요청
+device = "remote" if MODEL_SERVER_SOCKET else None
+model, preprocess = None, None
+_model_lock = threading.Lock()
+
+
+def load_clip():
+    """CLIP 모델 로드 (프로세스당 1회) → (model, preprocess)"""
+    global model, preprocess, device
+    with _model_lock:
+        if model is None:
+            import clip
+            import torch
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            model, preprocess = clip.load("ViT-B/32", device=device)
+    return model, preprocess
 
 
 # ==================== 이미지 임베딩 함수 ====================
@@ -33,22 +74,60 @@ def get_image_embedding(image_path):
     
     Args:
         image_path: 분석할 이미지 파일 경로
+                    (이미 디코딩된 PIL 이미지도 허용 → 파일을 다시 열지 않음)
     
     Returns:
         list: CLIP 임베딩 벡터 (512차원)
         None: 에러 발생 시
     """
+    if MODEL_SERVER_SOCKET:
+        embeddings = get_image_embeddings([image_path])
+        return embeddings[0] if embeddings else None
+
     try:
-        image = preprocess(Image.open(image_path)).unsqueeze(0).to(device)
-        with torch.no_grad():
-            embedding = model.encode_image(image)  # 이미지 임베딩
-            embedding = embedding.cpu().numpy()[0].tolist() 
+        import torch
+        model, preprocess = load_clip()
+        with span("clip.image", device=device):
+            pil_image = image_path if isinstance(image_path, Image.Image) else Image.open(image_path)
+            image = preprocess(pil_image).unsqueeze(0).to(device)
+            with torch.no_grad():
+                embedding = model.encode_image(image)  # 이미지 임베딩
+                embedding = embedding.cpu().numpy()[0].tolist() 
         return embedding
     except Exception as e:
         print(f"임베딩 생성 실패: {e}")
         return None
 
 
+def get_image_embeddings(images):
+    """
+    여러 이미지 -> CLIP 임베딩 벡터 목록 (한 번의 배치 forward)
+
+    Args:
+        images: 이미지 파일 경로 또는 PIL 이미지 목록
+
+    Returns:
+        list: CLIP 임베딩 벡터 목록 (입력 순서 유지)
+        None: 에러 발생 시
+    """
+    try:
+        with span("clip.image_batch", device=device, batch=len(images)):
+            pil_images = [img if isinstance(img, Image.Image) else Image.open(img) for img in images]
+            if MODEL_SERVER_SOCKET:
+                return get_client().embed_images(pil_images)
+
+            import torch
+            model, preprocess = load_clip()
+            batch = torch.stack([preprocess(img) for img in pil_images]).to(device)
+            with torch.no_grad():
+                embeddings = model.encode_image(batch)
+                embeddings = embeddings.cpu().numpy().tolist()
+        return embeddings
+    except Exception as e:
+        print(f"임베딩 생성 실패: {e}")
+        return None
+
+
 # ==================== 텍스트 임베딩 함수 ====================
 
 def get_text_embedding(text, translate_korean=True) -> tuple[list, str]:
@@ -78,22 +157,17 @@ def get_text_embedding(text, translate_korean=True) -> tuple[list, str]:
         if translate_korean and any('\uac00' <= char <= '\ud7a3' for char in text):
             from langchain_openai import ChatOpenAI
             print(f"   한글 감지: '{text}' → 영어로 번역 중...")
-            llm_translator = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+            llm_translator = ChatOpenAI(model="gpt-4o-mini", temperature=0, callbacks=[llm_tracer],
+                                        timeout=LLM_REQUEST_TIMEOUT, max_retries=0)
             translation_prompt = f"""다음 한글을 간단명료한 영어로 번역하세요. 
 디자인/제품 검색용이므로 핵심 키워드만 간단히.
 
 한글: {text}
 영어:"""
-            query_text = llm_translator.invoke(translation_prompt).content.strip()
+            query_text = call_llm("translate", llm_translator.invoke, translation_prompt).content.strip()
             print(f"   ✅ 번역 완료: '{query_text}'")
         
-        # 텍스트를 토큰화
-        text_tokens = clip.tokenize([query_text]).to(device)
-        with torch.no_grad():
-            # CLIP 텍스트 인코더로 임베딩
-            text_embedding = model.encode_text(text_tokens)
-            embedding = text_embedding.cpu().numpy()[0].tolist()
-        
+        embedding = encode_text(query_text)
         return embedding, query_text
         
     except Exception as e:
@@ -101,16 +175,36 @@ def get_text_embedding(text, translate_korean=True) -> tuple[list, str]:
         return None, text
 
 
+def encode_text(query_text):
+    """영문 텍스트 -> CLIP 텍스트 임베딩 벡터 (번역 없음, 모델 서버 모드면 서버에서 계산)"""
+    with span("clip.text", device=device):
+        if MODEL_SERVER_SOCKET:
+            return get_client().encode_text(query_text)
+
+        import clip
+        import torch
+        model, _ = load_clip()
+        # 텍스트를 토큰화
+        text_tokens = clip.tokenize([query_text]).to(device)
+        with torch.no_grad():
+            # CLIP 텍스트 인코더로 임베딩
+            text_embedding = model.encode_text(text_tokens)
+            return text_embedding.cpu().numpy()[0].tolist()
+
+
 # ==================== 이미지 경로 변환 함수 ====================
 
 # utils.py 기준 상대 경로로 이미지 디렉토리 설정
-_DEFAULT_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "images")
+_DEFAULT_IMAGES_DIR = os.path.join(DATA_DIR, "images")
 
 
 def design_id_to_local_image(design_id, images_dir=None):
     """
     ChromaDB design_id를 로컬 이미지 경로로 변환
 
+    기본 이미지 폴더는 매니페스트(image_manifest.py)에서 O(1)로 조회하고,
+    매니페스트에 없는 경우에만 파일명을 조립해 존재 여부를 확인한다.
+
     Args:
         design_id: ChromaDB의 디자인 ID
                    예: "3020250000208-09-01-0-IMG-0"
@@ -120,30 +214,83 @@ def design_id_to_local_image(design_id, images_dir=None):
         str: 로컬 이미지 파일 경로
         None: 파일이 존재하지 않을 경우
     """
+    manifest = None
     if images_dir is None:
         images_dir = _DEFAULT_IMAGES_DIR
 
-    # IMG 부분 제거
-    parts = design_id.split('-IMG-')
-    if len(parts) == 2:
-        prefix = parts[0]      # 3020250000208-09-01-0
-        image_num = parts[1]   # 0
+        # 매니페스트 조회 (syscall 없음)
+        manifest = image_manifest.get_manifest()
+        path = manifest.path(design_id)
+        if path:
+            return path
+
+    # 매니페스트에 없으면 파일명 생성 후 존재 확인
+    # 예: 3020250000208-09-01-0-IMG-0 → 3020250000208-09-01-0_000.jpg
+    filename = image_manifest.design_id_to_filename(design_id)
+    if filename is None:
+        return None
+
+    local_path = os.path.join(images_dir, filename)
+    if not os.path.exists(local_path):
+        return None
+
+    if manifest is not None:
+        manifest.remember(design_id, local_path)  # 다음 조회부터는 매니페스트에서 바로 반환
+    return local_path
+
+
+# ==================== 이미지 bytes 조회 함수 ====================
 
-        # 3자리 숫자로 변환
-        image_num_padded = image_num.zfill(3)  # 000
+def get_design_image_bytes(design_id):
+    """
+    design_id → 원본 이미지 bytes
+
+    이미지 샤드(image_shards.py)가 있으면 mmap 슬라이스를 복사 없이 반환하고,
+    없으면 design_id_to_local_image 경로의 파일을 읽는다.
+
+    Returns:
+        bytes | memoryview: 원본 JPEG bytes
+        None: 이미지가 없을 경우
+    """
+    shards = image_shards.get_shard_store()
+    if shards is not None:
+        data = shards.get(design_id)
+        if data is not None:
+            return data
+
+    path = design_id_to_local_image(design_id)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
 
-        # 파일명 생성
-        filename = f"{prefix}_{image_num_padded}.jpg"
-        local_path = os.path.join(images_dir, filename)
 
-        return local_path if os.path.exists(local_path) else None
+def get_design_thumbnail_bytes(design_id):
+    """
+    design_id → 썸네일 bytes (샤드 또는 매니페스트 썸네일, 없으면 None)
+    """
+    shards = image_shards.get_shard_store()
+    if shards is not None:
+        data = shards.get_thumbnail(design_id)
+        if data is not None:
+            return data
 
+    entry = image_manifest.get_manifest().get(design_id)
+    if entry and entry.get("thumbnail"):
+        try:
+            with open(entry["thumbnail"], "rb") as f:
+                return f.read()
+        except OSError:
+            return None
     return None
 
 
 # ==================== 벡터 검색 및 필터링 함수 ====================
 
-def search_and_filter_similar_designs(image_collection, query_embedding, n_results=10):
+def search_and_filter_similar_designs(image_collection, query_embedding, n_results=10, where=None):
     """
     벡터DB에서 유사 디자인 검색 후 필터링
     
@@ -155,6 +302,7 @@ def search_and_filter_similar_designs(image_collection, query_embedding, n_resul
         image_collection: ChromaDB 컬렉션
         query_embedding: 입력 이미지의 CLIP 임베딩 벡터
         n_results: 검색할 결과 개수 (기본값: 10)
+        where: 메타데이터 필터 (예: 대표 도면만 검색 → dedup_index.representatives_filter)
     
     Returns:
         dict: 필터링된 검색 결과
@@ -165,17 +313,41 @@ def search_and_filter_similar_designs(image_collection, query_embedding, n_resul
             }
     """
     # 벡터DB에서 상위 N개 유사 도면 검색
-    results = image_collection.query(
-        query_embeddings=[query_embedding],
-        n_results=n_results
-    )
+    with span("chroma.query", n_results=n_results):
+        results = image_collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where
+        )
     
-    # 필터링: 같은 출원번호 중 가장 유사도 거리가 짧은 것만 유지
+    return _filter_by_application(results["ids"][0], results["distances"][0], results["metadatas"][0])
+
+
+def search_similar_designs_batch(image_collection, query_embeddings, n_results=10, where=None):
+    """
+    여러 입력 이미지 → 벡터DB 다중 질의 1회 → 이미지별 필터링된 검색 결과 (일괄 검토용)
+
+    search_and_filter_similar_designs를 이미지마다 호출하는 것과 결과는 같고, Chroma 호출만 1회
+
+    Returns:
+        list: 이미지별 검색 결과 (search_and_filter_similar_designs와 같은 형식, 입력 순서 유지)
+    """
+    with span("chroma.query", n_results=n_results, queries=len(query_embeddings)):
+        results = image_collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=n_results,
+            where=where
+        )
+    return [
+        _filter_by_application(ids, distances, metadatas)
+        for ids, distances, metadatas in zip(results["ids"], results["distances"], results["metadatas"])
+    ]
+
+
+def _filter_by_application(ids, distances, metadatas):
+    """검색 결과 1건 → 같은 출원번호 중 가장 유사도 거리가 짧은 것만 유지"""
     filtered_data = {}
-    for i in range(len(results["ids"][0])):
-        design_id = results["ids"][0][i]
-        distance = results["distances"][0][i]
-        metadata = results["metadatas"][0][i]
+    for design_id, distance, metadata in zip(ids, distances, metadatas):
         app_number = metadata.get('applicationNumber', 'N/A')
         
         # 같은 출원번호 중 가장 거리가 짧은 것만 유지
@@ -194,3 +366,174 @@ def search_and_filter_similar_designs(image_collection, query_embedding, n_resul
     }
     
     return filtered_results
+
+
+# ==================== 다중 도면 검색 함수 ====================
+
+def search_multi_view(image_collection, query_embeddings, n_results=10, fusion="rrf", rrf_k=60, fetch_k=None,
+                      where=None):
+    """
+    한 제품의 여러 도면(정면/측면/평면 등)으로 한 번에 검색 후 출원번호별로 합산
+
+    모든 도면을 한 번의 query 호출(다중 질의)로 검색하고,
+    도면별 결과를 출원번호 단위로 합쳐 순위를 매긴다. (합산 규칙은 fuse_results 참고)
+
+    Args:
+        image_collection: ChromaDB 컬렉션
+        query_embeddings: 도면별 CLIP 임베딩 벡터 목록
+        n_results: 반환할 출원 수
+        fusion: "rrf" | "max"
+        rrf_k: RRF 상수 (기본값: 60)
+        fetch_k: 도면별 검색 개수 (기본값: n_results * 2)
+        where: 메타데이터 필터 (예: 대표 도면만 검색 → dedup_index.representatives_filter)
+
+    Returns:
+        dict: search_and_filter_similar_designs와 같은 형식
+              (출원번호별 대표 도면 = 가장 거리가 짧은 도면, 합산 점수 순 정렬)
+    """
+    if fusion not in ("rrf", "max"):
+        raise ValueError(f"지원하지 않는 합산 방식: {fusion}")
+
+    fetch_k = fetch_k or n_results * 2
+    with span("chroma.query", n_results=fetch_k, views=len(query_embeddings)):
+        results = image_collection.query(
+            query_embeddings=query_embeddings,
+            n_results=fetch_k,
+            where=where
+        )
+    return fuse_results(results, n_results=n_results, fusion=fusion, rrf_k=rrf_k)
+
+
+def fuse_results(results, n_results=10, fusion="rrf", rrf_k=60):
+    """
+    여러 검색 결과 목록(다중 질의 결과 형식)을 출원번호 단위로 합산
+
+    합산 방식:
+    - "max": 출원번호별로 가장 가까운(거리가 짧은) 도면 결과를 점수로 사용
+    - "rrf": Reciprocal Rank Fusion. 목록별 순위 r에 대해 1/(rrf_k + r)을 합산
+             → 여러 목록에서 고르게 상위에 오른 출원이 유리
+               (거리 척도가 서로 다른 검색 방식끼리 합칠 때도 사용 가능)
+
+    Args:
+        results: {'ids': [[...], [...]], 'distances': [[...], ...], 'metadatas': [[...], ...]}
+                 (목록마다 거리 오름차순)
+        n_results: 반환할 출원 수
+
+    Returns:
+        dict: search_and_filter_similar_designs와 같은 형식 (합산 점수 순 정렬)
+    """
+    fused = {}  # 출원번호 → {'id', 'distance', 'metadata', 'score'}
+    for view in range(len(results["ids"])):
+        seen = set()
+        rank = 0
+        for design_id, distance, metadata in zip(
+            results["ids"][view], results["distances"][view], results["metadatas"][view]
+        ):
+            app_number = metadata.get('applicationNumber', 'N/A')
+            if app_number in seen:
+                continue  # 목록별로도 같은 출원번호는 최상위 1개만 순위에 반영
+            seen.add(app_number)
+            rank += 1
+
+            item = fused.setdefault(app_number, {'id': design_id, 'distance': distance,
+                                                 'metadata': metadata, 'score': 0.0})
+            if distance < item['distance']:
+                item.update(id=design_id, distance=distance, metadata=metadata)
+
+            if fusion == "rrf":
+                item['score'] += 1.0 / (rrf_k + rank)
+            else:
+                item['score'] = -item['distance']  # 가장 가까운 도면의 거리
+
+    ranked = sorted(fused.values(), key=lambda item: item['score'], reverse=True)[:n_results]
+    return {
+        'ids': [[item['id'] for item in ranked]],
+        'distances': [[item['distance'] for item in ranked]],
+        'metadatas': [[item['metadata'] for item in ranked]]
+    }
+
+
+# ==================== 컬렉션 순회 / 인덱스 로드 ====================
+
+# 검색 텍스트/조회 결과에 포함하지 않는 메타데이터 키 (영역 인덱스, 중복 클러스터링 등에서 추가한 내부 필드)
+METADATA_SKIP_FIELDS = frozenset({"design_id", "region", "cluster_id", "is_representative", "cluster_size"})
+_CHROMA_GET_PAGE = 5000
+
+
+def iter_collection(collection, include, page_size=_CHROMA_GET_PAGE):
+    """
+    컬렉션 전체를 page_size개씩 조회
+
+    Args:
+        include: collection.get의 include (예: ["metadatas"], ID만 필요하면 [])
+
+    Yields:
+        dict: collection.get 결과 페이지 ({"ids": [...], "metadatas": [...], ...})
+    """
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            return
+        yield page
+        offset += len(page["ids"])
+
+
+def load_or_build_index(index, collection, label):
+    """
+    저장된 인덱스(load/build/save/source_count를 가진 객체) 로드
+
+    저장된 인덱스가 없거나 컬렉션 도면 수가 달라졌으면 다시 생성해 저장한다.
+    (lexical_index.get_lexical_index, design_lookup.get_design_lookup 공통)
+    """
+    count = collection.count()
+    if not index.load() or index.source_count != count:
+        print(f"{label} 생성 중: {count}개 도면")
+        index.build(collection)
+        index.save()
+    return index
+
+
+INDEX_RELOAD_CHECK_SECONDS = 10   # 인덱스 파일 변경(mtime) 확인 간격
+
+
+class IndexCache:
+    """
+    프로세스 기본 인덱스 (lexical_index / design_lookup 공통)
+
+    첫 조회 시 load_or_build_index로 로드하고, 이후에는 INDEX_RELOAD_CHECK_SECONDS마다
+    파일 mtime을 확인해 바뀌었으면 다시 로드 → ingest.refresh_indexes가 다른 프로세스에서
+    색인을 다시 저장해도 실행 중인 API 워커가 재시작 없이 반영
+    """
+
+    def __init__(self, factory, label, check_seconds=INDEX_RELOAD_CHECK_SECONDS):
+        self.factory = factory   # () → 빈 인덱스 (load/build/save/source_count/path)
+        self.label = label
+        self.check_seconds = check_seconds
+        self._index = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, collection):
+        with self._lock:
+            now = time.monotonic()
+            if self._index is None:
+                self._index = load_or_build_index(self.factory(), collection, self.label)
+                self._mtime, self._checked_at = self._file_mtime(self._index.path), now
+            elif now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                mtime = self._file_mtime(self._index.path)
+                if mtime is not None and mtime != self._mtime:
+                    index = self.factory()
+                    if index.load():
+                        print(f"{self.label} 다시 로드: {index.source_count}개 도면")
+                        self._index, self._mtime = index, mtime
+            return self._index
@@ -0,0 +1,224 @@
+"""
+서버 시작 워밍업 + 준비 상태(readiness) 모듈
+
+배포 직후 첫 /chat/image 요청은 CLIP 첫 forward(모델 로드, 커널 초기화), Chroma HNSW 인덱스 지연 로드,
+비어 있는 페이지 캐시(chroma.sqlite3, 인덱스 파일)를 모두 떠안는데, /health는 바로 "healthy"를 반환합니다.
+→ 서버가 뜨면 백그라운드 스레드에서 실제 요청 경로를 한 번씩 미리 실행하고,
+  모두 끝난 뒤에만 /ready가 200을 반환 (로드밸런서는 /ready로 트래픽 투입 여부 판단, /health는 생존 확인용 그대로)
+
+워밍업 단계 (순서대로):
+1. manifest / lexical / lookup: 이미지 매니페스트, 키워드 색인, 출원번호 인덱스 로드
+2. clip: 빈 이미지 배치 임베딩 (모델 로드 + 첫 forward, 멀티 워커면 모델 서버 연결)
+3. chroma: 실제 검색 함수로 질의 1회 (HNSW 인덱스 로드, 대표 도면 필터 포함)
+4. preprocess: VLM 전송용 JPEG 인코딩 1회
+5. page_cache (선택): chroma_db 파일 순차 읽기 → OS 페이지 캐시 적재
+6. thumbnails (선택): 썸네일 N개 미리 읽기 (샤드 mmap 페이지 적재)
+
+필수 단계(1~4)가 실패하면 WARMUP_RETRIES번까지 점점 긴 간격(WARMUP_RETRY_SECONDS부터 2배씩)으로 다시 시도
+(모델 서버/파일 시스템이 늦게 뜨는 경우), 그래도 실패하면 failed → /ready 503, /health에 warmup: failed 표시
+선택 단계 실패는 기록만 하고 계속
+
+목록:
+1. Warmup: 단계 실행 + 상태 (pending → running → ready / failed)
+2. default_steps: api.py 기본 워밍업 단계 목록
+3. warmup: 기본 인스턴스 (api.py startup에서 시작, /ready에서 조회)
+"""
+
+import os
+import time
+import threading
+
+from tracing import Gauge
+from utils import CHROMA_DIR
+
+
+# ==================== 설정 ====================
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"                  # 0이면 워밍업 없이 바로 준비 상태
+WARMUP_BATCH = int(os.getenv("WARMUP_BATCH", "4"))                         # CLIP 워밍업 배치 크기
+WARMUP_PAGE_CACHE = os.getenv("WARMUP_PAGE_CACHE", "1") == "1"             # chroma_db 파일 페이지 캐시 적재
+WARMUP_PAGE_CACHE_MAX_BYTES = int(os.getenv("WARMUP_PAGE_CACHE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))  # 최대 4GB
+WARMUP_THUMBNAILS = int(os.getenv("WARMUP_THUMBNAILS", "0"))               # 미리 읽을 썸네일 수 (0이면 끔)
+WARMUP_RETRIES = int(os.getenv("WARMUP_RETRIES", "5"))                     # 필수 단계 실패 시 재시도 횟수
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "2"))       # 첫 재시도 대기 (이후 2배씩)
+WARMUP_RETRY_MAX_SECONDS = 60                                              # 재시도 대기 상한
+_READ_CHUNK = 8 * 1024 * 1024
+
+
+# ==================== 메트릭 ====================
+
+READY = Gauge("design_ready", "워밍업 완료 여부 (1: 트래픽 처리 가능)")
+WARMUP_SECONDS = Gauge("design_warmup_seconds", "워밍업 단계별 소요 시간 (초)")
+
+
+# ==================== 워밍업 ====================
+
+class Warmup:
+    """워밍업 단계를 백그라운드 스레드에서 실행하고 준비 상태를 보관"""
+
+    def __init__(self, retries=WARMUP_RETRIES, retry_seconds=WARMUP_RETRY_SECONDS):
+        self.retries = retries
+        self.retry_seconds = retry_seconds
+        self.status = "pending"   # pending / running / ready / failed
+        self.steps = {}           # 단계 이름 → {"seconds": ..., "error": ..., "attempts": ...}
+        self.error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def start(self, steps, enabled=WARMUP_ENABLED):
+        """
+        워밍업 시작 (중복 호출 무시)
+
+        Args:
+            steps: [(이름, 함수, 필수 여부), ...]
+        """
+        with self._lock:
+            if self._thread is not None or self.status == "ready":
+                return
+            if not enabled:
+                self._finish("ready")
+                return
+            self.status = "running"
+            self._thread = threading.Thread(target=self.run, args=(steps,), name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self, steps):
+        start = time.perf_counter()
+        for name, fn, required in steps:
+            attempts, delay = 0, self.retry_seconds
+            while True:
+                attempts += 1
+                t0 = time.perf_counter()
+                try:
+                    fn()
+                    error = None
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                seconds = time.perf_counter() - t0
+                self.steps[name] = {"seconds": round(seconds, 3), "error": error, "attempts": attempts}
+                # 선택 단계는 재시도하지 않음
+                if error is None or not required or attempts > self.retries:
+                    break
+                print(f"⚠️ 워밍업 실패 ({name}, {attempts}회): {error} → {delay:.0f}초 후 재시도")
+                time.sleep(delay)
+                delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+            WARMUP_SECONDS.set(seconds, step=name)
+
+            if error is None:
+                print(f"  워밍업 {name}: {seconds:.2f}초")
+            elif required:
+                print(f"⚠️ 워밍업 실패 ({name}): {error}")
+                self._finish("failed", error=f"{name}: {error} ({attempts}회 시도)")
+                return
+            else:
+                print(f"⚠️ 워밍업 선택 단계 건너뜀 ({name}): {error}")
+
+        self._finish("ready")
+        print(f"✅ 워밍업 완료 ({time.perf_counter() - start:.1f}초) → /ready")
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        READY.set(1 if status == "ready" else 0)
+
+    def snapshot(self):
+        """/ready 응답 본문"""
+        return {"status": self.status, "steps": dict(self.steps), "error": self.error}
+
+
+# ==================== 기본 단계 ====================
+
+def _blank_image():
+    from PIL import Image
+    return Image.new("RGB", (224, 224), "white")
+
+
+def warm_clip(batch=WARMUP_BATCH):
+    """CLIP 배치 임베딩 1회 → 임베딩 1개 반환 (검색 워밍업에 사용)"""
+    from utils import get_image_embeddings
+
+    embeddings = get_image_embeddings([_blank_image() for _ in range(batch)])
+    if not embeddings:
+        raise RuntimeError("CLIP 임베딩 생성 실패")
+    return embeddings[0]
+
+
+def warm_page_cache(chroma_dir=CHROMA_DIR, max_bytes=WARMUP_PAGE_CACHE_MAX_BYTES):
+    """chroma_db 파일 순차 읽기 (max_bytes까지) → 읽은 바이트 수"""
+    paths = []
+    for root, _, files in os.walk(chroma_dir):
+        paths.extend(os.path.join(root, name) for name in files)
+    # chroma.sqlite3(메타데이터/필터)를 먼저, 그다음 HNSW 세그먼트 파일
+    paths.sort(key=lambda path: (not path.endswith(".sqlite3"), path))
+
+    total = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            while total < max_bytes:
+                chunk = f.read(_READ_CHUNK)
+                if not chunk:
+                    break
+                total += len(chunk)
+        if total >= max_bytes:
+            break
+    return total
+
+
+def warm_thumbnails(count=WARMUP_THUMBNAILS):
+    """매니페스트 앞쪽 design_id부터 썸네일 count개 읽기 → 읽은 개수"""
+    from image_manifest import get_manifest
+    from utils import get_design_thumbnail_bytes
+
+    loaded = 0
+    for design_id in get_manifest().design_ids()[:count]:
+        data = get_design_thumbnail_bytes(design_id)
+        if data is not None:
+            bytes(data)  # memoryview(mmap)면 실제 페이지를 읽음
+            loaded += 1
+    return loaded
+
+
+def default_steps(image_collection, where=None):
+    """
+    api.py 기본 워밍업 단계
+
+    Args:
+        image_collection: 검색 컬렉션 (design_chatbot.image_collection)
+        where: 검색 필터 (대표 도면 검색 시 design_chatbot.search_where)
+    """
+    from image_manifest import get_manifest
+    from lexical_index import get_lexical_index
+    from design_lookup import get_design_lookup
+    from image_preprocess import to_vlm_data_url
+    from utils import search_and_filter_similar_designs
+
+    embedding = {}
+
+    def clip():
+        embedding["value"] = warm_clip()
+
+    def chroma():
+        search_and_filter_similar_designs(image_collection, embedding["value"], n_results=10, where=where)
+
+    steps = [
+        ("manifest", get_manifest, True),
+        ("lexical", lambda: get_lexical_index(image_collection), True),
+        ("lookup", lambda: get_design_lookup(image_collection), True),
+        ("clip", clip, True),
+        ("chroma", chroma, True),
+        ("preprocess", lambda: to_vlm_data_url(_blank_image()), True),
+    ]
+    if WARMUP_PAGE_CACHE:
+        steps.append(("page_cache", warm_page_cache, False))
+    if WARMUP_THUMBNAILS > 0:
+        steps.append(("thumbnails", warm_thumbnails, False))
+    return steps
+
+
+# ==================== 기본 인스턴스 ====================
+
+warmup = Warmup()